@@ -0,0 +1,75 @@
+"""
+Compares bytes on the wire and CPU per trackDb.txt request when the body is sent uncompressed, compressed on every
+request (gzip level 6 as GZipMiddleware would) and precompressed once and stored in the hub cache.
+
+    python benchmarks/compression.py
+"""
+import os
+import sys
+import time
+import gzip
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'topdata.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+import django
+django.setup()
+
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks.hubfiles import get_template
+from tracks.compression import compress_body, choose_encoding, GZIP, BROTLI
+
+URL_FORMAT = 'http://trackhub.genome.duke.edu/harteminklab/TOP/trackhubs/hg19/TFs_cells/bigWig/{tf}/{cell_type}/' \
+             '{tf}_MA0007.2_1e-5_{cell_type}_OpenChromDnase_M5_BH_middle_map0.9_pwm0_flank100_predictions_{rep}.bw'
+TRACK_COUNTS = [100, 10000]
+REQUESTS = 200
+
+
+def make_tracks(num_tracks):
+    genome = Genome(name='hg19')
+    tracks = []
+    for i in range(num_tracks):
+        tf = TranscriptionFactor(name='TF{}'.format(i // 200))
+        cell_type = CellType(name='Cell_Type_{}'.format((i // 2) % 100))
+        rep_name = RepName(name='Rep{}'.format(i % 2 + 1))
+        label = '{} {} {}'.format(tf.name, cell_type.name, rep_name.name)
+        tracks.append(Track(genome=genome, name=label.replace(' ', '_'), short_label=label, long_label=label,
+                            big_data_url=URL_FORMAT.format(tf=tf.name, cell_type=cell_type.name, rep=rep_name.name),
+                            file_type='bigWig', tf=tf, cell_type=cell_type, rep_name=rep_name))
+    return tracks
+
+
+def cpu_per_request(func, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    print("{:>7} {:<28}{:>12}{:>12}".format('tracks', 'mode', 'bytes', 'cpu ms/req'))
+    for num_tracks in TRACK_COUNTS:
+        body = get_template('trackDb.txt.j2').render({'tracks': make_tracks(num_tracks)})
+        data = body.encode('utf-8')
+        repeat = max(REQUESTS * 100 // num_tracks, 5)
+        start = time.process_time()
+        encoded_bodies = compress_body(body)
+        precompress_ms = (time.process_time() - start) * 1000
+        rows = [
+            ('uncompressed', len(data), 0.0),
+            ('gzip -6 per request', len(gzip.compress(data, 6)),
+             cpu_per_request(lambda: gzip.compress(data, 6), repeat)),
+        ]
+        for encoding in [GZIP, BROTLI]:
+            if encoding in encoded_bodies:
+                accept_encoding = 'gzip' if encoding == GZIP else 'gzip, br'
+                rows.append(('precompressed {}'.format(encoding), len(encoded_bodies[encoding]),
+                             cpu_per_request(lambda: encoded_bodies[choose_encoding(accept_encoding, encoded_bodies)],
+                                             repeat * 100)))
+        for mode, num_bytes, cpu_ms in rows:
+            print("{:>7} {:<28}{:>12}{:>12.4f}".format(num_tracks, mode, num_bytes, cpu_ms))
+        print("{:>7} {:<28}{:>12}{:>12.4f}".format(num_tracks, 'one time precompression', '', precompress_ms))
+
+
+if __name__ == '__main__':
+    main()
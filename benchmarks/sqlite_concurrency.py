@@ -0,0 +1,112 @@
+"""
+Measures hub requests served from a SQLite database while loadtracks writes to it, with the default SQLite
+settings and with SQLITE_PROFILE 'production' (see tracks/sqlite.py). Reader threads render trackDb.txt files
+during the load and count requests that failed with "database is locked".
+
+    python benchmarks/sqlite_concurrency.py [NUM_TRACKS]
+"""
+import os
+import sys
+import tempfile
+import multiprocessing
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'topdata.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+import django
+from django.conf import settings
+
+WORK_DIR = tempfile.mkdtemp(prefix='topdata-sqlite-benchmark-')
+# keep the benchmark away from the real database, hub cache and static hubs
+settings.DATABASES['default']['NAME'] = os.path.join(WORK_DIR, 'db.sqlite3')
+settings.CACHES[settings.HUB_CACHE_ALIAS]['LOCATION'] = os.path.join(WORK_DIR, 'hubcache')
+settings.STATIC_HUBS_ROOT = os.path.join(WORK_DIR, 'statichubs')
+settings.HUB_CACHE_WARM_LOGS = []
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection, OperationalError
+import yaml
+
+PROFILES = ['', 'production']
+READERS = 4
+TRACKS_YAML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tracks.yaml')
+
+
+def write_tracks_yaml(num_tracks):
+    with open(TRACKS_YAML) as infile:
+        data = yaml.safe_load(infile)
+    genome = data[0]
+    genome['tracks'] = genome['tracks'][:num_tracks]
+    filename = os.path.join(WORK_DIR, 'tracks.yaml')
+    with open(filename, 'w') as outfile:
+        yaml.safe_dump([genome], outfile)
+    return filename, genome['assembly'], len(genome['tracks'])
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def read_hubs(genome, done, results):
+    connection.close()
+    from tracks.views import render_track_db
+    latencies = []
+    errors = 0
+    key = 1
+    while not done.is_set():
+        start = time.perf_counter()
+        try:
+            render_track_db('_'.join(str(track_id) for track_id in range(key, key + 20)), genome)
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+        key = key % 1000 + 20
+    connection.close()
+    results.put((latencies, errors))
+
+
+def run(profile, filename, genome):
+    settings.SQLITE_PROFILE = profile
+    if os.path.exists(settings.DATABASES['default']['NAME']):
+        os.remove(settings.DATABASES['default']['NAME'])
+    connection.close()
+    call_command('migrate', verbosity=0)
+    connection.close()
+    context = multiprocessing.get_context('fork')
+    done = context.Event()
+    results = context.Queue()
+    readers = [context.Process(target=read_hubs, args=(genome, done, results)) for _ in range(READERS)]
+    for reader in readers:
+        reader.start()
+    start = time.perf_counter()
+    call_command('loadtracks', filename, stdout=open(os.devnull, 'w'))
+    load_seconds = time.perf_counter() - start
+    done.set()
+    reader_results = [results.get() for _ in readers]
+    for reader in readers:
+        reader.join()
+    connection.close()
+    latencies = [latency for reader_latencies, _ in reader_results for latency in reader_latencies]
+    errors = sum(reader_errors for _, reader_errors in reader_results)
+    print("{:<12}{:>10.2f}{:>10}{:>10}{:>10.1f}{:>10.1f}".format(
+        profile or 'default', load_seconds, len(latencies), errors, percentile(latencies, 0.5) * 1000,
+        percentile(latencies, 0.99) * 1000))
+
+
+def main():
+    num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    filename, genome, num_tracks = write_tracks_yaml(num_tracks)
+    print("Loading {} tracks with {} reader processes rendering trackDb.txt, batch size {}".format(
+        num_tracks, READERS, settings.LOADTRACKS_BATCH_SIZE))
+    print("{:<12}{:>10}{:>10}{:>10}{:>10}{:>10}".format('profile', 'load s', 'reads', 'locked', 'p50 ms', 'p99 ms'))
+    for profile in PROFILES:
+        run(profile, filename, genome)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the time to render the select tracks page, a table with a checkbox for each transcription factor and
+cell type pair, with the Django and Jinja2 template engines (see WIZARD_TEMPLATE_ENGINE).
+
+    python benchmarks/wizard_render.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'topdata.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+import django
+django.setup()
+
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from tracks.models import TranscriptionFactor, CellType
+from tracks.views import Navigation, Steps, render_fragment
+
+NUM_TFS = 100
+NUM_CELL_TYPES = 300
+ENGINES = ['django', 'jinja2']
+RENDERS = 10
+
+
+def make_context():
+    tfs = [TranscriptionFactor(name='TF{}'.format(i)) for i in range(NUM_TFS)]
+    celltypes = [CellType(name='Cell_Type_{}'.format(i)) for i in range(NUM_CELL_TYPES)]
+    return Navigation.make_template_context(Navigation.TRACKS_PAGE, {
+        'step_items': Steps.make_items(Steps.TRACKS),
+        'genome': 'hg19',
+        'celltypes': celltypes,
+        'rows': [{'tf': tf, 'track_strs': ['{},{}'.format(tf.name, celltype.name) for celltype in celltypes]}
+                 for tf in tfs],
+    })
+
+
+def render_page(context, request, engine):
+    """
+    Render the tracks table fragment and the page around it, as select_tracks does when the fragment is not cached.
+    """
+    with override_settings(WIZARD_TEMPLATE_ENGINE=engine):
+        page_context = dict(context, tracks_table=render_fragment('tracks/tracks_table.html', context))
+    return render_to_string('tracks/select_tracks.html', page_context, request, using=engine)
+
+
+def main():
+    request = RequestFactory().get(reverse('tracks-select_tracks'))
+    context = make_context()
+    print("Rendering select_tracks.html for {} TFs x {} cell types, best of {} renders".format(
+        NUM_TFS, NUM_CELL_TYPES, RENDERS))
+    print("{:<10}{:>12}{:>14}".format('engine', 'ms', 'bytes'))
+    for engine in ENGINES:
+        # first render compiles the templates
+        body = render_page(context, request, engine)
+        times = []
+        for _ in range(RENDERS):
+            start = time.perf_counter()
+            render_page(context, request, engine)
+            times.append(time.perf_counter() - start)
+        print("{:<10}{:>12.1f}{:>14}".format(engine, min(times) * 1000, len(body.encode('utf-8'))))
+
+
+if __name__ == '__main__':
+    main()
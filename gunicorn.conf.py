@@ -0,0 +1,38 @@
+"""
+Gunicorn settings, read by gunicorn from the working directory.
+The application is loaded once in the master process before workers are forked so workers share the imported
+modules, then each worker runs tracks.warmup before serving requests. The hub cache is shared by the workers so the
+master warms it once before starting them, see tracks.warmup.warm_hub_cache.
+Set TOPDATA_GUNICORN_PRELOAD=False to load the application in each worker instead, for example so a HUP signal
+reloads changed code.
+"""
+import os
+import time
+
+preload_app = os.getenv('TOPDATA_GUNICORN_PRELOAD', 'True') == 'True'
+
+started = time.perf_counter()
+
+
+def when_ready(server):
+    server.log.info("Master ready in %.3fs (preload_app=%s)", time.perf_counter() - started, preload_app)
+    if not preload_app:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'topdata.settings')
+        import django
+        django.setup()
+    from django import db
+    from tracks.warmup import warm_hub_cache
+    warm_hub_cache()
+    db.connections.close_all()
+
+
+def pre_fork(server, worker):
+    # workers must open their own database connections rather than share one inherited from the master
+    if preload_app:
+        from django import db
+        db.connections.close_all()
+
+
+def post_worker_init(worker):
+    from tracks.warmup import warm_up
+    warm_up()
@@ -35,7 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'bootstrap4',
-    'tracks',
+    'tracks.apps.TracksConfig',
 ]
 
 MIDDLEWARE = [
@@ -64,6 +64,14 @@ TEMPLATES = [
             ],
         },
     },
+    {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'tracks.jinja2env.environment',
+        },
+    },
 ]
 
 WSGI_APPLICATION = 'topdata.wsgi.application'
@@ -119,9 +127,84 @@ STATIC_URL = '/static/'
 
 django_heroku.settings(locals(), logging=False)
 
+# Set TOPDATA_SQLITE_PROFILE=production when serving from SQLite while loadtracks may run, see tracks/sqlite.py.
+# Enables write-ahead logging, memory-mapped reads (SQLITE_MMAP_SIZE bytes), a page cache of SQLITE_CACHE_SIZE
+# (negative values are KiB) and waiting SQLITE_BUSY_TIMEOUT milliseconds for locks.
+SQLITE_PROFILE = os.getenv('TOPDATA_SQLITE_PROFILE', '')
+SQLITE_MMAP_SIZE = int(os.getenv('TOPDATA_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv('TOPDATA_SQLITE_CACHE_SIZE', -64 * 1024))
+SQLITE_BUSY_TIMEOUT = int(os.getenv('TOPDATA_SQLITE_BUSY_TIMEOUT', 5000))
+# Tracks loadtracks saves per transaction, small enough that readers waiting on the write lock are not starved
+LOADTRACKS_BATCH_SIZE = int(os.getenv('TOPDATA_LOADTRACKS_BATCH_SIZE', 500))
+
+# Optional read replica, for example postgres://... or sqlite:////path/to/replica.sqlite3. When set the queries
+# of tracks pages and hub files go to the replica (see tracks/routers.py) while writes stay on the default database.
+# A client that caused a write reads from the default database for REPLICA_STICKY_SECONDS.
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_DATABASE_URL = os.getenv('TOPDATA_REPLICA_DATABASE_URL')
+REPLICA_STICKY_COOKIE = 'topdata_primary'
+REPLICA_STICKY_SECONDS = int(os.getenv('TOPDATA_REPLICA_STICKY_SECONDS', 10))
+if REPLICA_DATABASE_URL:
+    import dj_database_url
+    DATABASES[REPLICA_DATABASE_ALIAS] = dj_database_url.parse(REPLICA_DATABASE_URL)
+    DATABASES[REPLICA_DATABASE_ALIAS]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['tracks.routers.ReplicaRouter']
+    MIDDLEWARE = list(MIDDLEWARE) + ['tracks.routers.ReplicaStickinessMiddleware']
+
 TRACK_SELECTION_LIMIT = os.getenv('TOPDATA_TRACK_SELECTION_LIMIT', 100)
 ALL_DATA_URL = os.getenv('TOPDATA_ALL_DATA_URL')
 
+# Template engine used to render the wizard pages: 'django' (tracks/templates) or 'jinja2' (tracks/jinja2)
+WIZARD_TEMPLATE_ENGINE = os.getenv('TOPDATA_WIZARD_TEMPLATE_ENGINE', 'django')
+
+# Rendered hub files are cached in a cache shared by all workers.
+# By default this is a size bounded LRU file cache, set TOPDATA_HUB_CACHE_BACKEND and TOPDATA_HUB_CACHE_LOCATION
+# to use memcached or redis instead.
+HUB_CACHE_ALIAS = 'hubs'
+HUB_CACHE_BACKEND = os.getenv('TOPDATA_HUB_CACHE_BACKEND', 'tracks.cache_backends.LRUFileBasedCache')
+HUB_CACHE_OPTIONS = {
+    'MAX_ENTRIES': int(os.getenv('TOPDATA_HUB_CACHE_MAX_ENTRIES', 10000)),
+}
+if HUB_CACHE_BACKEND == 'tracks.cache_backends.LRUFileBasedCache':
+    HUB_CACHE_OPTIONS['MAX_BYTES'] = int(os.getenv('TOPDATA_HUB_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    HUB_CACHE_ALIAS: {
+        'BACKEND': HUB_CACHE_BACKEND,
+        'LOCATION': os.getenv('TOPDATA_HUB_CACHE_LOCATION', os.path.join(BASE_DIR, 'hubcache')),
+        'OPTIONS': HUB_CACHE_OPTIONS,
+    },
+}
+# tests get a hub cache of their own in a temporary directory
+TEST_RUNNER = 'tracks.testrunner.TestRunner'
+HUB_CACHE_TIMEOUT = int(os.getenv('TOPDATA_HUB_CACHE_TIMEOUT', 24 * 60 * 60))
+HUB_CACHE_LOCK_TIMEOUT = int(os.getenv('TOPDATA_HUB_CACHE_LOCK_TIMEOUT', 10))
+HUB_CACHE_STATS_FLUSH_EVERY = int(os.getenv('TOPDATA_HUB_CACHE_STATS_FLUSH_EVERY', 50))
+# Rendered wizard page fragments are also kept in the hub cache. The timeout is short so fragments rendered by
+# the templates of a previous deploy do not linger.
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('TOPDATA_FRAGMENT_CACHE_TIMEOUT', 60 * 60))
+# Comma separated access log paths or glob patterns. When set loadtracks warms the hub cache with the
+# HUB_CACHE_WARM_TOP most requested hubs in these logs, spending at most HUB_CACHE_WARM_TIME_LIMIT seconds.
+HUB_CACHE_WARM_LOGS = [path for path in os.getenv('TOPDATA_HUB_CACHE_WARM_LOGS', '').split(',') if path]
+HUB_CACHE_WARM_TOP = int(os.getenv('TOPDATA_HUB_CACHE_WARM_TOP', 100))
+HUB_CACHE_WARM_TIME_LIMIT = float(os.getenv('TOPDATA_HUB_CACHE_WARM_TIME_LIMIT', 30))
+
+# Hubs pre-generated by the buildstatichubs command. When STATIC_HUBS_URL is set, to an absolute url where a static
+# file server or CDN serves STATIC_HUBS_ROOT, requests for these hubs are redirected there. Otherwise the hub views
+# serve the pre-generated files.
+STATIC_HUBS_ROOT = os.getenv('TOPDATA_STATIC_HUBS_ROOT', os.path.join(BASE_DIR, 'statichubs'))
+STATIC_HUBS_URL = os.getenv('TOPDATA_STATIC_HUBS_URL', '')
+
+# Leave tracks that the checktracks command found could not be downloaded out of hubs
+HUB_EXCLUDE_DEAD_TRACKS = os.getenv('TOPDATA_HUB_EXCLUDE_DEAD_TRACKS', '') == 'True'
+# Set to 'tf' or 'cell_type' to group the tracks of a trackDb.txt with at least HUB_TRACKDB_GROUP_MIN_TRACKS tracks
+# into a composite track per transcription factor or cell type, see tracks/hubfiles.py. Clear the hub cache and
+# rebuild static hubs after changing these.
+HUB_TRACKDB_GROUP_BY = os.getenv('TOPDATA_HUB_TRACKDB_GROUP_BY', '')
+HUB_TRACKDB_GROUP_MIN_TRACKS = int(os.getenv('TOPDATA_HUB_TRACKDB_GROUP_MIN_TRACKS', 20))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -135,5 +218,9 @@ LOGGING = {
             'handlers': ['console'],
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
         },
+        'tracks': {
+            'handlers': ['console'],
+            'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
+        },
     },
 }
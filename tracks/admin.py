@@ -1,9 +1,165 @@
+"""
+Admin pages for the track catalog, which can hold millions of tracks. Track pages avoid queries that read the
+whole track table: related objects are picked with autocomplete or raw id widgets instead of dropdowns of every
+row, the search box uses the full-text index in tracks.search, filters are on indexed columns and the change list
+count of an unfiltered table comes from the database statistics on postgres.
+"""
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.utils.functional import cached_property
 
 from tracks.models import *
+from tracks import hubcache, search
+from tracks.statichubs import clear_static_hubs
 
-admin.site.register(Genome)
-admin.site.register(Track)
-admin.site.register(TranscriptionFactor)
-admin.site.register(CellType)
-admin.site.register(RepName)
+# row estimates below this are counted exactly, statistics of small or new tables are often off
+ESTIMATED_COUNT_THRESHOLD = 10000
+# most tracks the admin search box returns
+ADMIN_SEARCH_LIMIT = 500
+
+
+def estimate_row_count(model):
+    """
+    Return the number of rows in the table of model from the database statistics, None when unavailable.
+    """
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that estimates the count of an unfiltered table, on postgres COUNT(*) reads every row.
+    SQLite counts a million tracks from an index in a few milliseconds so its counts stay exact.
+    """
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimate_row_count(self.object_list.model)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class NameAdmin(admin.ModelAdmin):
+    """
+    Admin for the models whose primary key is their name, searchable for the autocomplete widgets of TrackAdmin.
+    """
+    list_display = ['name']
+    search_fields = ['name']
+
+
+class TrackAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'genome_name', 'tf_name', 'cell_type_name', 'rep_name_name', 'short_label',
+                    'file_type']
+    list_select_related = ['short_label_format']
+    list_filter = ['genome', 'rep_name']
+    # searched with tracks.search, see get_search_results
+    search_fields = ['name']
+    autocomplete_fields = ['genome', 'tf', 'cell_type', 'rep_name']
+    raw_id_fields = ['url_prefix', 'short_label_format', 'long_label_format']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['update_search_index', 'forget_health_checks']
+
+    # shows the names stored in the foreign key columns without joining the name tables
+    def genome_name(self, track):
+        return track.genome_id
+    genome_name.short_description = 'genome'
+    genome_name.admin_order_field = 'genome'
+
+    def tf_name(self, track):
+        return track.tf_id
+    tf_name.short_description = 'tf'
+    tf_name.admin_order_field = 'tf'
+
+    def cell_type_name(self, track):
+        return track.cell_type_id
+    cell_type_name.short_description = 'cell type'
+    cell_type_name.admin_order_field = 'cell_type'
+
+    def rep_name_name(self, track):
+        return track.rep_name_id
+    rep_name_name.short_description = 'rep name'
+    rep_name_name.admin_order_field = 'rep_name'
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Find tracks with the full-text index instead of LIKE queries that scan the track table.
+        A number also matches the track with that id.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        track_ids = search.search_track_ids(None, search_term, ADMIN_SEARCH_LIMIT)
+        if search_term.isdigit():
+            track_ids.append(int(search_term))
+        return queryset.filter(pk__in=track_ids), False
+
+    def catalog_changed(self, track_ids):
+        search.index_tracks(track_ids)
+        hubcache.bump_catalog_version()
+        clear_static_hubs()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.catalog_changed([obj.id])
+
+    def delete_model(self, request, obj):
+        track_id = obj.id
+        super().delete_model(request, obj)
+        self.catalog_changed([track_id])
+
+    def delete_queryset(self, request, queryset):
+        track_ids = list(queryset.values_list('id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.catalog_changed(track_ids)
+
+    def update_search_index(self, request, queryset):
+        track_ids = list(queryset.values_list('id', flat=True))
+        search.index_tracks(track_ids)
+        self.message_user(request, "Updated the search index of {} tracks.".format(len(track_ids)))
+    update_search_index.short_description = 'Update the search index of selected tracks'
+
+    def forget_health_checks(self, request, queryset):
+        num_deleted, _ = TrackHealth.objects.filter(track__in=queryset.values('id')).delete()
+        # hubs may have left out these tracks as dead
+        hubcache.bump_catalog_version()
+        clear_static_hubs()
+        self.message_user(request, "Forgot the health checks of {} tracks.".format(num_deleted))
+    forget_health_checks.short_description = 'Forget health checks of selected tracks'
+
+
+class TrackHealthAdmin(admin.ModelAdmin):
+    list_display = ['track', 'is_alive', 'status', 'error', 'checked']
+    list_select_related = ['track']
+    list_filter = ['is_alive']
+    raw_id_fields = ['track']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class TrackSummaryAdmin(admin.ModelAdmin):
+    list_display = ['track', 'min_value', 'max_value', 'mean_value', 'bases_covered']
+    list_select_related = ['track']
+    raw_id_fields = ['track']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(Genome, NameAdmin)
+admin.site.register(Track, TrackAdmin)
+admin.site.register(TranscriptionFactor, NameAdmin)
+admin.site.register(CellType, NameAdmin)
+admin.site.register(RepName, NameAdmin)
+admin.site.register(TrackHealth, TrackHealthAdmin)
+admin.site.register(TrackSummary, TrackSummaryAdmin)
+admin.site.register(UrlPrefix)
+admin.site.register(LabelFormat)
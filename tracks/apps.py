@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
 
 
 class TracksConfig(AppConfig):
     name = 'tracks'
+
+    def ready(self):
+        from tracks.sqlite import configure_connection
+        from tracks.hubfiles import check_trackdb_group_by
+        connection_created.connect(configure_connection, dispatch_uid='tracks.sqlite.configure_connection')
+        checks.register(check_trackdb_group_by)
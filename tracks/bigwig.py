@@ -0,0 +1,115 @@
+"""
+Reads summary statistics of a bigWig file using HTTP range requests for the few blocks that hold them.
+See the BBI file format in Kent et al. 2010, "BigWig and BigBed: enabling browsing of large distributed datasets".
+The whole file summary is stored in the total summary block. Files without one are summarized from the
+records of their coarsest zoom level.
+"""
+from collections import namedtuple
+import math
+import struct
+import zlib
+
+BIGWIG_MAGIC = 0x888FFC26
+HEADER_FORMAT = 'IHHQQQHHQQIQ'
+HEADER_SIZE = 64
+ZOOM_HEADER_FORMAT = 'IIQQ'
+ZOOM_HEADER_SIZE = 24
+TOTAL_SUMMARY_FORMAT = 'Qdddd'
+TOTAL_SUMMARY_SIZE = 40
+ZOOM_RECORD_FORMAT = 'IIIIffff'
+ZOOM_RECORD_SIZE = 32
+# zoom headers follow the file header so reading this many bytes gets both for files with up to 10 zoom levels
+INITIAL_READ_SIZE = HEADER_SIZE + 10 * ZOOM_HEADER_SIZE
+
+BigWigHeader = namedtuple('BigWigHeader', ['byte_order', 'version', 'zoom_levels', 'total_summary_offset',
+                                           'uncompress_buf_size'])
+ZoomHeader = namedtuple('ZoomHeader', ['reduction_level', 'data_offset', 'index_offset'])
+Summary = namedtuple('Summary', ['bases_covered', 'min_value', 'max_value', 'sum_data', 'sum_squares'])
+
+
+class BigWigError(Exception):
+    pass
+
+
+def parse_header(data):
+    for byte_order in ['<', '>']:
+        if len(data) >= HEADER_SIZE and struct.unpack(byte_order + 'I', data[:4])[0] == BIGWIG_MAGIC:
+            fields = struct.unpack(byte_order + HEADER_FORMAT, data[:HEADER_SIZE])
+            return BigWigHeader(byte_order=byte_order, version=fields[1], zoom_levels=fields[2],
+                                total_summary_offset=fields[9], uncompress_buf_size=fields[10])
+    raise BigWigError('Not a bigWig file')
+
+
+def parse_zoom_headers(header, data):
+    zoom_headers = []
+    for level in range(header.zoom_levels):
+        offset = HEADER_SIZE + level * ZOOM_HEADER_SIZE
+        reduction_level, _, data_offset, index_offset = struct.unpack(
+            header.byte_order + ZOOM_HEADER_FORMAT, data[offset:offset + ZOOM_HEADER_SIZE])
+        zoom_headers.append(ZoomHeader(reduction_level, data_offset, index_offset))
+    return zoom_headers
+
+
+def parse_total_summary(header, data):
+    return Summary(*struct.unpack(header.byte_order + TOTAL_SUMMARY_FORMAT, data[:TOTAL_SUMMARY_SIZE]))
+
+
+def decompress_blocks(data):
+    """
+    Zoom data is a series of separately zlib compressed blocks.
+    """
+    blocks = []
+    while data:
+        decompressor = zlib.decompressobj()
+        blocks.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+    return b''.join(blocks)
+
+
+def summarize_zoom_data(header, data):
+    """
+    Combine the records of a zoom level's data section into a Summary.
+    The section starts with a 32 bit count followed by the (possibly compressed) records. Writers differ in what
+    they count so every complete record in the section is used.
+    """
+    records = data[4:]
+    if header.uncompress_buf_size:
+        records = decompress_blocks(records)
+    bases_covered = 0
+    min_value = math.inf
+    max_value = -math.inf
+    sum_data = sum_squares = 0.0
+    record_format = header.byte_order + ZOOM_RECORD_FORMAT
+    for i in range(len(records) // ZOOM_RECORD_SIZE):
+        _, _, _, valid_count, record_min, record_max, record_sum, record_sum_squares = struct.unpack(
+            record_format, records[i * ZOOM_RECORD_SIZE:(i + 1) * ZOOM_RECORD_SIZE])
+        if not valid_count:
+            continue
+        bases_covered += valid_count
+        min_value = min(min_value, record_min)
+        max_value = max(max_value, record_max)
+        sum_data += record_sum
+        sum_squares += record_sum_squares
+    if not bases_covered:
+        raise BigWigError('Zoom level has no data')
+    return Summary(bases_covered, min_value, max_value, sum_data, sum_squares)
+
+
+async def read_summary(checker, url):
+    """
+    Read the Summary of the bigWig file at url with range requests made through a UrlChecker.
+    """
+    data = await checker.fetch_range(url, 0, INITIAL_READ_SIZE - 1)
+    header = parse_header(data)
+    zoom_headers_end = HEADER_SIZE + header.zoom_levels * ZOOM_HEADER_SIZE
+    if header.total_summary_offset:
+        data = await checker.fetch_range(url, header.total_summary_offset,
+                                         header.total_summary_offset + TOTAL_SUMMARY_SIZE - 1)
+        return parse_total_summary(header, data)
+    if not header.zoom_levels:
+        raise BigWigError('No total summary or zoom levels')
+    if len(data) < zoom_headers_end:
+        data = await checker.fetch_range(url, 0, zoom_headers_end - 1)
+    coarsest = max(parse_zoom_headers(header, data), key=lambda zoom_header: zoom_header.reduction_level)
+    data = await checker.fetch_range(url, coarsest.data_offset, coarsest.index_offset - 1)
+    return summarize_zoom_data(header, data)
@@ -0,0 +1,80 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+import os
+import tempfile
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    File based cache shared by all workers on a host that evicts the least recently used entries once it holds
+    more than MAX_ENTRIES entries or MAX_BYTES bytes. Like FileBasedCache, eviction happens before an entry is
+    written so only that entry can take the cache over the limits. The modification time of each file records its
+    last use.
+    Unlike FileBasedCache.add, add is atomic across processes so it can be used as a lock.
+    """
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self._max_bytes = int(options.get('MAX_BYTES', DEFAULT_MAX_BYTES))
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, default=default, version=version)
+        if value is not default:
+            try:
+                os.utime(self._key_to_file(key, version))
+            except FileNotFoundError:
+                pass
+        return value
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.has_key(key, version):
+            return False
+        self._createdir()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            # linking fails if another process created the entry first
+            os.link(tmp_path, self._key_to_file(key, version))
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def _list_cache_entries(self):
+        entries = []
+        for fname in self._list_cache_files():
+            try:
+                stat = os.stat(fname)
+                entries.append((stat.st_mtime, stat.st_size, fname))
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def _cull(self):
+        entries = self._list_cache_entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        if len(entries) < self._max_entries and total_bytes < self._max_bytes:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+        # Evict least recently used entries until a 1/CULL_FREQUENCY share of both limits is free
+        max_entries = self._max_entries - max(int(self._max_entries / self._cull_frequency), 1)
+        max_bytes = self._max_bytes - int(self._max_bytes / self._cull_frequency)
+        num_entries = len(entries)
+        for _, size, fname in sorted(entries):
+            if num_entries <= max_entries and total_bytes <= max_bytes:
+                break
+            self._delete(fname)
+            num_entries -= 1
+            total_bytes -= size
+
+    def usage(self):
+        """
+        Return the number of entries and total bytes stored in the cache.
+        """
+        entries = self._list_cache_entries()
+        return len(entries), sum(size for _, size, _ in entries)
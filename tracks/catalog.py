@@ -0,0 +1,261 @@
+"""
+Binary snapshots of the track catalog (genomes, transcription factors, cell types, replicate names and tracks).
+A snapshot stores each track field as a column of 32 bit integers, strings are stored once in a string table and
+referred to by index. Layout, all integers unsigned little endian:
+
+    header       magic, version, number of strings, tracks, genomes, tfs, cell types and rep names, reserved
+    offsets      number of strings + 1 offsets into the string data
+    dimensions   string indexes of the genome, tf, cell type and rep name names
+    columns      a column per TRACK_COLUMNS entry with a value per track
+    string data  utf-8 encoded strings
+
+Tracks keep the compact form of their url and labels (see tracks.compact) so these share strings too.
+A Catalog reads a snapshot in place, so one opened from a memory-mapped file only decodes the strings it uses.
+"""
+from django.db import connection, transaction
+from django.core.management.color import no_style
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track, UrlPrefix, LabelFormat, \
+    get_or_create_by_value
+from tracks.compact import format_label
+from tracks import search
+from array import array
+from collections import namedtuple
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b'TOPCATLG'
+VERSION = 2
+# magic, version, the number of strings, tracks and of each DIMENSIONS entry, then a reserved field written as 0
+# and ignored when read
+HEADER_FORMAT = '<8sIIIIIIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+DIMENSIONS = ['genomes', 'tfs', 'cell_types', 'rep_names']
+DIMENSION_MODELS = [Genome, TranscriptionFactor, CellType, RepName]
+# id holds track ids, the other columns hold string indexes
+TRACK_COLUMNS = ['id', 'genome', 'name', 'short_label_format', 'long_label_format', 'url_prefix', 'url_suffix',
+                 'file_type', 'tf', 'cell_type', 'rep_name', 'position']
+TRACK_VALUES_FIELDS = ['id', 'genome_id', 'name', 'short_label_format__template', 'long_label_format__template',
+                       'url_prefix__prefix', 'url_suffix', 'file_type', 'tf_id', 'cell_type_id', 'rep_name_id',
+                       'position']
+
+
+class CatalogTrack(namedtuple('CatalogTrack', TRACK_COLUMNS)):
+    __slots__ = ()
+
+    def label_names(self):
+        return {'tf': self.tf, 'cell_type': self.cell_type, 'rep_name': self.rep_name}
+
+    @property
+    def big_data_url(self):
+        return self.url_prefix + self.url_suffix
+
+    @property
+    def short_label(self):
+        return format_label(self.short_label_format, self.label_names())
+
+    @property
+    def long_label(self):
+        return format_label(self.long_label_format, self.label_names())
+
+
+class CatalogError(Exception):
+    pass
+
+
+def to_little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def as_native_array(buffer):
+    """
+    Return a read-only sequence of the unsigned 32 bit integers in buffer without copying when possible.
+    """
+    if sys.byteorder == 'little':
+        return buffer.cast('I')
+    values = array('I', bytes(buffer))
+    values.byteswap()
+    return values
+
+
+class StringTable(object):
+    def __init__(self):
+        self.indexes = {}
+        self.strings = []
+
+    def intern(self, value):
+        index = self.indexes.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.indexes[value] = index
+            self.strings.append(value)
+        return index
+
+    def to_bytes(self):
+        """
+        Return the encoded offsets and string data.
+        """
+        offsets = array('I', [0])
+        encoded = []
+        for value in self.strings:
+            data = value.encode('utf-8')
+            encoded.append(data)
+            offsets.append(offsets[-1] + len(data))
+        return to_little_endian(offsets), b''.join(encoded)
+
+
+def build_snapshot(dimensions, track_rows):
+    """
+    Return snapshot bytes. dimensions is a dict of DIMENSIONS name to a list of names and track_rows a list of
+    tuples with the values of TRACK_COLUMNS.
+    """
+    strings = StringTable()
+    dimension_data = []
+    for dimension in DIMENSIONS:
+        dimension_data.append(to_little_endian(array('I', [strings.intern(name) for name in dimensions[dimension]])))
+    columns = [array('I') for _ in TRACK_COLUMNS]
+    for row in track_rows:
+        columns[0].append(row[0])
+        for column, value in zip(columns[1:], row[1:]):
+            column.append(strings.intern(value))
+    offsets, string_data = strings.to_bytes()
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(strings.strings), len(track_rows),
+                         *[len(dimensions[dimension]) for dimension in DIMENSIONS], 0)
+    return b''.join([header, offsets] + dimension_data + [to_little_endian(column) for column in columns] +
+                    [string_data])
+
+
+def build_snapshot_from_database():
+    dimensions = {}
+    for dimension, model in zip(DIMENSIONS, DIMENSION_MODELS):
+        dimensions[dimension] = list(model.objects.order_by('name').values_list('name', flat=True))
+    track_rows = list(Track.objects.order_by('id').values_list(*TRACK_VALUES_FIELDS))
+    return build_snapshot(dimensions, track_rows)
+
+
+class Catalog(object):
+    """
+    Read-only catalog backed by a snapshot buffer such as bytes or an mmap.
+    """
+    def __init__(self, buffer):
+        self.view = view = memoryview(buffer)
+        if len(view) < HEADER_SIZE:
+            raise CatalogError('Snapshot is truncated')
+        magic, version, num_strings, num_tracks, *dimension_sizes, _ = struct.unpack(
+            HEADER_FORMAT, view[:HEADER_SIZE])
+        if magic != MAGIC:
+            raise CatalogError('Not a catalog snapshot')
+        if version != VERSION:
+            raise CatalogError('Unsupported snapshot version {}'.format(version))
+        self.num_tracks = num_tracks
+        position = HEADER_SIZE
+        sections = [('offsets', num_strings + 1)] + list(zip(DIMENSIONS, dimension_sizes)) + \
+                   [(column, num_tracks) for column in TRACK_COLUMNS]
+        self.sections = {}
+        for name, count in sections:
+            end = position + count * 4
+            if end > len(view):
+                raise CatalogError('Snapshot is truncated')
+            self.sections[name] = as_native_array(view[position:end])
+            position = end
+        self.string_data = view[position:]
+        if len(self.string_data) != self.sections['offsets'][-1]:
+            raise CatalogError('Snapshot is truncated')
+        self.mmap = None
+
+    @classmethod
+    def from_file(cls, filename):
+        """
+        Open a snapshot file by memory mapping it.
+        """
+        with open(filename, 'rb') as infile:
+            # mmap raises ValueError for an empty file
+            if os.fstat(infile.fileno()).st_size < HEADER_SIZE:
+                raise CatalogError('Snapshot is truncated')
+            snapshot_mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        catalog = cls(snapshot_mmap)
+        catalog.mmap = snapshot_mmap
+        return catalog
+
+    def close(self):
+        """
+        Release the snapshot buffer, required before closing an mmap the catalog was created from.
+        """
+        for section in self.sections.values():
+            if isinstance(section, memoryview):
+                section.release()
+        self.string_data.release()
+        self.view.release()
+        self.sections = {}
+        if self.mmap:
+            self.mmap.close()
+
+    def string(self, index):
+        offsets = self.sections['offsets']
+        return str(self.string_data[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def names(self, dimension):
+        return [self.string(index) for index in self.sections[dimension]]
+
+    def track(self, row):
+        values = [self.sections['id'][row]]
+        for column in TRACK_COLUMNS[1:]:
+            values.append(self.string(self.sections[column][row]))
+        return CatalogTrack(*values)
+
+    def __len__(self):
+        return self.num_tracks
+
+    def __iter__(self):
+        for row in range(self.num_tracks):
+            yield self.track(row)
+
+
+def reset_track_id_sequence():
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Track]):
+            cursor.execute(sql)
+
+
+@transaction.atomic
+def load_catalog_into_database(catalog):
+    """
+    Insert the contents of catalog into a database without tracks keeping the track ids so existing hub urls still work.
+    """
+    for dimension, model in zip(DIMENSIONS, DIMENSION_MODELS):
+        # names are primary keys so names already in the database are kept
+        model.objects.bulk_create([model(name=name) for name in catalog.names(dimension)], ignore_conflicts=True)
+    catalog_tracks = list(catalog)
+    url_prefixes = get_or_create_by_value(UrlPrefix, 'prefix', [track.url_prefix for track in catalog_tracks])
+    label_formats = get_or_create_by_value(LabelFormat, 'template', [
+        template for track in catalog_tracks for template in [track.short_label_format, track.long_label_format]])
+    tracks = []
+    for catalog_track in catalog_tracks:
+        tracks.append(Track(
+            id=catalog_track.id,
+            genome_id=catalog_track.genome,
+            name=catalog_track.name,
+            short_label_format=label_formats[catalog_track.short_label_format],
+            long_label_format=label_formats[catalog_track.long_label_format],
+            url_prefix=url_prefixes[catalog_track.url_prefix],
+            url_suffix=catalog_track.url_suffix,
+            file_type=catalog_track.file_type,
+            tf_id=catalog_track.tf,
+            cell_type_id=catalog_track.cell_type,
+            rep_name_id=catalog_track.rep_name,
+            position=catalog_track.position,
+        ))
+    Track.objects.bulk_create(tracks)
+    reset_track_id_sequence()
+    search.index_tracks([track.id for track in tracks])
+
+
+@transaction.atomic
+def delete_catalog_from_database():
+    search.clear_index()
+    Track.objects.all().delete()
+    for model in DIMENSION_MODELS:
+        model.objects.all().delete()
@@ -0,0 +1,58 @@
+"""
+Compact representation of a track's big_data_url and labels.
+A big_data_url is split into a prefix shared by many tracks and a per track suffix. Labels are stored as formats
+with {tf}, {cell_type} and {rep_name} placeholders, so tracks labeled alike share a format.
+"""
+import re
+
+LABEL_NAME_KEYS = ['tf', 'cell_type', 'rep_name']
+NAME_BOUNDARY_PATTERN = '(?<![A-Za-z0-9])({})(?![A-Za-z0-9])'
+
+
+def split_big_data_url(url, names):
+    """
+    Return (prefix, suffix) for url. The prefix ends before the first path segment that is one of names (a track's
+    tf, cell type or replicate name), or after the last '/' when there is no such segment.
+    """
+    path_start = url.find('/', url.find('://') + 3 if '://' in url else 0)
+    if path_start == -1:
+        return url, ''
+    segment_start = path_start + 1
+    while True:
+        segment_end = url.find('/', segment_start)
+        if segment_end == -1:
+            break
+        if url[segment_start:segment_end] in names:
+            return url[:segment_start], url[segment_start:]
+        segment_start = segment_end + 1
+    return url[:segment_start], url[segment_start:]
+
+
+def escape_braces(text):
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def make_label_format(label, names):
+    """
+    Return a format for label replacing whole word occurrences of the values of names (a dict of LABEL_NAME_KEYS
+    to names) with placeholders. Example: 'AR 8988T rep1' becomes '{tf} {cell_type} {rep_name}'.
+    """
+    keys_by_value = {}
+    for key in LABEL_NAME_KEYS:
+        if names.get(key):
+            keys_by_value.setdefault(names[key], key)
+    if not keys_by_value:
+        return escape_braces(label)
+    values = sorted(keys_by_value.keys(), key=len, reverse=True)
+    pattern = NAME_BOUNDARY_PATTERN.format('|'.join(re.escape(value) for value in values))
+    pieces = re.split(pattern, label)
+    # re.split alternates between the text around matches and the matched names
+    label_format = ''.join(escape_braces(piece) if i % 2 == 0 else '{' + keys_by_value[piece] + '}'
+                           for i, piece in enumerate(pieces))
+    if format_label(label_format, names) != label:
+        return escape_braces(label)
+    return label_format
+
+
+def format_label(label_format, names):
+    return label_format.format(**names)
@@ -0,0 +1,88 @@
+"""
+Content negotiated compression of hub files. Bodies are compressed once when they are rendered and every
+encoding is stored with them in the hub cache, so a request only has to pick one.
+"""
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+import gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+BROTLI = 'br'
+# server preference between encodings the client accepts equally
+ENCODING_PREFERENCE = [BROTLI, GZIP, IDENTITY]
+# smaller bodies (such as hub.txt) do not get smaller when compressed
+MIN_COMPRESS_BYTES = 256
+GZIP_LEVEL = 9
+# higher brotli qualities barely shrink trackDb files further but take seconds on large hubs
+BROTLI_QUALITY = 5
+
+
+def compress_body(body):
+    """
+    Return a dict of encoding to encoded bytes for the text body.
+    """
+    data = body.encode('utf-8')
+    encoded_bodies = {
+        IDENTITY: data
+    }
+    if len(data) >= MIN_COMPRESS_BYTES:
+        encoded_bodies[GZIP] = gzip.compress(data, compresslevel=GZIP_LEVEL)
+        if brotli:
+            encoded_bodies[BROTLI] = brotli.compress(data, quality=BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+    return encoded_bodies
+
+
+def parse_accept_encoding(accept_encoding):
+    """
+    Return a dict of encoding to quality value from an Accept-Encoding header.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        parts = item.strip().split(';')
+        encoding = parts[0].strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[encoding] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding, available_encodings):
+    """
+    Pick the encoding of available_encodings with the highest quality value for the client, preferring brotli, then
+    gzip, then no encoding when qualities are equal. Without an acceptable encoding the body is sent unencoded.
+    """
+    qualities = parse_accept_encoding(accept_encoding)
+    default_quality = qualities.get('*', 0.0)
+    best_encoding = IDENTITY
+    best_quality = 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in available_encodings:
+            continue
+        quality = qualities.get(encoding, default_quality)
+        if quality > best_quality:
+            best_encoding = encoding
+            best_quality = quality
+    return best_encoding
+
+
+def make_encoded_response(request, encoded_bodies, content_type):
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), encoded_bodies)
+    response = HttpResponse(encoded_bodies[encoding], content_type=content_type)
+    if encoding != IDENTITY:
+        response['Content-Encoding'] = encoding
+    if len(encoded_bodies) > 1:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,308 @@
+"""
+Checks tracks.yaml files before loadtracks writes anything: every track must have the fields loadtracks reads, short
+enough for their columns, a bigDataUrl that is an http, https or ftp url and a name unique within its genome.
+
+Files are streamed, never loaded whole. They are cut into chunks of about CHECK_CHUNK_LINES lines between two tracks,
+each chunk starting with the lines of its genome up to tracks: so it is a valid tracks.yaml file by itself, and the
+chunks are parsed in other processes. Only an 8 byte hash of the genome and name of each track is kept to find
+duplicates, errors are reported with the line of the track or field they are about.
+"""
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+import re
+import yaml
+
+# the libyaml parser is several times faster when PyYAML was built with it
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+REQUIRED_FIELDS = ['track', 'type', 'shortLabel', 'longLabel', 'bigDataUrl', 'tf_name', 'cell_type', 'rep_name']
+# fields stored in CharField(max_length=MAX_NAME_LENGTH) columns
+NAME_FIELDS = ['track', 'type', 'tf_name', 'cell_type', 'rep_name', 'position']
+MAX_NAME_LENGTH = 255
+# scheme and host followed by an optional path, query or fragment, without whitespace
+URL_PATTERN = re.compile(r'(https?|ftp)://[^\s/?#]+([/?#]\S*)?')
+CHECK_CHUNK_LINES = 20000
+# plain scalars loaded as None
+NULL_VALUES = ['', '~', 'null', 'Null', 'NULL']
+GENOME_START_PATTERN = re.compile(r'-(\s|$)')
+ASSEMBLY_KEY_PATTERN = re.compile(r'(-\s+|\s*)assembly\s*:')
+TRACKS_KEY_PATTERN = re.compile(r'(-\s+|\s*)tracks\s*:\s*(#.*)?$')
+
+ConfigError = namedtuple('ConfigError', ['filename', 'line', 'message'])
+# header_line is the line number of the first line of the chunk, body_line of the first line after the header
+ConfigChunk = namedtuple('ConfigChunk', ['filename', 'header_line', 'header_size', 'body_line', 'text'])
+ChunkResult = namedtuple('ChunkResult', ['filename', 'errors', 'keys', 'num_tracks'])
+
+
+def is_url(value):
+    return bool(URL_PATTERN.fullmatch(value))
+
+
+def check_track(track_dict):
+    """
+    Return (field, message) pairs for the problems of a track_dict, a parsed track of a tracks.yaml file.
+    """
+    problems = []
+    for field in REQUIRED_FIELDS:
+        value = track_dict.get(field)
+        if value is None or value == '':
+            problems.append((field, '{} is missing'.format(field)))
+    for field, value in track_dict.items():
+        if isinstance(value, (dict, list)):
+            problems.append((field, '{} must be text'.format(field)))
+        elif field in NAME_FIELDS and value is not None and len(str(value)) > MAX_NAME_LENGTH:
+            problems.append((field, '{} is longer than {} characters'.format(field, MAX_NAME_LENGTH)))
+    url = track_dict.get('bigDataUrl')
+    if isinstance(url, str) and url and not is_url(url):
+        problems.append(('bigDataUrl', 'bigDataUrl {} is not an http, https or ftp url'.format(url)))
+    return problems
+
+
+def make_key(genome_name, track_name):
+    return int.from_bytes(blake2b('{}\0{}'.format(genome_name, track_name).encode('utf-8'), digest_size=8).digest(),
+                          'big')
+
+
+def get_indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def is_content(line):
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith('#')
+
+
+def split_config(filename, chunk_lines=CHECK_CHUNK_LINES):
+    """
+    Yield the ConfigChunks of a tracks.yaml file. A genome whose assembly comes after its tracks or whose tracks
+    are not a block sequence is never cut.
+    """
+    header = []
+    header_line = 1
+    body = []
+    body_line = 1
+    in_header = True
+    has_genome = False
+    has_assembly = False
+    # indentation of the current genome's track items, None before they start and once they end
+    item_indent = None
+    field_prefix = None
+    can_cut = False
+    with open(filename) as infile:
+        for line_number, line in enumerate(infile, 1):
+            if line.startswith('-') and GENOME_START_PATTERN.match(line):
+                if has_genome:
+                    yield ConfigChunk(filename, header_line, len(header), body_line, ''.join(header + body))
+                    header = []
+                    header_line = line_number
+                    body = []
+                has_genome = True
+                in_header = True
+                has_assembly = False
+                can_cut = False
+            if in_header:
+                header.append(line)
+                body_line = line_number + 1
+                has_assembly = has_assembly or bool(ASSEMBLY_KEY_PATTERN.match(line))
+                if has_genome and TRACKS_KEY_PATTERN.match(line):
+                    in_header = False
+                    item_indent = None
+                    can_cut = has_assembly
+                continue
+            if can_cut and not (item_indent is not None and line.startswith(field_prefix)) and is_content(line):
+                indent = get_indent(line)
+                if item_indent is None:
+                    item_indent = indent
+                    # lines indented deeper than the items are inside a track
+                    field_prefix = ' ' * (indent + 1)
+                if indent < item_indent or (indent == item_indent and not GENOME_START_PATTERN.match(line[indent:])):
+                    # the tracks have ended
+                    can_cut = False
+                elif indent == item_indent and len(body) >= chunk_lines:
+                    yield ConfigChunk(filename, header_line, len(header), body_line, ''.join(header + body))
+                    body = []
+                    body_line = line_number
+            body.append(line)
+    if header or body:
+        yield ConfigChunk(filename, header_line, len(header), body_line, ''.join(header + body))
+
+
+def read_value(events, event):
+    """
+    Return the text of a scalar event, or None after skipping the events of a sequence, mapping or alias.
+    """
+    if isinstance(event, yaml.ScalarEvent):
+        return event.value
+    if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent)):
+        depth = 1
+        while depth:
+            event = next(events)
+            if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.SequenceEndEvent, yaml.MappingEndEvent)):
+                depth -= 1
+    return None
+
+
+class ChunkChecker(object):
+    """
+    Checks the genomes and tracks of a ConfigChunk from its parser events.
+    """
+    def __init__(self, chunk):
+        self.chunk = chunk
+        # errors about a genome are reported by the first chunk of the genome only
+        self.is_genome_start = chunk.body_line == chunk.header_line + chunk.header_size
+        self.errors = []
+        self.keys = []
+        self.num_tracks = 0
+
+    def get_line(self, mark):
+        line = mark.line + 1
+        if line <= self.chunk.header_size:
+            return self.chunk.header_line + line - 1
+        return self.chunk.body_line + line - self.chunk.header_size - 1
+
+    def add_error(self, mark, message):
+        self.errors.append(ConfigError(self.chunk.filename, self.get_line(mark), message))
+
+    def add_genome_error(self, mark, message):
+        if self.is_genome_start:
+            self.add_error(mark, message)
+
+    def check(self):
+        events = yaml.parse(self.chunk.text, Loader=YAML_LOADER)
+        try:
+            for event in events:
+                if isinstance(event, yaml.SequenceStartEvent):
+                    self.check_genomes(events)
+                elif isinstance(event, (yaml.MappingStartEvent, yaml.ScalarEvent)):
+                    self.add_genome_error(event.start_mark, 'A tracks file must be a list of genomes')
+                    read_value(events, event)
+        except yaml.MarkedYAMLError as e:
+            self.add_error(e.problem_mark or e.context_mark, 'Invalid YAML: {}'.format(e.problem or e.context))
+        self.errors.sort(key=lambda error: error.line)
+        return ChunkResult(self.chunk.filename, self.errors, self.keys, self.num_tracks)
+
+    def check_genomes(self, events):
+        for event in events:
+            if isinstance(event, yaml.SequenceEndEvent):
+                return
+            if isinstance(event, yaml.MappingStartEvent):
+                self.check_genome(events, event)
+            else:
+                self.add_genome_error(event.start_mark, 'A genome must have an assembly and tracks')
+                read_value(events, event)
+
+    def check_genome(self, events, genome_event):
+        genome_name = None
+        tracks = None
+        for event in events:
+            if isinstance(event, yaml.MappingEndEvent):
+                break
+            key = read_value(events, event)
+            value_event = next(events)
+            if key == 'assembly':
+                genome_name = read_value(events, value_event)
+                if not genome_name:
+                    self.add_genome_error(value_event.start_mark, 'assembly must be text')
+            elif key == 'tracks' and isinstance(value_event, yaml.SequenceStartEvent):
+                tracks = self.read_tracks(events)
+            else:
+                if key == 'tracks':
+                    self.add_genome_error(value_event.start_mark, 'tracks must be a list')
+                read_value(events, value_event)
+        if genome_name is None:
+            self.add_genome_error(genome_event.start_mark, 'Genome is missing assembly')
+        elif len(genome_name) > MAX_NAME_LENGTH:
+            self.add_genome_error(genome_event.start_mark,
+                                  'assembly is longer than {} characters'.format(MAX_NAME_LENGTH))
+        for track_mark, track_dict, field_marks in tracks or []:
+            self.check_track(genome_name, track_mark, track_dict, field_marks)
+
+    def read_tracks(self, events):
+        """
+        Return (mark, track_dict, field marks) of the tracks of a genome, nested values are given as empty lists
+        and nulls as None like yaml.load would.
+        """
+        tracks = []
+        for event in events:
+            if isinstance(event, yaml.SequenceEndEvent):
+                return tracks
+            if not isinstance(event, yaml.MappingStartEvent):
+                self.add_error(event.start_mark, 'A track must be a mapping of fields')
+                read_value(events, event)
+                continue
+            track_dict = {}
+            field_marks = {}
+            for key_event in events:
+                if isinstance(key_event, yaml.MappingEndEvent):
+                    break
+                key = read_value(events, key_event)
+                value_event = next(events)
+                value = read_value(events, value_event)
+                if not isinstance(value_event, yaml.ScalarEvent):
+                    value = []
+                elif value_event.implicit[0] and value in NULL_VALUES:
+                    value = None
+                track_dict[key] = value
+                field_marks[key] = value_event.start_mark
+            tracks.append((event.start_mark, track_dict, field_marks))
+        return tracks
+
+    def check_track(self, genome_name, track_mark, track_dict, field_marks):
+        self.num_tracks += 1
+        track_name = track_dict.get('track')
+        prefix = 'track {}: '.format(track_name) if isinstance(track_name, str) and track_name else ''
+        for field, message in check_track(track_dict):
+            self.add_error(field_marks.get(field, track_mark), prefix + message)
+        if genome_name and isinstance(track_name, str) and track_name:
+            self.keys.append((make_key(genome_name, track_name), self.get_line(track_mark), genome_name,
+                              track_name))
+
+
+def check_chunk(chunk):
+    return ChunkChecker(chunk).check()
+
+
+def map_chunks(chunks, workers):
+    """
+    Yield the ChunkResult of each chunk in order, checking up to workers chunks at once in other processes. Only a
+    few chunks per worker are read ahead so memory use does not grow with the files.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield check_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(check_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def check_configs(filenames, workers=1, chunk_lines=CHECK_CHUNK_LINES):
+    """
+    Return the ConfigErrors of tracks.yaml files in order of filenames and lines, and the number of tracks checked.
+    """
+    chunks = (chunk for filename in filenames for chunk in split_config(filename, chunk_lines))
+    errors = []
+    seen_keys = set()
+    num_tracks = 0
+    for result in map_chunks(chunks, workers):
+        errors.extend(result.errors)
+        for key, line, genome_name, track_name in result.keys:
+            if key in seen_keys:
+                message = 'track {}: {} already has a track with this name'.format(track_name, genome_name)
+                errors.append(ConfigError(result.filename, line, message))
+            seen_keys.add(key)
+        num_tracks += result.num_tracks
+    file_order = {filename: index for index, filename in enumerate(filenames)}
+    errors.sort(key=lambda error: (file_order[error.filename], error.line))
+    return errors, num_tracks
+
+
+def format_error(error):
+    return '{}:{}: {}'.format(error.filename, error.line, error.message)
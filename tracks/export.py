@@ -0,0 +1,121 @@
+"""
+Export of the track catalog as TSV, newline delimited JSON or trackDb.txt stanzas, optionally limited to a genome,
+transcription factors and cell types. Exports are generated in chunks of EXPORT_CHUNK_SIZE tracks read with
+QuerySet.iterator(), which uses a server-side cursor on postgres, so memory use does not grow with the catalog.
+"""
+from tracks.models import Track
+from tracks.hubfiles import get_template
+import json
+
+TSV = 'tsv'
+NDJSON = 'ndjson'
+TRACKDB = 'trackdb'
+CONTENT_TYPES = {
+    TSV: 'text/tab-separated-values; charset=utf-8',
+    NDJSON: 'application/x-ndjson; charset=utf-8',
+    TRACKDB: 'text/plain; charset=utf-8',
+}
+FILE_EXTENSIONS = {
+    TSV: 'tsv',
+    NDJSON: 'ndjson',
+    TRACKDB: 'txt',
+}
+EXPORT_FIELDS = ['id', 'genome', 'name', 'tf', 'cell_type', 'rep_name', 'file_type', 'big_data_url', 'short_label',
+                 'long_label', 'position']
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ExportError(Exception):
+    pass
+
+
+def get_export_tracks(genome_name=None, tf_names=(), cell_type_names=()):
+    tracks = Track.objects.select_related('summary', *Track.COMPACT_RELATED_FIELDS).order_by('id')
+    if genome_name:
+        tracks = tracks.filter(genome_id=genome_name)
+    if tf_names:
+        tracks = tracks.filter(tf_id__in=tf_names)
+    if cell_type_names:
+        tracks = tracks.filter(cell_type_id__in=cell_type_names)
+    return tracks
+
+
+def iterate_chunks(tracks):
+    """
+    Yield lists of up to EXPORT_CHUNK_SIZE tracks.
+    """
+    chunk = []
+    for track in tracks.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        chunk.append(track)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_export_values(track):
+    return {
+        'id': track.id,
+        'genome': track.genome_id,
+        'name': track.name,
+        'tf': track.tf_id,
+        'cell_type': track.cell_type_id,
+        'rep_name': track.rep_name_id,
+        'file_type': track.file_type,
+        'big_data_url': track.big_data_url,
+        'short_label': track.short_label,
+        'long_label': track.long_label,
+        'position': track.position,
+    }
+
+
+def format_tsv_value(value):
+    return str(value).replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def generate_tsv(tracks):
+    yield '\t'.join(EXPORT_FIELDS) + '\n'
+    for chunk in iterate_chunks(tracks):
+        lines = []
+        for track in chunk:
+            values = get_export_values(track)
+            lines.append('\t'.join(format_tsv_value(values[field]) for field in EXPORT_FIELDS) + '\n')
+        yield ''.join(lines)
+
+
+def generate_ndjson(tracks):
+    for chunk in iterate_chunks(tracks):
+        yield ''.join(json.dumps(get_export_values(track)) + '\n' for track in chunk)
+
+
+def generate_trackdb(tracks):
+    template = get_template('trackDb.txt.j2')
+    for chunk in iterate_chunks(tracks):
+        yield template.render({'tracks': chunk})
+
+
+GENERATORS = {
+    TSV: generate_tsv,
+    NDJSON: generate_ndjson,
+    TRACKDB: generate_trackdb,
+}
+
+
+def export_tracks(export_format, genome_name=None, tf_names=(), cell_type_names=()):
+    """
+    Return an iterator of the text chunks of an export. Raises ExportError for an unknown format or a trackDb
+    export without a genome, a trackDb.txt only describes the tracks of one genome.
+    """
+    if export_format not in GENERATORS:
+        raise ExportError('Unknown export format {}, choose one of {}'.format(
+            export_format, ', '.join(sorted(GENERATORS))))
+    if export_format == TRACKDB and not genome_name:
+        raise ExportError('A trackdb export needs a genome')
+    return GENERATORS[export_format](get_export_tracks(genome_name, tf_names, cell_type_names))
+
+
+def make_filename(export_format, genome_name=None):
+    if genome_name:
+        return 'tracks_{}.{}'.format(genome_name, FILE_EXTENSIONS[export_format])
+    return 'tracks.{}'.format(FILE_EXTENSIONS[export_format])
@@ -3,16 +3,28 @@ from django.conf import settings
 from django.forms.utils import ErrorList
 from django.utils.html import format_html_join, format_html, quote
 from django.shortcuts import reverse
-from tracks.models import TranscriptionFactor, CellType, Track, Genome
+from tracks.models import TranscriptionFactor, CellType, Track, Genome, get_available_tfs, \
+    get_available_cell_types
 from django.core.exceptions import ValidationError
+from tracks.hubfiles import HUB_FILENAME
+from tracks.statichubs import get_static_hub_url
+from tracks import selection
 
 FORM_CONTROL_ATTRS = {'class':'form-control', 'size':'20'}
 
 
 class FormFields(object):
+    GENOME = 'genome'
     TF_NAME = 'tf'
     CELL_TYPE = 'celltype'
     TRACK_STR = 'track_str'
+    SELECTION = 'selection'
+    QUERY = 'q'
+
+
+class ModelChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, obj):
+        return obj.name
 
 
 class ModelMultipleChoiceField(forms.ModelMultipleChoiceField):
@@ -34,59 +46,112 @@ def make_field_name_query_params(form, name):
     return [name + '=' + quote(field.pk) for field in form.cleaned_data[name]]
 
 
+def make_genome_query_params(form):
+    return [FormFields.GENOME + '=' + quote(form.cleaned_data[FormFields.GENOME].pk)]
+
+
+def add_genome_field(form):
+    """
+    Add a hidden field for the genome selected in the first step to form.
+    """
+    form.fields[FormFields.GENOME] = forms.ModelChoiceField(
+        queryset=Genome.objects.all(),
+        widget=forms.HiddenInput(),
+    )
+
+
+def get_raw_value(form, name):
+    """
+    Return the submitted or initial value of a field of form before it is cleaned, used to limit the choices of
+    other fields.
+    """
+    if form.is_bound:
+        return form.fields[name].widget.value_from_datadict(form.data, form.files, form.add_prefix(name))
+    return form.initial.get(name)
+
+
 def make_step_url(view_name, query_param_ary):
     query_params = '?' + '&'.join(query_param_ary)
     return reverse(view_name) + query_params
 
 
+def check_track_selection_limit(num_tracks, message_prefix=''):
+    """
+    Raise a ValidationError when num_tracks is over TRACK_SELECTION_LIMIT, which is a string when set from the
+    environment.
+    """
+    limit = int(settings.TRACK_SELECTION_LIMIT)
+    if num_tracks > limit:
+        raise forms.ValidationError("{}Your selection resulted in {} tracks. Max allowed is {}.".format(
+            message_prefix, num_tracks, limit))
+
+
+class GenomeForm(forms.Form):
+    def __init__(self, *args, **kwargs):
+        super(GenomeForm, self).__init__(*args, **kwargs, error_class=BootstrapErrorList)
+        self.fields[FormFields.GENOME] = ModelChoiceField(
+            queryset=Genome.objects.order_by('name'),
+            empty_label=None,
+            widget=forms.Select(attrs={'class': 'form-control'}),
+            label="Select a genome",
+        )
+
+    def next_step_url(self):
+        return make_step_url('tracks-select_factors', make_genome_query_params(self))
+
+
 class TranscriptionFactorForm(forms.Form):
     error_css_class = "invalid-feedback"
 
     def __init__(self, *args, **kwargs):
         super(TranscriptionFactorForm, self).__init__(*args, **kwargs, error_class=BootstrapErrorList)
+        add_genome_field(self)
         self.fields[FormFields.TF_NAME] = ModelMultipleChoiceField(
-            queryset=TranscriptionFactor.objects.order_by('name'),
+            queryset=get_available_tfs(get_raw_value(self, FormFields.GENOME)).order_by('name'),
             widget=forms.SelectMultiple(attrs=FORM_CONTROL_ATTRS),
             label="Select one or more transcription factors",
         )
 
     def next_step_url(self):
-        query_param_ary = make_field_name_query_params(self, FormFields.TF_NAME)
+        query_param_ary = make_genome_query_params(self)
+        query_param_ary.extend(make_field_name_query_params(self, FormFields.TF_NAME))
         return make_step_url('tracks-select_cell_type', query_param_ary)
 
 
 class CellTypeForm(forms.Form):
     def __init__(self, *args, **kwargs):
         super(CellTypeForm, self).__init__(*args, **kwargs, error_class=BootstrapErrorList)
-        self.fields[FormFields.CELL_TYPE] = ModelMultipleChoiceField(
-            queryset=CellType.objects.order_by('name'),
-            widget=forms.SelectMultiple(attrs=FORM_CONTROL_ATTRS),
-            label="Select one or more cell types",
-        )
+        add_genome_field(self)
+        genome_name = get_raw_value(self, FormFields.GENOME)
         self.fields[FormFields.TF_NAME] = ModelMultipleChoiceField(
-            queryset=TranscriptionFactor.objects.order_by('name'),
+            queryset=get_available_tfs(genome_name).order_by('name'),
             widget=forms.MultipleHiddenInput(),
             required=False,
             label="Select one or more transcription factors",
         )
+        self.fields[FormFields.CELL_TYPE] = ModelMultipleChoiceField(
+            queryset=get_available_cell_types(genome_name, get_raw_value(self, FormFields.TF_NAME) or []).order_by(
+                'name'),
+            widget=forms.SelectMultiple(attrs=FORM_CONTROL_ATTRS),
+            label="Select one or more cell types",
+        )
 
     def clean(self):
         cleaned_data = super().clean()
+        genome = cleaned_data.get(FormFields.GENOME)
         tfs = cleaned_data.get(FormFields.TF_NAME)
         cell_types = cleaned_data.get(FormFields.CELL_TYPE)
-        if tfs and cell_types:
+        if genome and tfs and cell_types:
             num_tracks = Track.objects.filter(
-                tf__name__in=cleaned_data.get(FormFields.TF_NAME),
-                cell_type__name__in=cleaned_data.get(FormFields.CELL_TYPE),
+                genome=genome,
+                tf__in=tfs,
+                cell_type__in=cell_types,
             ).count()
-            if num_tracks > settings.TRACK_SELECTION_LIMIT:
-                msg = "Too many cell types selected. Your selection resulted in {} tracks. Max allowed is {}.".format(
-                    num_tracks, settings.TRACK_SELECTION_LIMIT
-                )
-                raise forms.ValidationError(msg)
+            check_track_selection_limit(num_tracks, "Too many cell types selected. ")
 
     def next_step_url(self):
-        query_param_ary = make_field_name_query_params(self, FormFields.TF_NAME)
+        query_param_ary = make_genome_query_params(self)
+        query_param_ary.extend(make_field_name_query_params(self, FormFields.TF_NAME))
         query_param_ary.extend(make_field_name_query_params(self, FormFields.CELL_TYPE))
         return make_step_url('tracks-select_tracks', query_param_ary)
 
@@ -97,6 +162,7 @@ class TracksMultipleChoiceField(forms.MultipleChoiceField):
         if self.required and not value:
             raise ValidationError(self.error_messages['required'], code='required')
         # Validate that each value in the value list is a valid tf and cell type combination
+        pairs = []
         for val in value:
             if not ',' in val:
                 raise ValidationError(
@@ -104,50 +170,130 @@ class TracksMultipleChoiceField(forms.MultipleChoiceField):
                     code='invalid_choice',
                     params={'value': val},
                 )
-            tf, cell_type = val.split(',')
-            try:
-                TranscriptionFactor.objects.get(pk=tf)
-                CellType.objects.get(pk=cell_type)
-            except (TranscriptionFactor.DoesNotExist, CellType.DoesNotExist):
-                raise ValidationError(
-                    self.error_messages['invalid_choice'],
-                    code='invalid_choice',
-                    params={'value': val},
-                )
+            pairs.append((val, *val.split(',')))
+        if pairs:
+            # one query per model however many tracks are checked
+            tf_names = set(TranscriptionFactor.objects.filter(pk__in=[tf for _, tf, _ in pairs]).values_list(
+                'pk', flat=True))
+            cell_type_names = set(CellType.objects.filter(pk__in=[cell_type for _, _, cell_type in pairs]).values_list(
+                'pk', flat=True))
+            for val, tf, cell_type in pairs:
+                if tf not in tf_names or cell_type not in cell_type_names:
+                    raise ValidationError(
+                        self.error_messages['invalid_choice'],
+                        code='invalid_choice',
+                        params={'value': val},
+                    )
 
 
 class TracksForm(forms.Form):
+    """
+    Picks the tracks of a hub by the checked tf and cell type pairs or by a selection expression (see
+    tracks.selection), which replaces the checked pairs when given.
+    """
     def __init__(self, *args, **kwargs):
         super(TracksForm, self).__init__(*args, **kwargs, error_class=BootstrapErrorList)
+        add_genome_field(self)
         self.fields[FormFields.TRACK_STR] = TracksMultipleChoiceField(
             widget=forms.CheckboxSelectMultiple(),
+            required=False,
         )
+        self.fields[FormFields.SELECTION] = forms.CharField(
+            max_length=2000,
+            required=False,
+            widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'tf:CTCF,ELK* celltype:Adult_CD4_*'}),
+            label="Or select tracks with an expression",
+        )
+        self.tf_cell_type_pairs = []
+
+    def clean(self):
+        cleaned_data = super().clean()
+        genome = cleaned_data.get(FormFields.GENOME)
+        track_strs = cleaned_data.get(FormFields.TRACK_STR)
+        expression = cleaned_data.get(FormFields.SELECTION)
+        if not expression and not track_strs:
+            if FormFields.TRACK_STR not in self.errors:
+                self.add_error(FormFields.TRACK_STR, forms.ValidationError(
+                    self.fields[FormFields.TRACK_STR].error_messages['required'], code='required'))
+            return
+        if not genome:
+            return
+        genome_index = selection.get_genome_index(genome.name)
+        if expression:
+            try:
+                tf_cell_type_pairs = selection.expand_selection(genome.name, expression)
+            except selection.SelectionError as e:
+                self.add_error(FormFields.SELECTION, str(e))
+                return
+        else:
+            tf_cell_type_pairs = [tuple(track_str.split(',')) for track_str in track_strs]
+            for tf, cell_type in tf_cell_type_pairs:
+                if not genome_index.has_pair((tf, cell_type)):
+                    raise forms.ValidationError("There are no {} {} tracks for {}.".format(tf, cell_type, genome.name))
+        # checked against the counts of the index so too large selections never read tracks
+        check_track_selection_limit(genome_index.count_tracks(tf_cell_type_pairs))
+        self.tf_cell_type_pairs = tf_cell_type_pairs
 
     @staticmethod
-    def get_position_from_first_track(tf_cell_type_pairs):
+    def get_position_from_first_track(genome_name, tf_cell_type_pairs):
         first_tf, first_cell_type = tf_cell_type_pairs[0]
-        track = Track.objects.filter(tf__name=first_tf, cell_type__name=first_cell_type)[0]
+        track = Track.objects.filter(genome_id=genome_name, tf_id=first_tf, cell_type_id=first_cell_type)[0]
         return track.position
 
     @staticmethod
-    def get_track_ids(tf_cell_type_pairs):
+    def get_track_ids(genome_name, tf_cell_type_pairs):
+        """
+        Return the ids of the tracks of the pairs in order of the pairs, read with one query.
+        """
+        tf_names, cell_type_names = zip(*tf_cell_type_pairs)
+        tracks = Track.objects.filter(genome_id=genome_name, tf_id__in=tf_names, cell_type_id__in=cell_type_names)
+        pair_track_ids = {}
+        # sorted here, ordering by id in the query makes sqlite use the genome index instead of the pair index
+        rows = sorted(tracks.values_list('tf_id', 'cell_type_id', 'id'), key=lambda row: row[2])
+        for tf, cell_type, track_id in rows:
+            pair_track_ids.setdefault((tf, cell_type), []).append(str(track_id))
         track_ids = []
         for tf, cell_type in tf_cell_type_pairs:
-            for track in Track.objects.filter(tf__name=tf, cell_type__name=cell_type):
-                track_ids.append(str(track.id))
+            track_ids.extend(pair_track_ids.get((tf, cell_type), []))
         return track_ids
 
     def next_step_url(self, request):
-        track_strs = self.cleaned_data[FormFields.TRACK_STR]
-        tf_cell_type_pairs = [track_str.split(',') for track_str in track_strs]
-        position = self.get_position_from_first_track(tf_cell_type_pairs)
-        track_ids = self.get_track_ids(tf_cell_type_pairs)
-        encoded_key_value = '_'.join(track_ids)
-        dynamic_hub_url = request.build_absolute_uri('/tracks/{}/hub.txt'.format(encoded_key_value))
-        genome = Genome.objects.get()
-        genome_browser_url = "https://genome.ucsc.edu/cgi-bin/hgTracks?org=human&db={}&hubUrl={}".format(
-            genome.name, dynamic_hub_url
+        genome = self.cleaned_data[FormFields.GENOME]
+        tf_cell_type_pairs = self.tf_cell_type_pairs
+        position = self.get_position_from_first_track(genome.name, tf_cell_type_pairs)
+        track_ids = self.get_track_ids(genome.name, tf_cell_type_pairs)
+        return make_genome_browser_url(request, genome.name, track_ids, position)
+
+
+class SearchForm(forms.Form):
+    def __init__(self, *args, **kwargs):
+        super(SearchForm, self).__init__(*args, **kwargs, error_class=BootstrapErrorList)
+        self.fields[FormFields.GENOME] = ModelChoiceField(
+            queryset=Genome.objects.order_by('name'),
+            empty_label=None,
+            widget=forms.Select(attrs={'class': 'form-control'}),
+            label="Genome",
+        )
+        self.fields[FormFields.QUERY] = forms.CharField(
+            max_length=255,
+            widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'CTCF liver'}),
+            label="Words in the track names, labels, transcription factors or cell types",
         )
-        if position:
-            genome_browser_url += "&position={}".format(position)
-        return genome_browser_url
+
+
+def make_genome_browser_url(request, genome_name, track_ids, position):
+    """
+    Return the url that opens the Genome Browser with a hub of the tracks with track_ids.
+    """
+    encoded_key_value = '_'.join(str(track_id) for track_id in track_ids)
+    static_hub_url = get_static_hub_url(encoded_key_value)
+    if static_hub_url:
+        dynamic_hub_url = request.build_absolute_uri(static_hub_url + HUB_FILENAME)
+    else:
+        dynamic_hub_url = request.build_absolute_uri('/tracks/{}/hub.txt'.format(encoded_key_value))
+    genome_browser_url = "https://genome.ucsc.edu/cgi-bin/hgTracks?db={}&hubUrl={}".format(
+        genome_name, dynamic_hub_url
+    )
+    if position:
+        genome_browser_url += "&position={}".format(position)
+    return genome_browser_url
@@ -0,0 +1,40 @@
+"""
+Caching of rendered fragments of the wizard pages (navbar, steps and forms) in the hub cache.
+Fragments only depend on the catalog and the query parameters, so they are keyed by the catalog version and the
+normalized parameters, and are rendered without the request. The csrf token and messages stay outside fragments.
+"""
+from django.conf import settings
+from django.http import QueryDict
+from django.utils.safestring import mark_safe
+from tracks import hubcache
+
+FRAGMENT_KIND = 'fragment'
+
+
+def normalize_params(query_dict, names):
+    """
+    Return a QueryDict with the sorted unique values of names from query_dict so equivalent query strings share
+    cached fragments.
+    """
+    params = QueryDict(mutable=True)
+    for name in names:
+        params.setlist(name, sorted(set(query_dict.getlist(name))))
+    return params
+
+
+def get_fragment(parts, render_func):
+    """
+    Return the cached html fragment identified by parts, calling render_func to create it when missing.
+    """
+    cache = hubcache.get_cache()
+    version = hubcache.get_catalog_version()
+    key = hubcache.make_key(FRAGMENT_KIND, settings.WIZARD_TEMPLATE_ENGINE, *parts, version=version)
+    html = cache.get(key)
+    if html is None:
+        hubcache.hit_counter.record(FRAGMENT_KIND, hubcache.MISSES)
+        html, is_current = hubcache.render_for_version(version, render_func)
+        if is_current:
+            cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    else:
+        hubcache.hit_counter.record(FRAGMENT_KIND, hubcache.HITS)
+    return mark_safe(html)
@@ -0,0 +1,250 @@
+"""
+Caching of rendered hub files (hub.txt, genomes.txt and trackDb.txt) in a cache shared by all workers.
+Entries are keyed by the catalog version so loading tracks invalidates them. The version is also stored in the
+database, so a render that read from a read replica which has not caught up with the version is returned but not
+cached.
+Concurrent requests for the same file share a single render: within a worker through SingleFlight and across
+workers through a short lock stored in the shared cache.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+import atexit
+import hashlib
+import threading
+import time
+import uuid
+from tracks.models import CatalogVersion
+
+LOCK_SUFFIX = ':lock'
+LOCK_POLL_SECONDS = 0.05
+CATALOG_VERSION_KEY = 'tracks:catalog_version'
+STATS_KEY_FORMAT = 'tracks:stats:{}:{}'
+HITS = 'hits'
+MISSES = 'misses'
+KINDS = ['hub', 'genomes', 'trackdb', 'fragment']
+
+
+class InFlightCall(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls for the same key within this process.
+    The first caller runs the function, callers that arrive while it is running wait for and share its result.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = InFlightCall()
+                self.calls[key] = call
+        if is_leader:
+            try:
+                call.result = func()
+            except Exception as err:
+                call.error = err
+                raise
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+            if call.error:
+                raise call.error
+        return call.result
+
+
+class HitCounter(object):
+    """
+    Counts cache hits and misses per kind of hub file. Counts are added to totals in the shared cache every
+    HUB_CACHE_STATS_FLUSH_EVERY lookups so recording a lookup does not write to the shared cache.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.num_pending = 0
+
+    def record(self, kind, outcome):
+        with self.lock:
+            stats_key = STATS_KEY_FORMAT.format(kind, outcome)
+            self.pending[stats_key] = self.pending.get(stats_key, 0) + 1
+            self.num_pending += 1
+            if self.num_pending < settings.HUB_CACHE_STATS_FLUSH_EVERY:
+                return
+            pending = self.pending
+            self.pending = {}
+            self.num_pending = 0
+        self.add_to_totals(pending)
+
+    def flush(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+            self.num_pending = 0
+        self.add_to_totals(pending)
+
+    @staticmethod
+    def add_to_totals(pending):
+        cache = get_cache()
+        for stats_key, count in pending.items():
+            if not cache.add(stats_key, count, None):
+                try:
+                    cache.incr(stats_key, count)
+                except ValueError:
+                    # the total was evicted or reset after add checked for it
+                    cache.set(stats_key, count, None)
+
+
+single_flight = SingleFlight()
+hit_counter = HitCounter()
+atexit.register(hit_counter.flush)
+
+
+def get_cache():
+    return caches[settings.HUB_CACHE_ALIAS]
+
+
+def get_catalog_version():
+    """
+    Return the current catalog version, kept in the shared cache and read from the primary database when missing.
+    """
+    cache = get_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = CatalogVersion.objects.using(DEFAULT_DB_ALIAS).values_list('version', flat=True).first()
+        if version is None:
+            version = uuid.uuid4().hex
+            CatalogVersion.objects.create(version=version)
+        cache.add(CATALOG_VERSION_KEY, version, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def read_catalog_version():
+    """
+    Return the catalog version of the database reads are routed to, which is behind on a lagging replica.
+    """
+    return CatalogVersion.objects.values_list('version', flat=True).first()
+
+
+def bump_catalog_version():
+    """
+    Invalidate all cached hub files. Call after the tracks in the database change.
+    A random version is used so a version key lost from the cache can never bring back stale entries.
+    """
+    version = uuid.uuid4().hex
+    if not CatalogVersion.objects.update(version=version):
+        CatalogVersion.objects.create(version=version)
+    get_cache().set(CATALOG_VERSION_KEY, version, None)
+
+
+def make_key(kind, *parts, version=None):
+    """
+    Build a cache key for a hub file in the catalog version, the current one when not given.
+    The parts are hashed since encoded_key_values can be thousands of characters.
+    """
+    digest = hashlib.sha1('/'.join(parts).encode('utf-8')).hexdigest()
+    return 'tracks:{}:{}:{}'.format(kind, version or get_catalog_version(), digest)
+
+
+def render_for_version(version, render_func):
+    """
+    Return the body render_func renders and whether it may be cached under version: False when the reads were
+    routed to a replica that has not caught up with version yet.
+    """
+    is_current = read_catalog_version() == version
+    return render_func(), is_current
+
+
+def get_or_render(kind, parts, render_func, record_stats=True):
+    """
+    Return the cached body of the kind of hub file identified by parts, calling render_func to create it when
+    missing. Pass record_stats=False for lookups that are not user requests such as warming the cache.
+    """
+    cache = get_cache()
+    version = get_catalog_version()
+    key = make_key(kind, *parts, version=version)
+    body = cache.get(key)
+    if body is None:
+        if record_stats:
+            hit_counter.record(kind, MISSES)
+        body = single_flight.do(key, lambda: render_with_lock(
+            cache, key, lambda: render_for_version(version, render_func)))
+    elif record_stats:
+        hit_counter.record(kind, HITS)
+    return body
+
+
+def is_cached(kind, parts):
+    return get_cache().has_key(make_key(kind, *parts))
+
+
+def render_with_lock(cache, key, render_func):
+    """
+    Render and store the body for key while holding a lock in the shared cache so other workers wait for this
+    render instead of starting their own. render_func returns the body and whether it may be stored. If the lock
+    holder does not finish before the lock times out, or finishes without storing the body, we render.
+    """
+    lock_key = key + LOCK_SUFFIX
+    lock_timeout = settings.HUB_CACHE_LOCK_TIMEOUT
+    # identifies this holder, a render that outlives the lock must not release another worker's lock
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, lock_timeout):
+        try:
+            body = cache.get(key)
+            if body is None:
+                body, is_current = render_func()
+                if is_current:
+                    cache.set(key, body, settings.HUB_CACHE_TIMEOUT)
+            return body
+        finally:
+            # Django caches have no compare and delete, the window between these calls is far shorter than a
+            # render
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        body = cache.get(key)
+        if body is not None:
+            return body
+        if not cache.has_key(lock_key):
+            break
+    body, _ = render_func()
+    return body
+
+
+def get_stats():
+    """
+    Return hits, misses and hit ratio for each kind of hub file as recorded in the shared cache.
+    """
+    hit_counter.flush()
+    cache = get_cache()
+    stats = []
+    for kind in KINDS:
+        hits = cache.get(STATS_KEY_FORMAT.format(kind, HITS), 0)
+        misses = cache.get(STATS_KEY_FORMAT.format(kind, MISSES), 0)
+        lookups = hits + misses
+        stats.append({
+            'kind': kind,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / lookups if lookups else None,
+        })
+    return stats
+
+
+def reset_stats():
+    hit_counter.flush()
+    get_cache().delete_many([STATS_KEY_FORMAT.format(kind, outcome) for kind in KINDS for outcome in [HITS, MISSES]])
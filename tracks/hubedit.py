@@ -0,0 +1,116 @@
+"""
+Editing an existing hub by adding or removing transcription factors, cell types or single tracks. A hub is
+identified by the ids of its tracks, so the edited hub is the old ids with the ids of the delta added or removed.
+Each kind of change is a single query on the track indexes. Added transcription factors or cell types also read the
+transcription factors and cell types of the hub's tracks by id, and removals only look at the hub's tracks and the
+added ones.
+
+Added transcription factors get the cell types already in the hub and added cell types get its transcription
+factors. Removals are applied after additions.
+"""
+from django.conf import settings
+from tracks.models import Track
+from collections import namedtuple
+
+HubEdit = namedtuple('HubEdit', ['add_tfs', 'remove_tfs', 'add_cell_types', 'remove_cell_types', 'add_track_ids',
+                                 'remove_track_ids'])
+
+
+class HubEditError(Exception):
+    pass
+
+
+def parse_track_ids(values):
+    try:
+        return [int(value) for value in values]
+    except ValueError:
+        raise HubEditError('Track ids must be numbers')
+
+
+def decode_hub_id(encoded_key_value):
+    return parse_track_ids(encoded_key_value.split('_'))
+
+
+def make_hub_edit(params):
+    """
+    Return the HubEdit of the repeatable query params add_tf, remove_tf, add_celltype, remove_celltype, add_track
+    and remove_track.
+    """
+    return HubEdit(
+        add_tfs=params.getlist('add_tf'),
+        remove_tfs=params.getlist('remove_tf'),
+        add_cell_types=params.getlist('add_celltype'),
+        remove_cell_types=params.getlist('remove_celltype'),
+        add_track_ids=parse_track_ids(params.getlist('add_track')),
+        remove_track_ids=parse_track_ids(params.getlist('remove_track')),
+    )
+
+
+def get_hub_genome(track_ids):
+    genome_name = Track.objects.filter(pk=track_ids[0]).values_list('genome_id', flat=True).first()
+    if genome_name is None:
+        raise HubEditError('Track {} does not exist'.format(track_ids[0]))
+    return genome_name
+
+
+def get_added_track_ids(genome_name, track_ids, hub_edit):
+    tracks = Track.objects.filter(genome_id=genome_name)
+    added_ids = []
+    if hub_edit.add_tfs or hub_edit.add_cell_types:
+        pairs = Track.objects.filter(pk__in=track_ids).values_list('tf_id', 'cell_type_id').distinct()
+        tf_names = set(tf_name for tf_name, _ in pairs)
+        cell_type_names = set(cell_type_name for _, cell_type_name in pairs)
+        # sorted here, ordering by id in the query makes sqlite use the genome index instead of the pair index
+        if hub_edit.add_tfs:
+            added_ids.extend(sorted(tracks.filter(tf_id__in=hub_edit.add_tfs, cell_type_id__in=cell_type_names)
+                                    .values_list('id', flat=True)))
+        if hub_edit.add_cell_types:
+            added_ids.extend(sorted(tracks.filter(tf_id__in=tf_names, cell_type_id__in=hub_edit.add_cell_types)
+                                    .values_list('id', flat=True)))
+    if hub_edit.add_track_ids:
+        found_ids = set(tracks.filter(pk__in=hub_edit.add_track_ids).values_list('id', flat=True))
+        for track_id in hub_edit.add_track_ids:
+            if track_id not in found_ids:
+                raise HubEditError('Track {} is not a {} track'.format(track_id, genome_name))
+        added_ids.extend(hub_edit.add_track_ids)
+    return added_ids
+
+
+def get_removed_track_ids(track_ids, hub_edit):
+    """
+    Return the ids among track_ids that hub_edit removes.
+    """
+    tracks = Track.objects.filter(pk__in=track_ids)
+    removed_ids = set(hub_edit.remove_track_ids)
+    if hub_edit.remove_tfs:
+        removed_ids.update(tracks.filter(tf_id__in=hub_edit.remove_tfs).values_list('id', flat=True))
+    if hub_edit.remove_cell_types:
+        removed_ids.update(tracks.filter(cell_type_id__in=hub_edit.remove_cell_types).values_list('id', flat=True))
+    return removed_ids
+
+
+def edit_hub(encoded_key_value, hub_edit, genome_name=None):
+    """
+    Return the genome name and track ids of the hub encoded_key_value after hub_edit. The genome is looked up
+    from the first track of the hub, a genome_name given by the client must be the same. Old tracks keep their
+    order followed by the added tracks.
+    """
+    track_ids = decode_hub_id(encoded_key_value)
+    hub_genome_name = get_hub_genome(track_ids)
+    if genome_name and genome_name != hub_genome_name:
+        raise HubEditError('The hub has {} tracks, not {} tracks'.format(hub_genome_name, genome_name))
+    genome_name = hub_genome_name
+    candidate_ids = track_ids + get_added_track_ids(genome_name, track_ids, hub_edit)
+    removed_ids = get_removed_track_ids(candidate_ids, hub_edit)
+    new_track_ids = []
+    seen_ids = set()
+    for track_id in candidate_ids:
+        if track_id not in removed_ids and track_id not in seen_ids:
+            seen_ids.add(track_id)
+            new_track_ids.append(track_id)
+    if not new_track_ids:
+        raise HubEditError('The edited hub has no tracks')
+    limit = int(settings.TRACK_SELECTION_LIMIT)
+    if len(new_track_ids) > limit:
+        raise HubEditError('The edited hub has {} tracks. Max allowed is {}.'.format(len(new_track_ids), limit))
+    return genome_name, new_track_ids
@@ -0,0 +1,189 @@
+"""
+Rendering of the files UCSC reads for a track hub: hub.txt, genomes.txt and a trackDb.txt per genome.
+
+The browser draws every visible track of a hub, so with HUB_TRACKDB_GROUP_BY set a trackDb.txt of many tracks
+puts them in a composite track per transcription factor or cell type instead. The tracks of a composite have
+subgroups for the other of the two and the replicate, only the first track of each composite is visible at first.
+"""
+from django.conf import settings
+from django.core import checks
+from jinja2 import Template
+from functools import lru_cache
+from collections import namedtuple
+import os
+import re
+
+JINJA_TEMPLATE_DIR = os.path.join(settings.BASE_DIR, 'jinja2')
+HUB_FILENAME = 'hub.txt'
+GENOMES_FILENAME = 'genomes.txt'
+TRACKDB_FILENAME = 'trackDb.txt'
+
+# field the composites are made by, field of the first subgroup, its name and title in trackDb.txt
+Grouping = namedtuple('Grouping', ['field', 'subgroup_field', 'subgroup_name', 'subgroup_title'])
+TRACKDB_GROUPINGS = {
+    'tf': Grouping('tf_id', 'cell_type_id', 'cellType', 'Cell_Type'),
+    'cell_type': Grouping('cell_type_id', 'tf_id', 'tf', 'Transcription_Factor'),
+}
+
+
+@lru_cache(maxsize=None)
+def get_template(template_filename):
+    """
+    Return the compiled template, templates are compiled once per process.
+    """
+    template_path = os.path.join(JINJA_TEMPLATE_DIR, template_filename)
+    with open(template_path) as infile:
+        return Template(infile.read())
+
+
+def compile_templates():
+    """
+    Compile all hub file templates so the first hub requests do not have to. Returns the number compiled.
+    """
+    template_filenames = [filename for filename in os.listdir(JINJA_TEMPLATE_DIR) if filename.endswith('.j2')]
+    for template_filename in template_filenames:
+        get_template(template_filename)
+    return len(template_filenames)
+
+
+def trackdb_path(genome_name):
+    return '{}/{}'.format(genome_name, TRACKDB_FILENAME)
+
+
+def render_hub(hub_id):
+    template = get_template('hub.txt.j2')
+    context = {
+        'hub_id': hub_id
+    }
+    return template.render(context)
+
+
+def render_genomes(genomes):
+    template = get_template('genomes.txt.j2')
+    context = {
+        'genomes': genomes,
+    }
+    return template.render(context)
+
+
+def make_tag(value):
+    """
+    Return value with the characters not allowed in trackDb.txt names and subgroup tags replaced.
+    """
+    return re.sub(r'\W', '_', value)
+
+
+def make_tags(values):
+    """
+    Return a dict of each of values to a tag unique among them. Values whose tags would be the same, such as A-B and
+    A_B, get a counter suffix in order of the values: A_B and A_B_2.
+    """
+    tags = {}
+    used_tags = set()
+    for value in sorted(set(values)):
+        base_tag = make_tag(value)
+        tag = base_tag
+        counter = 1
+        while tag in used_tags:
+            counter += 1
+            tag = '{}_{}'.format(base_tag, counter)
+        tags[value] = tag
+        used_tags.add(tag)
+    return tags
+
+
+def make_subgroup(name, title, tags):
+    """
+    Return a subgroup for a dict of values to their tags made by make_tags.
+    """
+    return {
+        'name': name,
+        'title': title,
+        'tags': [(tags[value], tags[value]) for value in sorted(tags)],
+    }
+
+
+def group_tracks(tracks, group_by):
+    """
+    Return a list of the composite tracks grouping tracks by the TRACKDB_GROUPINGS group_by, in order of the value
+    they are grouped by.
+    """
+    grouping = TRACKDB_GROUPINGS[group_by]
+    tracks_by_value = {}
+    for track in tracks:
+        tracks_by_value.setdefault(getattr(track, grouping.field), []).append(track)
+    group_tags = make_tags(tracks_by_value.keys())
+    groups = []
+    for value, tracks in sorted(tracks_by_value.items()):
+        tracks.sort(key=lambda track: (getattr(track, grouping.subgroup_field), track.rep_name_id, track.name))
+        subgroup_tags = make_tags(getattr(track, grouping.subgroup_field) for track in tracks)
+        rep_tags = make_tags(track.rep_name_id for track in tracks)
+        items = []
+        for track in tracks:
+            items.append({
+                'track': track,
+                'is_on': not items,
+                'subgroups': '{}={} rep={}'.format(grouping.subgroup_name,
+                                                   subgroup_tags[getattr(track, grouping.subgroup_field)],
+                                                   rep_tags[track.rep_name_id]),
+            })
+        groups.append({
+            'name': 'composite_{}_{}'.format(group_by, group_tags[value]),
+            'label': value,
+            'file_type': tracks[0].file_type,
+            'subgroups': [
+                make_subgroup(grouping.subgroup_name, grouping.subgroup_title, subgroup_tags),
+                make_subgroup('rep', 'Replicate', rep_tags),
+            ],
+            'tracks': items,
+        })
+    return groups
+
+
+def check_trackdb_group_by(app_configs, **kwargs):
+    """
+    System check of HUB_TRACKDB_GROUP_BY, so an unknown value stops the server at startup instead of failing every
+    trackDb.txt request.
+    """
+    group_by = settings.HUB_TRACKDB_GROUP_BY
+    if group_by and group_by not in TRACKDB_GROUPINGS:
+        return [checks.Error('Unknown HUB_TRACKDB_GROUP_BY {}'.format(group_by),
+                             hint='Use one of {} or leave it empty.'.format(', '.join(sorted(TRACKDB_GROUPINGS))),
+                             id='tracks.E001')]
+    return []
+
+
+def render_track_db(tracks):
+    """
+    Render trackDb.txt, grouping the tracks into composite tracks when HUB_TRACKDB_GROUP_BY is set and there are
+    at least HUB_TRACKDB_GROUP_MIN_TRACKS.
+    """
+    group_by = settings.HUB_TRACKDB_GROUP_BY
+    if group_by:
+        if group_by not in TRACKDB_GROUPINGS:
+            raise ValueError('Unknown HUB_TRACKDB_GROUP_BY {}'.format(group_by))
+        tracks = list(tracks)
+        if len(tracks) >= settings.HUB_TRACKDB_GROUP_MIN_TRACKS:
+            template = get_template('trackDb_grouped.txt.j2')
+            return template.render({'groups': group_tracks(tracks, group_by)})
+    template = get_template('trackDb.txt.j2')
+    context = {
+        'tracks': tracks
+    }
+    return template.render(context)
+
+
+def render_hub_files(hub_id, tracks):
+    """
+    Render all files of a hub returning a dict of path relative to the hub directory to file contents.
+    """
+    genome_tracks = {}
+    for track in tracks:
+        genome_tracks.setdefault(track.genome, []).append(track)
+    files = {
+        HUB_FILENAME: render_hub(hub_id),
+        GENOMES_FILENAME: render_genomes(genome_tracks.keys()),
+    }
+    for genome, tracks in genome_tracks.items():
+        files[trackdb_path(genome.name)] = render_track_db(tracks)
+    return files
@@ -0,0 +1,26 @@
+"""
+Jinja2 environment for the wizard pages in tracks/jinja2/ used when WIZARD_TEMPLATE_ENGINE is 'jinja2'.
+Django creates one environment per engine and Jinja keeps the compiled templates in it, so templates are compiled
+once per worker. The globals stand in for the Django template tags the pages use.
+"""
+from django.contrib.messages import get_messages
+from django.templatetags.static import static
+from django.urls import reverse
+from bootstrap4.templatetags import bootstrap4
+from jinja2 import Environment
+
+
+def bootstrap_messages(request):
+    return bootstrap4.bootstrap_messages({'messages': get_messages(request)})
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': reverse,
+        'bootstrap_css': bootstrap4.bootstrap_css,
+        'bootstrap_javascript': bootstrap4.bootstrap_javascript,
+        'bootstrap_messages': bootstrap_messages,
+    })
+    return env
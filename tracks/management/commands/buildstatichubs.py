@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from tracks.models import Track, TranscriptionFactor, CellType
+from tracks.hubfiles import render_hub_files
+from tracks.statichubs import write_static_hub
+from concurrent.futures import ProcessPoolExecutor
+import yaml
+
+
+def read_selections_from_config(filename):
+    """
+    Read a list of selections from a yaml file. Each selection has an optional list of 'tfs' and an optional list
+    of 'cell_types', a missing list selects all of them. Example:
+    - tfs: [AR]
+    - cell_types: [8988T, A549]
+    """
+    with open(filename) as infile:
+        data = yaml.safe_load(infile) or []
+    selections = []
+    for item in data:
+        selections.append((item.get('tfs'), item.get('cell_types')))
+    return selections
+
+
+def make_selections(each_tf, each_cell_type):
+    selections = []
+    if each_tf:
+        for tf_name in TranscriptionFactor.objects.order_by('name').values_list('name', flat=True):
+            selections.append(([tf_name], None))
+    if each_cell_type:
+        for cell_type_name in CellType.objects.order_by('name').values_list('name', flat=True):
+            selections.append((None, [cell_type_name]))
+    return selections
+
+
+def get_selection_tracks(tf_names, cell_type_names):
+    tracks = Track.objects.select_related('genome', 'summary', *Track.COMPACT_RELATED_FIELDS).order_by('id')
+    if tf_names:
+        tracks = tracks.filter(tf__name__in=tf_names)
+    if cell_type_names:
+        tracks = tracks.filter(cell_type__name__in=cell_type_names)
+    if settings.HUB_EXCLUDE_DEAD_TRACKS:
+        tracks = tracks.exclude(health__is_alive=False)
+    return list(tracks)
+
+
+def build_static_hub(encoded_key_value, tracks):
+    return write_static_hub(encoded_key_value, render_hub_files(encoded_key_value, tracks))
+
+
+class Command(BaseCommand):
+    help = 'Pre-generates hub files for selections of tracks into STATIC_HUBS_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', help='YAML file listing the selections to build')
+        parser.add_argument('--each-tf', action='store_true',
+                            help='Build a hub for each transcription factor across all cell types')
+        parser.add_argument('--each-cell-type', action='store_true',
+                            help='Build a hub for each cell type across all transcription factors')
+        parser.add_argument('--max-tracks', type=int, default=int(settings.TRACK_SELECTION_LIMIT),
+                            help='Skip selections with more tracks than this')
+        parser.add_argument('--processes', type=int, default=None, help='Number of processes rendering hubs')
+
+    def handle(self, *args, **options):
+        selections = make_selections(options['each_tf'], options['each_cell_type'])
+        if options['config']:
+            selections.extend(read_selections_from_config(options['config']))
+        if not selections:
+            raise CommandError("Specify --config, --each-tf or --each-cell-type.")
+        hubs = {}
+        for tf_names, cell_type_names in selections:
+            tracks = get_selection_tracks(tf_names, cell_type_names)
+            if not tracks:
+                continue
+            if len(tracks) > options['max_tracks']:
+                self.stdout.write("Skipping selection tfs={} cell_types={} with {} tracks.".format(
+                    tf_names, cell_type_names, len(tracks)))
+                continue
+            encoded_key_value = '_'.join(str(track.id) for track in tracks)
+            hubs[encoded_key_value] = tracks
+        # tracks are fetched up front so the worker processes only render and write files without using the database
+        with ProcessPoolExecutor(max_workers=options['processes']) as executor:
+            hub_dirs = list(executor.map(build_static_hub, hubs.keys(), hubs.values()))
+        self.stdout.write("Built {} static hubs in {}.".format(len(hub_dirs), settings.STATIC_HUBS_ROOT))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from tracks.models import Track, TrackHealth, big_data_url_expression
+from tracks.urlcheck import check_urls, is_alive
+from tracks import hubcache
+from tracks.statichubs import clear_static_hubs
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Checks that the big_data_url of every track can be downloaded and stores the results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50, help='Maximum requests in flight')
+        parser.add_argument('--per-host', type=int, default=6, help='Maximum connections to each host')
+        parser.add_argument('--retries', type=int, default=2, help='Retries after a connection error or 5xx')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for each response')
+
+    def handle(self, *args, **options):
+        tracks = list(Track.objects.annotate(url=big_data_url_expression()).order_by('id').values_list('id', 'url'))
+        urls = sorted(set(url for _, url in tracks))
+        results = check_urls(urls, concurrency=options['concurrency'], per_host=options['per_host'],
+                             retries=options['retries'], timeout=options['timeout'])
+        url_results = {result.url: result for result in results}
+        checked = timezone.now()
+        health_items = []
+        for track_id, url in tracks:
+            result = url_results[url]
+            health_items.append(TrackHealth(
+                track_id=track_id,
+                is_alive=is_alive(result),
+                status=result.status,
+                size=result.size,
+                last_modified=result.last_modified,
+                latency=result.latency,
+                error=result.error[:255],
+                checked=checked,
+            ))
+        with transaction.atomic():
+            TrackHealth.objects.all().delete()
+            TrackHealth.objects.bulk_create(health_items, batch_size=BATCH_SIZE)
+        # hubs may leave out dead tracks so cached hub files are out of date
+        hubcache.bump_catalog_version()
+        clear_static_hubs()
+        num_dead = len([item for item in health_items if not item.is_alive])
+        self.stdout.write("Checked {} tracks, {} dead.".format(len(health_items), num_dead))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from tracks.catalog import build_snapshot_from_database
+
+
+class Command(BaseCommand):
+    help = 'Writes the track catalog in the database to a binary snapshot file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('filename')
+
+    def handle(self, *args, **options):
+        snapshot = build_snapshot_from_database()
+        with open(options['filename'], 'wb') as outfile:
+            outfile.write(snapshot)
+        self.stdout.write("Wrote {} bytes to {}.".format(len(snapshot), options['filename']))
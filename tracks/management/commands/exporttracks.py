@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from tracks import export
+
+
+class Command(BaseCommand):
+    help = 'Writes the track catalog as TSV, newline delimited JSON or trackDb.txt stanzas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', default=export.TSV, choices=sorted(export.GENERATORS),
+                            help='Output format (default %(default)s)')
+        parser.add_argument('--genome', help='Only export tracks of this genome, required for trackdb')
+        parser.add_argument('--tf', action='append', default=[], help='Only export tracks of this transcription '
+                                                                      'factor, may be repeated')
+        parser.add_argument('--cell-type', action='append', default=[], help='Only export tracks of this cell '
+                                                                             'type, may be repeated')
+        parser.add_argument('--output', help='File to write, standard output when not given')
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export.export_tracks(options['format'], options.get('genome'), options.get('tf', []),
+                                          options.get('cell_type', []))
+        except export.ExportError as e:
+            raise CommandError(str(e))
+        if options.get('output'):
+            with open(options['output'], 'w') as outfile:
+                for chunk in chunks:
+                    outfile.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
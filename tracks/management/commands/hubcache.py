@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from tracks import hubcache
+
+
+def format_ratio(ratio):
+    if ratio is None:
+        return '-'
+    return '{:.1%}'.format(ratio)
+
+
+class Command(BaseCommand):
+    help = 'Shows hit ratios and size of the shared hub file cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Remove all cached hub files')
+        parser.add_argument('--reset-stats', action='store_true', help='Reset hit and miss counts')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            hubcache.bump_catalog_version()
+            hubcache.get_cache().clear()
+            self.stdout.write("Cleared hub cache.")
+        if options['reset_stats']:
+            hubcache.reset_stats()
+            self.stdout.write("Reset hub cache stats.")
+        self.stdout.write("Catalog version: {}".format(hubcache.get_catalog_version()))
+        self.stdout.write("{:<10}{:>12}{:>12}{:>12}".format('file', 'hits', 'misses', 'hit ratio'))
+        total_hits = total_misses = 0
+        for row in hubcache.get_stats():
+            self.stdout.write("{:<10}{:>12}{:>12}{:>12}".format(
+                row['kind'], row['hits'], row['misses'], format_ratio(row['hit_ratio'])))
+            total_hits += row['hits']
+            total_misses += row['misses']
+        total_lookups = total_hits + total_misses
+        total_ratio = total_hits / total_lookups if total_lookups else None
+        self.stdout.write("{:<10}{:>12}{:>12}{:>12}".format('total', total_hits, total_misses,
+                                                            format_ratio(total_ratio)))
+        cache = hubcache.get_cache()
+        if hasattr(cache, 'usage'):
+            num_entries, num_bytes = cache.usage()
+            self.stdout.write("Entries: {} using {} bytes".format(num_entries, num_bytes))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tracks.models import Track
+from tracks.catalog import Catalog, CatalogError, load_catalog_into_database, delete_catalog_from_database
+from tracks import hubcache
+from tracks.statichubs import clear_static_hubs
+
+
+class Command(BaseCommand):
+    help = 'Loads the track catalog from a binary snapshot file written by dumpcatalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('filename')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete the tracks already in the database (and their health and summaries) first')
+
+    def handle(self, *args, **options):
+        try:
+            catalog = Catalog.from_file(options['filename'])
+        except CatalogError as err:
+            raise CommandError(str(err))
+        try:
+            # the old tracks are only deleted if the new ones load
+            with transaction.atomic():
+                if Track.objects.exists():
+                    if not options['replace']:
+                        raise CommandError("The database already has tracks, use --replace to delete them.")
+                    delete_catalog_from_database()
+                load_catalog_into_database(catalog)
+        finally:
+            catalog.close()
+        hubcache.bump_catalog_version()
+        clear_static_hubs()
+        self.stdout.write("Loaded {} tracks.".format(len(catalog)))
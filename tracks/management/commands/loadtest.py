@@ -0,0 +1,177 @@
+from django.core.management.base import BaseCommand, CommandError
+from tracks.models import Track
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+from urllib.error import URLError
+from http.client import HTTPException
+import random
+import socket
+import subprocess
+import time
+
+HUB_ENDPOINT = 'hub.txt'
+GENOMES_ENDPOINT = 'genomes.txt'
+TRACKDB_ENDPOINT = 'trackDb.txt'
+ENDPOINTS = [HUB_ENDPOINT, GENOMES_ENDPOINT, TRACKDB_ENDPOINT]
+SERVER_START_TIMEOUT = 30
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list of values.
+    """
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values))), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def make_hub_keys(num_hubs, tracks_per_hub, seed=0):
+    """
+    Build encoded_key_values for random selections of tracks from the database.
+    """
+    track_ids = list(Track.objects.order_by('id').values_list('id', flat=True))
+    if not track_ids:
+        raise CommandError("No tracks loaded. Run loadtracks first or pass --hub.")
+    rand = random.Random(seed)
+    hub_keys = []
+    for _ in range(num_hubs):
+        selected = sorted(rand.sample(track_ids, min(tracks_per_hub, len(track_ids))))
+        hub_keys.append('_'.join(str(track_id) for track_id in selected))
+    return hub_keys
+
+
+def fetch(url, timeout):
+    """
+    GET url returning (body, seconds, error message).
+    """
+    start = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            body = response.read()
+        return body, time.perf_counter() - start, None
+    except (URLError, OSError, HTTPException) as err:
+        # a connection dropped mid-body raises IncompleteRead or RemoteDisconnected
+        return b'', time.perf_counter() - start, str(err)
+
+
+def parse_trackdb_paths(genomes_body):
+    return [line.split(' ', 1)[1].strip() for line in genomes_body.decode('utf-8').splitlines()
+            if line.startswith('trackDb ')]
+
+
+class GenomeBrowserReplay(object):
+    """
+    Replays the requests UCSC makes when a user opens a hub: hub.txt, then genomes.txt, then each trackDb.txt
+    listed in genomes.txt. Each visit is repeated since UCSC and its mirrors re-fetch the same files.
+    """
+    def __init__(self, base_url, hub_keys, repeat, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.hub_keys = hub_keys
+        self.repeat = repeat
+        self.timeout = timeout
+
+    def visits(self):
+        for _ in range(self.repeat):
+            for hub_key in self.hub_keys:
+                yield hub_key
+
+    def visit(self, hub_key):
+        results = []
+        hub_url = '{}/tracks/{}/'.format(self.base_url, hub_key)
+        for endpoint in [HUB_ENDPOINT, GENOMES_ENDPOINT]:
+            body, seconds, error = fetch(hub_url + endpoint, self.timeout)
+            results.append((endpoint, seconds, error))
+        if not error:
+            for trackdb_path in parse_trackdb_paths(body):
+                _, seconds, error = fetch(hub_url + trackdb_path, self.timeout)
+                results.append((TRACKDB_ENDPOINT, seconds, error))
+        return results
+
+    def run(self, concurrency):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            visit_results = list(executor.map(self.visit, self.visits()))
+        elapsed = time.perf_counter() - start
+        return [result for results in visit_results for result in results], elapsed
+
+
+def summarize(results, elapsed):
+    """
+    Per endpoint request count, error count, latency percentiles (ms) and throughput (requests/second).
+    """
+    summary = []
+    for endpoint in ENDPOINTS:
+        latencies = sorted(seconds * 1000 for name, seconds, error in results if name == endpoint and not error)
+        errors = len([name for name, seconds, error in results if name == endpoint and error])
+        summary.append({
+            'endpoint': endpoint,
+            'requests': len(latencies) + errors,
+            'errors': errors,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'throughput': (len(latencies) + errors) / elapsed if elapsed else 0.0,
+        })
+    return summary
+
+
+def format_ms(value):
+    if value is None:
+        return '-'
+    return '{:.1f}'.format(value)
+
+
+class Command(BaseCommand):
+    help = 'Replays Genome Browser hub traffic against a running server and reports latency per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base url of the server to test')
+        parser.add_argument('--start-server', action='store_true',
+                            help='Start gunicorn running topdata.wsgi on the host and port from --url')
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn workers used with --start-server')
+        parser.add_argument('--hub', action='append', dest='hubs', default=[],
+                            help='encoded_key_value of a hub to request (may be repeated)')
+        parser.add_argument('--num-hubs', type=int, default=10, help='Hubs to generate when --hub is not used')
+        parser.add_argument('--tracks-per-hub', type=int, default=20, help='Tracks in each generated hub')
+        parser.add_argument('--concurrency', type=int, default=10, help='Number of simultaneous hub visits')
+        parser.add_argument('--repeat', type=int, default=5, help='Times each hub is visited')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for each response')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed used to generate hubs')
+
+    def handle(self, *args, **options):
+        hub_keys = options['hubs'] or make_hub_keys(options['num_hubs'], options['tracks_per_hub'], options['seed'])
+        server = None
+        if options['start_server']:
+            server = self.start_server(options['url'], options['workers'])
+        try:
+            replay = GenomeBrowserReplay(options['url'], hub_keys, options['repeat'], options['timeout'])
+            results, elapsed = replay.run(options['concurrency'])
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+        self.report(summarize(results, elapsed), elapsed)
+
+    def start_server(self, url, workers):
+        bind = url.split('://', 1)[-1].rstrip('/')
+        host, port = bind.rsplit(':', 1)
+        server = subprocess.Popen(['gunicorn', 'topdata.wsgi', '--bind', bind, '--workers', str(workers)])
+        deadline = time.time() + SERVER_START_TIMEOUT
+        while time.time() < deadline:
+            try:
+                socket.create_connection((host, int(port)), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError("Gunicorn did not start listening on {}".format(bind))
+
+    def report(self, summary, elapsed):
+        self.stdout.write("{:<14}{:>10}{:>8}{:>10}{:>10}{:>10}{:>12}".format(
+            'endpoint', 'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s'))
+        for row in summary:
+            self.stdout.write("{:<14}{:>10}{:>8}{:>10}{:>10}{:>10}{:>12.1f}".format(
+                row['endpoint'], row['requests'], row['errors'],
+                format_ms(row['p50']), format_ms(row['p95']), format_ms(row['p99']), row['throughput']))
+        self.stdout.write("Elapsed {:.2f} seconds".format(elapsed))
@@ -1,12 +1,45 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from tracks.models import Genome, Track, TranscriptionFactor, CellType, RepName
+from django.db import transaction, IntegrityError
+from tracks.models import Genome, Track, TranscriptionFactor, CellType, RepName, compact_tracks, \
+    IN_QUERY_BATCH_SIZE
+from tracks import hubcache, search
+from tracks.configcheck import YAML_LOADER, check_configs, check_track, format_error
+from tracks.statichubs import clear_static_hubs
+from tracks.prewarm import warm_from_settings
+from tracks.management.commands.warmhubcache import format_report
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import os
 import yaml
 
+# name of the dimension model each track_dict key refers to
+DIMENSION_KEYS = [('genome_name', Genome), ('tf_name', TranscriptionFactor), ('cell_type', CellType),
+                  ('rep_name', RepName)]
+# invalid tracks listed in the error raised by check_track_dicts
+MAX_REPORTED_ERRORS = 10
+
+
+def expand_filenames(patterns):
+    """
+    Return the files matching glob patterns, other patterns are kept as filenames.
+    """
+    filenames = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise CommandError("No files match {}".format(pattern))
+            filenames.extend(matches)
+        else:
+            filenames.append(pattern)
+    return filenames
+
 
 def read_tracks_from_config(filename):
     tracks = []
     with open(filename) as infile:
-        data = yaml.safe_load(infile)
+        data = yaml.load(infile, Loader=YAML_LOADER)
         for genome in data:
             for track_data in genome['tracks']:
                 track_dict = track_data.copy()
@@ -15,30 +48,162 @@ def read_tracks_from_config(filename):
     return tracks
 
 
+def read_tracks_from_configs(filenames, workers):
+    """
+    Return the track_dicts of all files in order of filenames, parsing up to workers files at once in other
+    processes. Raises CommandError when two tracks have the same genome and name.
+    """
+    if workers > 1 and len(filenames) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(filenames))) as executor:
+            file_tracks = list(executor.map(read_tracks_from_config, filenames))
+    else:
+        file_tracks = [read_tracks_from_config(filename) for filename in filenames]
+    track_dicts = []
+    track_filenames = {}
+    for filename, tracks in zip(filenames, file_tracks):
+        for track_dict in tracks:
+            track_dicts.append(track_dict)
+            if not track_dict.get('track'):
+                # reported by check_track_dicts
+                continue
+            key = (track_dict['genome_name'], track_dict['track'])
+            if key in track_filenames:
+                raise CommandError("Track {} of {} is in {} and {}".format(key[1], key[0], track_filenames[key],
+                                                                          filename))
+            track_filenames[key] = filename
+    return track_dicts
+
+
+def find_track_ids(keys):
+    """
+    Return a dict of the (genome name, track name) keys of tracks in the database to their ids.
+    """
+    names_by_genome = {}
+    for genome_name, name in keys:
+        names_by_genome.setdefault(genome_name, []).append(name)
+    track_ids = {}
+    for genome_name, names in names_by_genome.items():
+        for start in range(0, len(names), IN_QUERY_BATCH_SIZE):
+            tracks = Track.objects.filter(genome_id=genome_name, name__in=names[start:start + IN_QUERY_BATCH_SIZE])
+            for name, track_id in tracks.values_list('name', 'id'):
+                track_ids[(genome_name, name)] = track_id
+    return track_ids
+
+
+def check_track_dicts(track_dicts):
+    """
+    Raise CommandError when a track could not be saved, because it is invalid or its genome already has a track
+    with its name, so nothing is written for an invalid file.
+    """
+    errors = []
+    for track_dict in track_dicts:
+        for _, message in check_track(track_dict):
+            errors.append('track {} of {}: {}'.format(track_dict.get('track'), track_dict['genome_name'], message))
+    if not errors:
+        existing_ids = find_track_ids((track_dict['genome_name'], track_dict['track']) for track_dict in track_dicts)
+        for track_dict in track_dicts:
+            if (track_dict['genome_name'], track_dict['track']) in existing_ids:
+                errors.append('track {} of {}: {} already has a track with this name'.format(
+                    track_dict['track'], track_dict['genome_name'], track_dict['genome_name']))
+    if errors:
+        raise CommandError("{} errors, run loadtracks --check for their line numbers:\n{}".format(
+            len(errors), '\n'.join(errors[:MAX_REPORTED_ERRORS])))
+
+
+def create_dimensions(track_dicts):
+    """
+    Create the genomes, transcription factors, cell types and replicate names of all files at once.
+    Names are primary keys so files naming the same cell type share it and names already loaded are kept.
+    """
+    for key, model in DIMENSION_KEYS:
+        names = sorted(set(track_dict[key] for track_dict in track_dicts))
+        model.objects.bulk_create([model(name=name) for name in names], ignore_conflicts=True)
+
+
+def make_track(track_dict):
+    return Track(
+        genome_id=track_dict['genome_name'],
+        name=track_dict['track'],
+        file_type=track_dict['type'],
+        short_label=track_dict['shortLabel'],
+        long_label=track_dict['longLabel'],
+        big_data_url=track_dict['bigDataUrl'],
+        tf_id=track_dict['tf_name'],
+        cell_type_id=track_dict['cell_type'],
+        rep_name_id=track_dict['rep_name'],
+        position=track_dict.get('position', ''),
+    )
+
+
+def insert_tracks(tracks):
+    """
+    Bulk insert tracks, returning their ids.
+    """
+    compact_tracks(tracks)
+    Track.objects.bulk_create(tracks)
+    if all(track.id for track in tracks):
+        return [track.id for track in tracks]
+    # only some databases return the ids of bulk inserted rows, (genome, name) is unique
+    track_ids = find_track_ids((track.genome_id, track.name) for track in tracks)
+    return [track_ids[(track.genome_id, track.name)] for track in tracks]
+
+
+def save_tracks(track_dicts, batch_size):
+    """
+    Save tracks committing every batch_size tracks so the write lock is released between batches, yielding the
+    number of tracks of each committed batch. Each batch adds its tracks to the search index.
+    """
+    create_dimensions(track_dicts)
+    for start in range(0, len(track_dicts), batch_size):
+        batch = track_dicts[start:start + batch_size]
+        with transaction.atomic():
+            track_ids = insert_tracks([make_track(track_dict) for track_dict in batch])
+            search.index_tracks(track_ids)
+        yield len(batch)
+
+
 class Command(BaseCommand):
     help = 'Loads data into the database'
 
     def add_arguments(self, parser):
-        parser.add_argument('filename')
+        parser.add_argument('filenames', nargs='+', metavar='filename',
+                            help='tracks.yaml files or glob patterns such as "catalog/*.yaml"')
+        parser.add_argument('--batch-size', type=int, default=settings.LOADTRACKS_BATCH_SIZE,
+                            help='Tracks saved per transaction (default %(default)s)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes parsing files at once (default %(default)s)')
+        parser.add_argument('--check', action='store_true',
+                            help='Only check the files, listing every error with its line number')
 
     def handle(self, *args, **options):
-        filename = options['filename']
-        for track_dict in read_tracks_from_config(filename):
-            genome_name = track_dict['genome_name']
-            genome, _ = Genome.objects.get_or_create(name=genome_name)
-            tf, _ = TranscriptionFactor.objects.get_or_create(name=track_dict['tf_name'])
-            cell_type, _ = CellType.objects.get_or_create(name=track_dict['cell_type'])
-            rep_name, _ = RepName.objects.get_or_create(name=track_dict['rep_name'])
-            position = track_dict.get('position', '')
-            Track.objects.create(
-                genome=genome,
-                name=track_dict['track'],
-                file_type=track_dict['type'],
-                short_label=track_dict['shortLabel'],
-                long_label=track_dict['longLabel'],
-                big_data_url=track_dict['bigDataUrl'],
-                tf=tf,
-                cell_type=cell_type,
-                rep_name=rep_name,
-                position=position,
-            )
+        filenames = expand_filenames(options['filenames'])
+        batch_size = options.get('batch_size') or settings.LOADTRACKS_BATCH_SIZE
+        workers = options.get('workers') or os.cpu_count() or 1
+        if options.get('check'):
+            self.check_files(filenames, workers)
+            return
+        track_dicts = read_tracks_from_configs(filenames, workers)
+        check_track_dicts(track_dicts)
+        num_saved = 0
+        try:
+            for num_batch_tracks in save_tracks(track_dicts, batch_size):
+                num_saved += num_batch_tracks
+        except IntegrityError as e:
+            # a track saved by someone else after check_track_dicts
+            raise CommandError("Saved {} of {} tracks: {}".format(num_saved, len(track_dicts), e))
+        finally:
+            # hub files must not keep serving the old catalog once any batch is committed
+            if num_saved:
+                hubcache.bump_catalog_version()
+                clear_static_hubs()
+        report = warm_from_settings()
+        if report:
+            self.stdout.write(format_report(report))
+
+    def check_files(self, filenames, workers):
+        errors, num_tracks = check_configs(filenames, workers)
+        for error in errors:
+            self.stdout.write(format_error(error))
+        if errors:
+            raise CommandError("{} errors in {} tracks".format(len(errors), num_tracks))
+        self.stdout.write("{} tracks in {} files are valid".format(num_tracks, len(filenames)))
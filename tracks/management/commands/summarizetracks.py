@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tracks.models import Track, TrackSummary, big_data_url_expression, IN_QUERY_BATCH_SIZE
+from tracks.urlcheck import UrlChecker, UrlCheckError
+from tracks.bigwig import read_summary, BigWigError
+from tracks import hubcache
+from tracks.statichubs import clear_static_hubs
+import asyncio
+
+BIGWIG_FILE_TYPE = 'bigWig'
+BATCH_SIZE = 1000
+
+
+async def read_summaries(urls, checker):
+    """
+    Return a dict of url to Summary for urls that could be summarized and a dict of url to error for the rest.
+    """
+    async def read_url_summary(url):
+        try:
+            return url, await read_summary(checker, url), None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, UrlCheckError, BigWigError) as err:
+            return url, None, str(err) or err.__class__.__name__
+    summaries = {}
+    errors = {}
+    for url, summary, error in await asyncio.gather(*[read_url_summary(url) for url in urls]):
+        if summary:
+            summaries[url] = summary
+        else:
+            errors[url] = error
+    return summaries, errors
+
+
+class Command(BaseCommand):
+    help = 'Reads min/max/mean of each bigWig track with range requests for the header and summary blocks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50, help='Maximum requests in flight')
+        parser.add_argument('--per-host', type=int, default=6, help='Maximum connections to each host')
+        parser.add_argument('--retries', type=int, default=2, help='Retries after a connection error or 5xx')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for each response')
+        parser.add_argument('--missing-only', action='store_true', help='Only summarize tracks without a summary')
+
+    def handle(self, *args, **options):
+        track_queryset = Track.objects.filter(file_type=BIGWIG_FILE_TYPE)
+        if options['missing_only']:
+            track_queryset = track_queryset.filter(summary__isnull=True)
+        tracks = list(track_queryset.annotate(url=big_data_url_expression()).order_by('id').values_list('id', 'url'))
+        checker = UrlChecker(concurrency=options['concurrency'], per_host=options['per_host'],
+                             retries=options['retries'], timeout=options['timeout'])
+        summaries, errors = asyncio.run(read_summaries(sorted(set(url for _, url in tracks)), checker))
+        summary_items = []
+        for track_id, url in tracks:
+            summary = summaries.get(url)
+            if summary:
+                summary_items.append(TrackSummary(
+                    track_id=track_id,
+                    bases_covered=summary.bases_covered,
+                    min_value=summary.min_value,
+                    max_value=summary.max_value,
+                    mean_value=summary.sum_data / summary.bases_covered if summary.bases_covered else 0.0,
+                ))
+        # tracks that could not be read this time keep the summary they have
+        summarized_ids = [summary.track_id for summary in summary_items]
+        with transaction.atomic():
+            for start in range(0, len(summarized_ids), IN_QUERY_BATCH_SIZE):
+                TrackSummary.objects.filter(track_id__in=summarized_ids[start:start + IN_QUERY_BATCH_SIZE]).delete()
+            TrackSummary.objects.bulk_create(summary_items, batch_size=BATCH_SIZE)
+        # trackDb files include the view limits from summaries
+        hubcache.bump_catalog_version()
+        clear_static_hubs()
+        for url, error in sorted(errors.items()):
+            self.stderr.write("Unable to summarize {}: {}".format(url, error))
+        self.stdout.write("Summarized {} of {} tracks.".format(len(summary_items), len(tracks)))
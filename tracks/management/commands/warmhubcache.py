@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from tracks.management.commands.hubcache import format_ratio
+from tracks.prewarm import expand_log_paths, warm_from_logs
+
+
+def format_report(report):
+    lines = [
+        "Read {} hub file requests.".format(report.num_requests),
+        "Warmed {} files of {} hubs in {:.1f}s{}.".format(
+            report.num_files, report.num_hubs, report.elapsed, ' (time limit reached)' if report.timed_out else ''),
+        "Expected hit ratio for the logged requests: {} before, {} after.".format(
+            format_ratio(report.hit_ratio_before), format_ratio(report.hit_ratio_after)),
+    ]
+    return '\n'.join(lines)
+
+
+class Command(BaseCommand):
+    help = 'Renders the hubs requested most often in access logs into the hub file cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='*',
+                            help='Access log paths or glob patterns, defaults to HUB_CACHE_WARM_LOGS')
+        parser.add_argument('--top', type=int, default=settings.HUB_CACHE_WARM_TOP,
+                            help='Number of hubs to warm')
+        parser.add_argument('--time-limit', type=float, default=settings.HUB_CACHE_WARM_TIME_LIMIT,
+                            help='Stop warming after this many seconds')
+
+    def handle(self, *args, **options):
+        logs = options['logs'] or settings.HUB_CACHE_WARM_LOGS
+        if not expand_log_paths(logs):
+            raise CommandError("No access logs found.")
+        report = warm_from_logs(logs, options['top'], options['time_limit'])
+        self.stdout.write(format_report(report))
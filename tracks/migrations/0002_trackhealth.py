@@ -0,0 +1,27 @@
+# Generated by Django 2.2.13 on 2026-10-19 11:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackHealth',
+            fields=[
+                ('track', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='health', serialize=False, to='tracks.Track')),
+                ('is_alive', models.BooleanField(help_text='True when big_data_url responded with a successful status')),
+                ('status', models.IntegerField(help_text='HTTP status code, empty when no response was received', null=True)),
+                ('size', models.BigIntegerField(help_text='Size of the file in bytes', null=True)),
+                ('last_modified', models.CharField(blank=True, help_text='Last-Modified header of the file', max_length=255)),
+                ('latency', models.FloatField(help_text='Seconds taken to respond', null=True)),
+                ('error', models.CharField(blank=True, help_text='Reason no response was received', max_length=255)),
+                ('checked', models.DateTimeField(help_text='When big_data_url was checked')),
+            ],
+        ),
+    ]
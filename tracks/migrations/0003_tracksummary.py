@@ -0,0 +1,24 @@
+# Generated by Django 2.2.13 on 2026-10-19 11:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0002_trackhealth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackSummary',
+            fields=[
+                ('track', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='tracks.Track')),
+                ('bases_covered', models.BigIntegerField(help_text='Number of bases with data')),
+                ('min_value', models.FloatField(help_text='Minimum value')),
+                ('max_value', models.FloatField(help_text='Maximum value')),
+                ('mean_value', models.FloatField(help_text='Mean value over bases with data')),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.13 on 2026-10-19 12:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0003_tracksummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelFormat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('template', models.CharField(help_text='Label with placeholders', max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UrlPrefix',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(help_text='Start of big_data_url', max_length=1000, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='long_label_format',
+            field=models.ForeignKey(help_text='Format of the long label used in trackDb.txt', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracks.LabelFormat'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='short_label_format',
+            field=models.ForeignKey(help_text='Format of the short label used in trackDb.txt', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracks.LabelFormat'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='url_prefix',
+            field=models.ForeignKey(help_text='Start of big_data_url', null=True, on_delete=django.db.models.deletion.PROTECT, to='tracks.UrlPrefix'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='url_suffix',
+            field=models.CharField(default='', help_text='Rest of big_data_url after url_prefix', max_length=1000),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,122 @@
+from django.db import migrations
+import re
+
+# tracks/compact.py as it was when this migration was written
+LABEL_NAME_KEYS = ['tf', 'cell_type', 'rep_name']
+NAME_BOUNDARY_PATTERN = '(?<![A-Za-z0-9])({})(?![A-Za-z0-9])'
+
+
+def split_big_data_url(url, names):
+    """
+    Return (prefix, suffix) for url. The prefix ends before the first path segment that is one of names (a track's
+    tf, cell type or replicate name), or after the last '/' when there is no such segment.
+    """
+    path_start = url.find('/', url.find('://') + 3 if '://' in url else 0)
+    if path_start == -1:
+        return url, ''
+    segment_start = path_start + 1
+    while True:
+        segment_end = url.find('/', segment_start)
+        if segment_end == -1:
+            break
+        if url[segment_start:segment_end] in names:
+            return url[:segment_start], url[segment_start:]
+        segment_start = segment_end + 1
+    return url[:segment_start], url[segment_start:]
+
+
+def escape_braces(text):
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def make_label_format(label, names):
+    """
+    Return a format for label replacing whole word occurrences of the values of names (a dict of LABEL_NAME_KEYS
+    to names) with placeholders. Example: 'AR 8988T rep1' becomes '{tf} {cell_type} {rep_name}'.
+    """
+    keys_by_value = {}
+    for key in LABEL_NAME_KEYS:
+        if names.get(key):
+            keys_by_value.setdefault(names[key], key)
+    if not keys_by_value:
+        return escape_braces(label)
+    values = sorted(keys_by_value.keys(), key=len, reverse=True)
+    pattern = NAME_BOUNDARY_PATTERN.format('|'.join(re.escape(value) for value in values))
+    pieces = re.split(pattern, label)
+    # re.split alternates between the text around matches and the matched names
+    label_format = ''.join(escape_braces(piece) if i % 2 == 0 else '{' + keys_by_value[piece] + '}'
+                           for i, piece in enumerate(pieces))
+    if format_label(label_format, names) != label:
+        return escape_braces(label)
+    return label_format
+
+
+def format_label(label_format, names):
+    return label_format.format(**names)
+
+
+# tracks read and updated at a time so memory use does not grow with the track table
+CHUNK_SIZE = 1000
+
+
+def iterate_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of up to chunk_size tracks of queryset, streamed from the database.
+    """
+    chunk = []
+    for track in queryset.order_by('id').iterator(chunk_size=chunk_size):
+        chunk.append(track)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_or_create(model, cache, **kwargs):
+    key = tuple(kwargs.values())
+    if key not in cache:
+        cache[key], _ = model.objects.get_or_create(**kwargs)
+    return cache[key]
+
+
+def compact_tracks(apps, schema_editor):
+    Track = apps.get_model('tracks', 'Track')
+    UrlPrefix = apps.get_model('tracks', 'UrlPrefix')
+    LabelFormat = apps.get_model('tracks', 'LabelFormat')
+    url_prefixes = {}
+    label_formats = {}
+    for tracks in iterate_chunks(Track.objects.all()):
+        for track in tracks:
+            names = {'tf': track.tf_id, 'cell_type': track.cell_type_id, 'rep_name': track.rep_name_id}
+            prefix, track.url_suffix = split_big_data_url(track.big_data_url, names.values())
+            track.url_prefix = get_or_create(UrlPrefix, url_prefixes, prefix=prefix)
+            track.short_label_format = get_or_create(LabelFormat, label_formats,
+                                                     template=make_label_format(track.short_label, names))
+            track.long_label_format = get_or_create(LabelFormat, label_formats,
+                                                    template=make_label_format(track.long_label, names))
+        Track.objects.bulk_update(tracks, ['url_prefix', 'url_suffix', 'short_label_format', 'long_label_format'],
+                                  batch_size=100)
+
+
+def expand_tracks(apps, schema_editor):
+    Track = apps.get_model('tracks', 'Track')
+    queryset = Track.objects.select_related('url_prefix', 'short_label_format', 'long_label_format')
+    for tracks in iterate_chunks(queryset):
+        for track in tracks:
+            names = {'tf': track.tf_id, 'cell_type': track.cell_type_id, 'rep_name': track.rep_name_id}
+            track.big_data_url = track.url_prefix.prefix + track.url_suffix
+            track.short_label = format_label(track.short_label_format.template, names)
+            track.long_label = format_label(track.long_label_format.template, names)
+        Track.objects.bulk_update(tracks, ['big_data_url', 'short_label', 'long_label'], batch_size=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0004_urlprefix_labelformat'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_tracks, expand_tracks),
+    ]
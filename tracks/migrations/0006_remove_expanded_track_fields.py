@@ -0,0 +1,41 @@
+# Generated by Django 2.2.13 on 2026-10-19 12:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0005_compact_track_urls_and_labels'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='track',
+            name='big_data_url',
+        ),
+        migrations.RemoveField(
+            model_name='track',
+            name='long_label',
+        ),
+        migrations.RemoveField(
+            model_name='track',
+            name='short_label',
+        ),
+        migrations.AlterField(
+            model_name='track',
+            name='long_label_format',
+            field=models.ForeignKey(help_text='Format of the long label used in trackDb.txt', on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracks.LabelFormat'),
+        ),
+        migrations.AlterField(
+            model_name='track',
+            name='short_label_format',
+            field=models.ForeignKey(help_text='Format of the short label used in trackDb.txt', on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracks.LabelFormat'),
+        ),
+        migrations.AlterField(
+            model_name='track',
+            name='url_prefix',
+            field=models.ForeignKey(help_text='Start of big_data_url', on_delete=django.db.models.deletion.PROTECT, to='tracks.UrlPrefix'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.13 on 2026-10-19 12:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0006_remove_expanded_track_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='track',
+            name='tf',
+            field=models.ForeignKey(db_index=False, help_text='Transcription factor', on_delete=django.db.models.deletion.CASCADE, to='tracks.TranscriptionFactor'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['tf', 'cell_type', 'id'], name='track_tf_cell_type_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.13 on 2026-10-19 12:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0007_track_tf_cell_type_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='track',
+            name='track_tf_cell_type_idx',
+        ),
+        migrations.AlterField(
+            model_name='track',
+            name='tf',
+            field=models.ForeignKey(help_text='Transcription factor', on_delete=django.db.models.deletion.CASCADE, to='tracks.TranscriptionFactor'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['genome', 'tf', 'cell_type', 'id'], name='track_genome_tf_cell_type_idx'),
+        ),
+    ]
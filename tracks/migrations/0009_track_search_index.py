@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# the search index of tracks/search.py as it was when this migration was written
+SEARCH_TABLE = 'tracks_track_search'
+DOCUMENT_FIELDS = ['name', 'labels', 'tf', 'cell_type', 'rep_name']
+INDEX_BATCH_SIZE = 100
+
+CREATE_INDEX_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tracks_track_search USING fts5(name, labels, tf, cell_type, rep_name, "
+        "genome UNINDEXED, prefix='2 3')",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE TABLE IF NOT EXISTS tracks_track_search (track_id integer PRIMARY KEY, genome varchar(255) NOT NULL, "
+        "document text NOT NULL, vector tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS tracks_track_search_vector ON tracks_track_search USING GIN (vector)",
+        "CREATE INDEX IF NOT EXISTS tracks_track_search_trigram ON tracks_track_search "
+        "USING GIN (document gin_trgm_ops)",
+    ],
+}
+
+
+def insert_rows(cursor, vendor, rows):
+    if vendor == 'sqlite':
+        columns = ['rowid', 'genome'] + DOCUMENT_FIELDS
+        placeholders = '({})'.format(', '.join(['%s'] * len(columns)))
+        cursor.execute("INSERT INTO {} ({}) VALUES {}".format(SEARCH_TABLE, ', '.join(columns),
+                                                              ', '.join([placeholders] * len(rows))),
+                       [value for row in rows for value in row])
+    else:
+        values = []
+        params = []
+        for track_id, genome, *document_values in rows:
+            document = ' '.join(document_values)
+            values.append("(%s, %s, %s, to_tsvector('simple', %s))")
+            params.extend([track_id, genome, document, document])
+        cursor.execute("INSERT INTO {} (track_id, genome, document, vector) VALUES {}".format(
+            SEARCH_TABLE, ', '.join(values)), params)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_INDEX_SQL:
+        # other databases search without an index
+        return
+    Track = apps.get_model('tracks', 'Track')
+    tracks = Track.objects.select_related('short_label_format', 'long_label_format').order_by('id')
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CREATE_INDEX_SQL[vendor]:
+            cursor.execute(sql)
+        rows = []
+        for track in tracks.iterator():
+            names = {'tf': track.tf_id, 'cell_type': track.cell_type_id, 'rep_name': track.rep_name_id}
+            labels = [track.short_label_format.template.format(**names)]
+            long_label = track.long_label_format.template.format(**names)
+            if long_label != labels[0]:
+                labels.append(long_label)
+            document = dict(names, name=track.name, labels=' '.join(labels))
+            rows.append([track.id, track.genome_id] + [document[field] for field in DOCUMENT_FIELDS])
+            if len(rows) >= INDEX_BATCH_SIZE:
+                insert_rows(cursor, vendor, rows)
+                rows = []
+        if rows:
+            insert_rows(cursor, vendor, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_INDEX_SQL:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS {}".format(SEARCH_TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0008_track_genome_tf_cell_type_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.13 on 2026-10-19 13:01
+
+from django.db import migrations, models
+import uuid
+
+
+def create_catalog_version(apps, schema_editor):
+    CatalogVersion = apps.get_model('tracks', 'CatalogVersion')
+    CatalogVersion.objects.create(pk=1, version=uuid.uuid4().hex)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0009_track_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(help_text='Random version set by tracks.hubcache.bump_catalog_version', max_length=32)),
+            ],
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
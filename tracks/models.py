@@ -1,4 +1,13 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
 from django.db import models
+from django.db.models import F, CharField
+from django.db.models.functions import Concat
+from tracks.compact import split_big_data_url, make_label_format, format_label
+
+DEFAULT_VIEW_LIMITS = '0:100'
+# sqlite allows 999 variables in a query
+IN_QUERY_BATCH_SIZE = 500
 
 
 class Genome(models.Model):
@@ -28,22 +37,269 @@ class RepName(models.Model):
         return "RepName - pk: {}".format(self.pk)
 
 
+class UrlPrefix(models.Model):
+    """
+    Start of the big_data_url of many tracks. Example: http://trackhub.genome.duke.edu/.../bigWig/
+    """
+    prefix = models.CharField(max_length=1000, unique=True, help_text="Start of big_data_url")
+    def __str__(self):
+        return "UrlPrefix - pk: {} prefix: '{}'".format(self.pk, self.prefix)
+
+
+class LabelFormat(models.Model):
+    """
+    Format of a track label with {tf}, {cell_type} and {rep_name} placeholders. Example: {tf} {cell_type} {rep_name}
+    """
+    template = models.CharField(max_length=255, unique=True, help_text="Label with placeholders")
+    def __str__(self):
+        return "LabelFormat - pk: {} template: '{}'".format(self.pk, self.template)
+
+
+def get_or_create_by_value(model, field_name, values):
+    """
+    Return a dict of value to the instance of model whose field_name has that value, creating missing instances.
+    """
+    values = sorted(set(values))
+    instances = {}
+    for start in range(0, len(values), IN_QUERY_BATCH_SIZE):
+        batch = values[start:start + IN_QUERY_BATCH_SIZE]
+        for instance in model.objects.filter(**{field_name + '__in': batch}):
+            instances[getattr(instance, field_name)] = instance
+        missing = [value for value in batch if value not in instances]
+        if missing:
+            model.objects.bulk_create([model(**{field_name: value}) for value in missing], ignore_conflicts=True)
+            for instance in model.objects.filter(**{field_name + '__in': missing}):
+                instances[getattr(instance, field_name)] = instance
+    return instances
+
+
+def compact_tracks(tracks):
+    """
+    Store the big_data_url and labels assigned to tracks as url_prefix/url_suffix and label formats.
+    Called by Track.save(), call before bulk_create.
+    """
+    # unsaved tracks can not be dict keys so values are collected in lists of (track, ...) tuples
+    url_parts = []
+    label_templates = []
+    for track in tracks:
+        pending = track.pending_values()
+        if 'big_data_url' in pending:
+            prefix, suffix = split_big_data_url(pending['big_data_url'], track.label_names().values())
+            url_parts.append((track, prefix, suffix))
+        for field_name in ['short_label', 'long_label']:
+            if field_name in pending:
+                template = make_label_format(pending[field_name], track.label_names())
+                label_templates.append((track, field_name, template))
+    url_prefixes = get_or_create_by_value(UrlPrefix, 'prefix', [prefix for _, prefix, _ in url_parts])
+    label_formats = get_or_create_by_value(LabelFormat, 'template', [template for _, _, template in label_templates])
+    for track, prefix, suffix in url_parts:
+        track.url_prefix = url_prefixes[prefix]
+        track.url_suffix = suffix
+    for track, field_name, template in label_templates:
+        setattr(track, field_name + '_format', label_formats[template])
+    for track in tracks:
+        track.pending_values().clear()
+
+
+def big_data_url_expression():
+    """
+    Expression rebuilding big_data_url in the database, for use with annotate().
+    """
+    return Concat(F('url_prefix__prefix'), F('url_suffix'), output_field=CharField())
+
+
 class Track(models.Model):
     """
     Contains tags associated with this track and url to a file that will be used by trackhub.
+    big_data_url, short_label and long_label are stored compactly (see tracks.compact) and rebuilt on access,
+    use select_related(*Track.COMPACT_RELATED_FIELDS) when reading many tracks.
     """
+    COMPACT_RELATED_FIELDS = ['url_prefix', 'short_label_format', 'long_label_format']
+
     genome = models.ForeignKey(Genome, on_delete=models.CASCADE)
     name = models.CharField(max_length=255, help_text="Name of the track")
-    short_label = models.CharField(max_length=255, help_text="Short label used in trackDb.txt")
-    long_label = models.CharField(max_length=255, help_text="Long label used in trackDb.txt")
-    big_data_url = models.URLField(help_text="URL used for bigDataUrl in trackDb.txt", max_length=1000)
+    short_label_format = models.ForeignKey(LabelFormat, on_delete=models.PROTECT, related_name='+',
+                                           help_text="Format of the short label used in trackDb.txt")
+    long_label_format = models.ForeignKey(LabelFormat, on_delete=models.PROTECT, related_name='+',
+                                          help_text="Format of the long label used in trackDb.txt")
+    url_prefix = models.ForeignKey(UrlPrefix, on_delete=models.PROTECT, help_text="Start of big_data_url")
+    url_suffix = models.CharField(max_length=1000, help_text="Rest of big_data_url after url_prefix")
     file_type = models.CharField(max_length=255, help_text="Type of file referenced by big_data_url")
     tf = models.ForeignKey(TranscriptionFactor, on_delete=models.CASCADE, help_text="Transcription factor")
     cell_type = models.ForeignKey(CellType, on_delete=models.CASCADE, help_text="Cell type")
     rep_name = models.ForeignKey(RepName, on_delete=models.CASCADE, help_text="Replicate name")
     position = models.CharField(max_length=255, help_text="Genome Browser position value")
     def __str__(self):
-        return "Track - pk: {} genome: '{}' name: '{}'".format(self.pk, self.genome.name, self.name)
+        # genome_id is the genome name, reading it does not query the genome
+        return "Track - pk: {} genome: '{}' name: '{}'".format(self.pk, self.genome_id, self.name)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        track = super().from_db(db, field_names, values)
+        track.remember_label_names()
+        return track
+
+    def remember_label_names(self):
+        """
+        Keep the names the stored label formats were rendered with, unless some of them were deferred.
+        """
+        if all(attname in self.__dict__ for attname in ['tf_id', 'cell_type_id', 'rep_name_id']):
+            self.__dict__['_saved_label_names'] = self.label_names()
+
+    def pending_values(self):
+        """
+        Values assigned to big_data_url, short_label or long_label that compact_tracks has not stored yet.
+        """
+        return self.__dict__.setdefault('_pending_values', {})
+
+    def label_names(self):
+        return {'tf': self.tf_id, 'cell_type': self.cell_type_id, 'rep_name': self.rep_name_id}
+
+    def get_label(self, field_name):
+        pending = self.pending_values()
+        if field_name in pending:
+            return pending[field_name]
+        return format_label(getattr(self, field_name + '_format').template, self.label_names())
+
+    @property
+    def big_data_url(self):
+        pending = self.pending_values()
+        if 'big_data_url' in pending:
+            return pending['big_data_url']
+        return self.url_prefix.prefix + self.url_suffix
+
+    @big_data_url.setter
+    def big_data_url(self, value):
+        self.pending_values()['big_data_url'] = value
+
+    @property
+    def short_label(self):
+        return self.get_label('short_label')
+
+    @short_label.setter
+    def short_label(self, value):
+        self.pending_values()['short_label'] = value
+
+    @property
+    def long_label(self):
+        return self.get_label('long_label')
+
+    @long_label.setter
+    def long_label(self, value):
+        self.pending_values()['long_label'] = value
+
+    def clean(self):
+        # validates big_data_url like the URLField it replaced, only assigned values need checking
+        url = self.pending_values().get('big_data_url')
+        if url:
+            try:
+                URLValidator()(url)
+            except ValidationError as e:
+                raise ValidationError({'big_data_url': e.error_list})
+
+    def save(self, *args, **kwargs):
+        pending = self.pending_values()
+        saved_names = self.__dict__.get('_saved_label_names')
+        if saved_names is not None and saved_names != self.label_names():
+            # labels keep their text when the track gets another tf, cell type or rep name, the formats are
+            # derived again from that text with the new names
+            for field_name in ['short_label', 'long_label']:
+                if field_name not in pending and getattr(self, field_name + '_format_id') is not None:
+                    label_format = getattr(self, field_name + '_format').template
+                    pending[field_name] = format_label(label_format, saved_names)
+        # like the text fields these replaced, values that were never assigned are empty
+        if self.url_prefix_id is None:
+            pending.setdefault('big_data_url', '')
+        for field_name in ['short_label', 'long_label']:
+            if getattr(self, field_name + '_format_id') is None:
+                pending.setdefault(field_name, '')
+        if pending:
+            compact_tracks([self])
+        super().save(*args, **kwargs)
+        self.remember_label_names()
+
+    def get_view_limits(self):
+        """
+        Return the viewLimits for trackDb.txt, the range of values in the file when it has been summarized.
+        """
+        if hasattr(self, 'summary'):
+            return self.summary.get_view_limits()
+        return DEFAULT_VIEW_LIMITS
 
     class Meta:
         unique_together = ('genome', 'name',)
+        indexes = [
+            # the wizard looks up tracks of one genome by tf and cell type, with genome first each lookup only reads
+            # the part of the index for its genome. Includes id so finding the ids of the selected tracks only
+            # reads the index.
+            models.Index(fields=['genome', 'tf', 'cell_type', 'id'], name='track_genome_tf_cell_type_idx'),
+        ]
+
+
+def get_available_tfs(genome_name):
+    """
+    Transcription factors with tracks in the genome.
+    """
+    return TranscriptionFactor.objects.filter(pk__in=Track.objects.filter(genome_id=genome_name).values('tf_id'))
+
+
+def get_available_cell_types(genome_name, tf_names):
+    """
+    Cell types with tracks in the genome for any of the transcription factors.
+    """
+    tracks = Track.objects.filter(genome_id=genome_name, tf_id__in=tf_names)
+    return CellType.objects.filter(pk__in=tracks.values('cell_type_id'))
+
+
+def get_available_pairs(genome_name, tf_names, cell_type_names):
+    """
+    Return a set of the (tf name, cell type name) pairs with tracks in the genome.
+    """
+    tracks = Track.objects.filter(genome_id=genome_name, tf_id__in=tf_names, cell_type_id__in=cell_type_names)
+    return set(tracks.values_list('tf_id', 'cell_type_id').distinct())
+
+
+class TrackHealth(models.Model):
+    """
+    Result of the last check that the file at a track's big_data_url can be downloaded.
+    """
+    track = models.OneToOneField(Track, primary_key=True, on_delete=models.CASCADE, related_name='health')
+    is_alive = models.BooleanField(help_text="True when big_data_url responded with a successful status")
+    status = models.IntegerField(null=True, help_text="HTTP status code, empty when no response was received")
+    size = models.BigIntegerField(null=True, help_text="Size of the file in bytes")
+    last_modified = models.CharField(max_length=255, blank=True, help_text="Last-Modified header of the file")
+    latency = models.FloatField(null=True, help_text="Seconds taken to respond")
+    error = models.CharField(max_length=255, blank=True, help_text="Reason no response was received")
+    checked = models.DateTimeField(help_text="When big_data_url was checked")
+    def __str__(self):
+        return "TrackHealth - pk: {} is_alive: {}".format(self.pk, self.is_alive)
+
+
+class TrackSummary(models.Model):
+    """
+    Summary statistics of the values in the file at a track's big_data_url.
+    """
+    track = models.OneToOneField(Track, primary_key=True, on_delete=models.CASCADE, related_name='summary')
+    bases_covered = models.BigIntegerField(help_text="Number of bases with data")
+    min_value = models.FloatField(help_text="Minimum value")
+    max_value = models.FloatField(help_text="Maximum value")
+    mean_value = models.FloatField(help_text="Mean value over bases with data")
+    def __str__(self):
+        return "TrackSummary - pk: {} min: {} max: {} mean: {}".format(
+            self.pk, self.min_value, self.max_value, self.mean_value)
+
+    def get_view_limits(self):
+        max_value = self.max_value
+        if max_value <= self.min_value:
+            max_value = self.min_value + 1
+        return '{:g}:{:g}'.format(self.min_value, max_value)
+
+
+class CatalogVersion(models.Model):
+    """
+    The catalog version hub files are cached under, a single row changed with every change to the tracks. A read
+    replica has the version of the catalog it holds, so renders from a replica that is behind are not cached.
+    """
+    version = models.CharField(max_length=32, help_text="Random version set by tracks.hubcache.bump_catalog_version")
+    def __str__(self):
+        return "CatalogVersion - pk: {} version: '{}'".format(self.pk, self.version)
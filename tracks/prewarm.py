@@ -0,0 +1,159 @@
+"""
+Pre-warms the hub file cache with the hubs requested most often in gunicorn or Django access logs so the first
+requests after loadtracks or a deploy do not all miss the cache.
+"""
+from django.conf import settings
+from django.urls import resolve, Resolver404
+from tracks import hubcache, views
+from tracks.statichubs import get_static_hub_path
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit, unquote
+import glob
+import gzip
+import re
+import time
+
+REQUEST_PATTERN = re.compile(r'"(?:GET|HEAD) (\S+) HTTP/[0-9.]+"')
+ENCODED_KEY_VALUE_PATTERN = re.compile(r'^\d+(_\d+)*$')
+HUB_FILE_URL_NAMES = {
+    'tracks-hub': 'hub',
+    'tracks-genomes': 'genomes',
+    'tracks-trackdb': 'trackdb',
+}
+
+HubFileRequest = namedtuple('HubFileRequest', ['kind', 'parts'])
+WarmReport = namedtuple('WarmReport', ['num_requests', 'num_hubs', 'num_files', 'hit_ratio_before',
+                                       'hit_ratio_after', 'elapsed', 'timed_out'])
+
+
+def expand_log_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)))
+    return paths
+
+
+def open_log(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', errors='replace')
+    return open(path, errors='replace')
+
+
+def parse_hub_file_request(line):
+    """
+    Return the HubFileRequest for an access log line or None when the line is not a request for a hub file.
+    """
+    match = REQUEST_PATTERN.search(line)
+    if not match:
+        return None
+    try:
+        resolved = resolve(unquote(urlsplit(match.group(1)).path))
+    except Resolver404:
+        return None
+    kind = HUB_FILE_URL_NAMES.get(resolved.url_name)
+    encoded_key_value = resolved.kwargs.get('encoded_key_value', '')
+    if not kind or not ENCODED_KEY_VALUE_PATTERN.match(encoded_key_value):
+        return None
+    parts = (encoded_key_value,)
+    if 'genome' in resolved.kwargs:
+        parts += (resolved.kwargs['genome'],)
+    return HubFileRequest(kind, parts)
+
+
+def read_hub_file_requests(paths, deadline=None):
+    """
+    Count the requests for each hub file in the access logs at paths, returning the counts and whether reading
+    stopped at deadline, a time.monotonic() value, before the end of the logs.
+    """
+    requests = Counter()
+    for path in paths:
+        with open_log(path) as infile:
+            for line in infile:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return requests, True
+                request = parse_hub_file_request(line)
+                if request:
+                    requests[request] += 1
+    return requests, False
+
+
+def rank_hubs(requests, top):
+    """
+    Return the encoded_key_values of the top hubs by number of requests for any of their files.
+    """
+    hub_counts = Counter()
+    for request, count in requests.items():
+        hub_counts[request.parts[0]] += count
+    return [encoded_key_value for encoded_key_value, _ in hub_counts.most_common(top)]
+
+
+def expected_hit_ratio(requests):
+    """
+    The fraction of requests that would be cache hits if they were made against the cache now.
+    """
+    total = sum(requests.values())
+    if not total:
+        return None
+    hits = sum(count for request, count in requests.items() if hubcache.is_cached(request.kind, request.parts))
+    return hits / total
+
+
+def warm_hub(encoded_key_value, deadline=None):
+    """
+    Render the files of a hub into the cache without counting the lookups in the cache stats, stopping between
+    files once deadline, a time.monotonic() value, has passed. Returns the number of files.
+    """
+    genome_names = views.get_hub_tracks(encoded_key_value).values_list('genome__name', flat=True).distinct()
+    renders = [
+        lambda: views.get_hub_bodies(encoded_key_value, record_stats=False),
+        lambda: views.get_genomes_bodies(encoded_key_value, record_stats=False),
+    ] + [
+        lambda genome_name=genome_name: views.get_track_db_bodies(encoded_key_value, genome_name, record_stats=False)
+        for genome_name in genome_names
+    ]
+    num_files = 0
+    for render in renders:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        render()
+        num_files += 1
+    return num_files
+
+
+def warm_from_logs(patterns, top, time_limit):
+    """
+    Warm the cache with the top hubs in the access logs matching patterns, stopping after time_limit seconds
+    counted from before the logs are read.
+    """
+    start = time.monotonic()
+    deadline = start + time_limit
+    requests, timed_out = read_hub_file_requests(expand_log_paths(patterns), deadline)
+    hit_ratio_before = expected_hit_ratio(requests)
+    num_hubs = num_files = 0
+    for encoded_key_value in ([] if timed_out else rank_hubs(requests, top)):
+        if time.monotonic() >= deadline:
+            timed_out = True
+            break
+        if get_static_hub_path(encoded_key_value):
+            continue
+        num_files += warm_hub(encoded_key_value, deadline)
+        num_hubs += 1
+    return WarmReport(
+        num_requests=sum(requests.values()),
+        num_hubs=num_hubs,
+        num_files=num_files,
+        hit_ratio_before=hit_ratio_before,
+        hit_ratio_after=expected_hit_ratio(requests),
+        elapsed=time.monotonic() - start,
+        timed_out=timed_out or time.monotonic() >= deadline,
+    )
+
+
+def warm_from_settings():
+    """
+    Warm the cache from the access logs in HUB_CACHE_WARM_LOGS. Returns None when no logs are configured.
+    """
+    if not settings.HUB_CACHE_WARM_LOGS:
+        return None
+    return warm_from_logs(settings.HUB_CACHE_WARM_LOGS, settings.HUB_CACHE_WARM_TOP,
+                          settings.HUB_CACHE_WARM_TIME_LIMIT)
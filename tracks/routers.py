@@ -0,0 +1,86 @@
+"""
+Optional routing of the read-only queries made while serving tracks pages and hub files to a read replica.
+Enabled by setting TOPDATA_REPLICA_DATABASE_URL, see topdata/settings.py.
+
+Only queries for tracks models made within a GET or HEAD request outside the admin go to the replica. Writes,
+admin pages, management commands such as loadtracks and the requests a client makes for REPLICA_STICKY_SECONDS
+after a write use the primary so they read their own writes even when the replica lags behind. The wizard and hub
+views never write, so only admin edits and other writing requests set the sticky cookie. Hub files and page
+fragments rendered from a replica that is behind the catalog version are not cached, see tracks.hubcache.
+"""
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import reverse
+import threading
+
+REPLICA_APP_LABELS = {'tracks'}
+SAFE_METHODS = {'GET', 'HEAD'}
+
+state = threading.local()
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Route reads to the replica within the block, until a write happens. Returns the state so callers can see if a
+    write happened.
+    """
+    previous = getattr(state, 'use_replica', False), getattr(state, 'wrote', False)
+    state.use_replica = enabled
+    state.wrote = False
+    try:
+        yield state
+    finally:
+        state.use_replica, state.wrote = previous
+
+
+def stream_with_replica_reads(iterable):
+    """
+    Return a generator of the items of iterable that routes the reads made while producing them as they are routed
+    now. The content of a streaming response is read after ReplicaStickinessMiddleware has returned.
+    """
+    enabled = getattr(state, 'use_replica', False)
+
+    def generate():
+        with replica_reads(enabled):
+            yield from iterable
+    return generate()
+
+
+class ReplicaRouter(object):
+    def db_for_read(self, model, **hints):
+        if getattr(state, 'use_replica', False) and model._meta.app_label in REPLICA_APP_LABELS:
+            return settings.REPLICA_DATABASE_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # later reads in this request must see the write
+        state.use_replica = False
+        state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        return True
+
+
+class ReplicaStickinessMiddleware(object):
+    """
+    Lets ReplicaRouter use the replica for safe requests outside the admin, whose change forms must show the rows
+    they save. After a request that wrote to the database, such as an admin edit, sets a cookie that keeps the
+    client's requests on the primary for REPLICA_STICKY_SECONDS.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replica = (request.method in SAFE_METHODS and settings.REPLICA_STICKY_COOKIE not in request.COOKIES and
+                       not request.path_info.startswith(reverse('admin:index')))
+        with replica_reads(use_replica) as request_state:
+            response = self.get_response(request)
+            wrote = request_state.wrote
+        if wrote:
+            response.set_cookie(settings.REPLICA_STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True)
+        return response
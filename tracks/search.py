@@ -0,0 +1,240 @@
+"""
+Full-text search over tracks. Each track has a row in a search index with its name, labels, transcription factor,
+cell type and replicate name: an FTS5 table on SQLite, a table with a tsvector and a trigram GIN index on postgres.
+The index is created by migration 0009 and kept up to date by loadtracks and loadcatalog calling index_tracks.
+Other databases have no index, their searches scan the track table with icontains lookups.
+
+A query matches tracks containing every word of it, each word may be the start of a longer word:
+'CTCF liv' finds the CTCF tracks of liver cell types.
+"""
+from django.db import connections, router
+from django.db.models import Q
+from tracks.models import Track
+import re
+
+SEARCH_TABLE = 'tracks_track_search'
+WORD_PATTERN = re.compile(r'[^\W_]+')
+# rows written per statement, sqlite allows 999 variables in a query
+INDEX_BATCH_SIZE = 100
+DOCUMENT_FIELDS = ['name', 'labels', 'tf', 'cell_type', 'rep_name']
+
+
+def get_words(query):
+    return WORD_PATTERN.findall(query.lower())
+
+
+def make_document(track):
+    """
+    Return a dict of DOCUMENT_FIELDS to the text indexed for track.
+    """
+    labels = [track.short_label]
+    if track.long_label != track.short_label:
+        labels.append(track.long_label)
+    return {
+        'name': track.name,
+        'labels': ' '.join(labels),
+        'tf': track.tf_id,
+        'cell_type': track.cell_type_id,
+        'rep_name': track.rep_name_id,
+    }
+
+
+def make_genome_condition(genome_name):
+    """
+    Return the SQL and params limiting a search to a genome, nothing when genome_name is None.
+    """
+    if genome_name is None:
+        return '', []
+    return ' AND genome = %s', [genome_name]
+
+
+class SQLiteSearchBackend(object):
+    @staticmethod
+    def create_index(cursor):
+        # prefix indexes make matching the start of words with 2 or 3 letters fast
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5({}, genome UNINDEXED, "
+                       "prefix='2 3')".format(SEARCH_TABLE, ', '.join(DOCUMENT_FIELDS)))
+
+    @staticmethod
+    def drop_index(cursor):
+        cursor.execute("DROP TABLE IF EXISTS {}".format(SEARCH_TABLE))
+
+    @staticmethod
+    def delete_rows(cursor, track_ids):
+        cursor.execute("DELETE FROM {} WHERE rowid IN ({})".format(SEARCH_TABLE, ', '.join(['%s'] * len(track_ids))),
+                       track_ids)
+
+    @staticmethod
+    def insert_rows(cursor, rows):
+        columns = ['rowid', 'genome'] + DOCUMENT_FIELDS
+        placeholders = '({})'.format(', '.join(['%s'] * len(columns)))
+        cursor.execute("INSERT INTO {} ({}) VALUES {}".format(SEARCH_TABLE, ', '.join(columns),
+                                                              ', '.join([placeholders] * len(rows))),
+                       [value for row in rows for value in row])
+
+    @staticmethod
+    def clear(cursor):
+        cursor.execute("DELETE FROM {}".format(SEARCH_TABLE))
+
+    @staticmethod
+    def search(cursor, genome_name, words, limit):
+        match = ' AND '.join('"{}"*'.format(word) for word in words)
+        genome_sql, genome_params = make_genome_condition(genome_name)
+        cursor.execute("SELECT rowid FROM {0} WHERE {0} MATCH %s{1} ORDER BY rank LIMIT %s".format(
+            SEARCH_TABLE, genome_sql), [match] + genome_params + [limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(object):
+    @staticmethod
+    def create_index(cursor):
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute("CREATE TABLE IF NOT EXISTS {} (track_id integer PRIMARY KEY, genome varchar(255) NOT NULL, "
+                       "document text NOT NULL, vector tsvector NOT NULL)".format(SEARCH_TABLE))
+        cursor.execute("CREATE INDEX IF NOT EXISTS {0}_vector ON {0} USING GIN (vector)".format(SEARCH_TABLE))
+        # for queries with misspelled words that match nothing in vector
+        cursor.execute("CREATE INDEX IF NOT EXISTS {0}_trigram ON {0} USING GIN (document gin_trgm_ops)".format(
+            SEARCH_TABLE))
+
+    @staticmethod
+    def drop_index(cursor):
+        cursor.execute("DROP TABLE IF EXISTS {}".format(SEARCH_TABLE))
+
+    @staticmethod
+    def delete_rows(cursor, track_ids):
+        cursor.execute("DELETE FROM {} WHERE track_id = ANY(%s)".format(SEARCH_TABLE), [list(track_ids)])
+
+    @staticmethod
+    def insert_rows(cursor, rows):
+        values = []
+        params = []
+        for track_id, genome, *document_values in rows:
+            document = ' '.join(document_values)
+            values.append("(%s, %s, %s, to_tsvector('simple', %s))")
+            params.extend([track_id, genome, document, document])
+        cursor.execute("INSERT INTO {} (track_id, genome, document, vector) VALUES {}".format(
+            SEARCH_TABLE, ', '.join(values)), params)
+
+    @staticmethod
+    def clear(cursor):
+        cursor.execute("TRUNCATE {}".format(SEARCH_TABLE))
+
+    @staticmethod
+    def search(cursor, genome_name, words, limit):
+        tsquery = ' & '.join('{}:*'.format(word) for word in words)
+        genome_sql, genome_params = make_genome_condition(genome_name)
+        cursor.execute("SELECT track_id FROM {} WHERE vector @@ to_tsquery('simple', %s){} "
+                       "ORDER BY ts_rank(vector, to_tsquery('simple', %s)) DESC LIMIT %s".format(
+                           SEARCH_TABLE, genome_sql), [tsquery] + genome_params + [tsquery, limit])
+        track_ids = [row[0] for row in cursor.fetchall()]
+        if not track_ids:
+            cursor.execute("SELECT track_id FROM {} WHERE document %% %s{} "
+                           "ORDER BY similarity(document, %s) DESC LIMIT %s".format(SEARCH_TABLE, genome_sql),
+                           [' '.join(words)] + genome_params + [' '.join(words), limit])
+            track_ids = [row[0] for row in cursor.fetchall()]
+        return track_ids
+
+
+class IcontainsSearchBackend(object):
+    """
+    Search without an index for databases other than SQLite and postgres. Words match anywhere in the name, names
+    or label formats of a track, so the words of a label that are a track's names match through those names.
+    """
+    SEARCH_FIELDS = ['name', 'tf__name', 'cell_type__name', 'rep_name__name', 'short_label_format__template',
+                     'long_label_format__template']
+
+    @staticmethod
+    def create_index(cursor):
+        pass
+
+    @staticmethod
+    def drop_index(cursor):
+        pass
+
+    @staticmethod
+    def delete_rows(cursor, track_ids):
+        pass
+
+    @staticmethod
+    def insert_rows(cursor, rows):
+        pass
+
+    @staticmethod
+    def clear(cursor):
+        pass
+
+    @classmethod
+    def search(cls, cursor, genome_name, words, limit):
+        tracks = Track.objects.all()
+        if genome_name is not None:
+            tracks = tracks.filter(genome=genome_name)
+        for word in words:
+            condition = Q()
+            for field in cls.SEARCH_FIELDS:
+                condition |= Q(**{field + '__icontains': word})
+            tracks = tracks.filter(condition)
+        return list(tracks.order_by('id').values_list('id', flat=True)[:limit])
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection):
+    return SEARCH_BACKENDS.get(connection.vendor, IcontainsSearchBackend)
+
+
+def index_tracks(track_ids):
+    """
+    Add or update the search index rows of the tracks with track_ids, removing the rows of deleted tracks.
+    """
+    connection = connections[router.db_for_write(Track)]
+    backend = get_backend(connection)
+    track_ids = list(track_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(track_ids), INDEX_BATCH_SIZE):
+            batch = track_ids[start:start + INDEX_BATCH_SIZE]
+            backend.delete_rows(cursor, batch)
+            tracks = Track.objects.filter(pk__in=batch).select_related(*Track.COMPACT_RELATED_FIELDS)
+            rows = []
+            for track in tracks:
+                document = make_document(track)
+                rows.append([track.id, track.genome_id] + [document[field] for field in DOCUMENT_FIELDS])
+            if rows:
+                backend.insert_rows(cursor, rows)
+
+
+def clear_index():
+    connection = connections[router.db_for_write(Track)]
+    with connection.cursor() as cursor:
+        get_backend(connection).clear(cursor)
+
+
+def rebuild_index():
+    clear_index()
+    index_tracks(Track.objects.order_by('id').values_list('id', flat=True))
+
+
+def search_track_ids(genome_name, query, limit):
+    """
+    Return the ids of up to limit tracks of the genome matching query, best matches first.
+    Tracks of every genome are searched when genome_name is None.
+    """
+    words = get_words(query)
+    if not words:
+        return []
+    connection = connections[router.db_for_read(Track)]
+    with connection.cursor() as cursor:
+        return get_backend(connection).search(cursor, genome_name, words, limit)
+
+
+def search_tracks(genome_name, query, limit):
+    """
+    Return up to limit tracks of the genome matching query, best matches first.
+    """
+    track_ids = search_track_ids(genome_name, query, limit)
+    tracks = Track.objects.filter(pk__in=track_ids).select_related(*Track.COMPACT_RELATED_FIELDS).in_bulk()
+    # tracks deleted since they were indexed are left out
+    return [tracks[track_id] for track_id in track_ids if track_id in tracks]
@@ -0,0 +1,154 @@
+"""
+Selection expressions pick the (transcription factor, cell type) pairs of a hub without ticking a checkbox for
+each one. An expression is one or more terms separated by ';', each term selects every pair of the transcription
+factors and cell types it names:
+
+    tf:CTCF,ELK* celltype:Adult_CD4_*,-Adult_CD4_Th0; tf:AR celltype:K562
+
+Patterns may use the glob wildcards * ? and [...], a pattern starting with - excludes the names it matches and a
+dimension left out of a term matches every name. Expressions are expanded against a GenomeIndex, sorted lists of
+the names of a genome and the number of tracks of each pair, kept in memory per process until the catalog version
+changes, so selections are expanded and checked against TRACK_SELECTION_LIMIT without reading any track rows.
+"""
+from django.db.models import Count
+from tracks.models import Track
+from tracks import hubcache
+from bisect import bisect_left
+from fnmatch import fnmatchcase
+import re
+
+TF_KEY = 'tf'
+CELL_TYPE_KEY = 'celltype'
+DIMENSION_LABELS = {
+    TF_KEY: 'transcription factors',
+    CELL_TYPE_KEY: 'cell types',
+}
+WILDCARD_PATTERN = re.compile(r'[*?[]')
+
+
+class SelectionError(Exception):
+    pass
+
+
+class NameIndex(object):
+    """
+    Sorted names, a pattern only compares the names starting with the text before its first wildcard.
+    """
+    def __init__(self, names):
+        self.names = sorted(names)
+
+    def match(self, pattern):
+        wildcard = WILDCARD_PATTERN.search(pattern)
+        if not wildcard:
+            index = bisect_left(self.names, pattern)
+            if index < len(self.names) and self.names[index] == pattern:
+                return [pattern]
+            return []
+        prefix = pattern[:wildcard.start()]
+        matches = []
+        for name in self.names[bisect_left(self.names, prefix):]:
+            if not name.startswith(prefix):
+                break
+            if fnmatchcase(name, pattern):
+                matches.append(name)
+        return matches
+
+
+class GenomeIndex(object):
+    def __init__(self, pair_counts):
+        self.pair_counts = pair_counts
+        self.name_indexes = {
+            TF_KEY: NameIndex(set(tf_name for tf_name, _ in pair_counts)),
+            CELL_TYPE_KEY: NameIndex(set(cell_type_name for _, cell_type_name in pair_counts)),
+        }
+
+    @classmethod
+    def from_database(cls, genome_name):
+        tracks = Track.objects.filter(genome_id=genome_name).values('tf_id', 'cell_type_id').annotate(
+            num_tracks=Count('id')).order_by()
+        return cls({(row['tf_id'], row['cell_type_id']): row['num_tracks'] for row in tracks})
+
+    def match_names(self, key, patterns):
+        """
+        Return the sorted names of the key dimension matched by patterns.
+        """
+        name_index = self.name_indexes[key]
+        included = set()
+        excluded = set()
+        for pattern in patterns:
+            names = excluded if pattern.startswith('-') else included
+            if pattern.startswith('-'):
+                pattern = pattern[1:]
+            matches = name_index.match(pattern)
+            if not matches:
+                raise SelectionError('{} matches no {}'.format(pattern, DIMENSION_LABELS[key]))
+            names.update(matches)
+        if not included:
+            included.update(name_index.names)
+        return sorted(included - excluded)
+
+    def count_tracks(self, pairs):
+        return sum(self.pair_counts.get(tuple(pair), 0) for pair in pairs)
+
+    def has_pair(self, pair):
+        return tuple(pair) in self.pair_counts
+
+
+# genome name to the catalog version and GenomeIndex
+genome_indexes = {}
+
+
+def get_genome_index(genome_name):
+    """
+    Return the GenomeIndex of genome_name, building it again after the catalog changes. An index built from a
+    replica that is behind the catalog version is not kept.
+    """
+    catalog_version = hubcache.get_catalog_version()
+    cached = genome_indexes.get(genome_name)
+    if cached and cached[0] == catalog_version:
+        return cached[1]
+    is_current = hubcache.read_catalog_version() == catalog_version
+    genome_index = GenomeIndex.from_database(genome_name)
+    if is_current:
+        genome_indexes[genome_name] = (catalog_version, genome_index)
+    return genome_index
+
+
+def parse_selection(expression):
+    """
+    Return a list of terms, dicts of TF_KEY and CELL_TYPE_KEY to lists of patterns.
+    """
+    terms = []
+    for term_text in expression.split(';'):
+        if not term_text.strip():
+            continue
+        term = {TF_KEY: [], CELL_TYPE_KEY: []}
+        for part in term_text.split():
+            key, _, patterns = part.partition(':')
+            if key not in term or not patterns:
+                raise SelectionError('Expected tf:names or celltype:names instead of {}'.format(part))
+            term[key].extend(pattern for pattern in patterns.split(',') if pattern)
+        terms.append(term)
+    if not terms:
+        raise SelectionError('The selection is empty')
+    return terms
+
+
+def expand_selection(genome_name, expression):
+    """
+    Return the (tf name, cell type name) pairs with tracks in the genome selected by expression, in order of
+    the terms.
+    """
+    genome_index = get_genome_index(genome_name)
+    pairs = []
+    seen_pairs = set()
+    for term in parse_selection(expression):
+        tf_names = genome_index.match_names(TF_KEY, term[TF_KEY])
+        cell_type_names = genome_index.match_names(CELL_TYPE_KEY, term[CELL_TYPE_KEY])
+        for pair in ((tf_name, cell_type_name) for tf_name in tf_names for cell_type_name in cell_type_names):
+            if genome_index.has_pair(pair) and pair not in seen_pairs:
+                seen_pairs.add(pair)
+                pairs.append(pair)
+    if not pairs:
+        raise SelectionError('The selection has no tracks in {}'.format(genome_name))
+    return pairs
@@ -0,0 +1,42 @@
+"""
+SQLite settings for deployments that serve from a SQLite database while loadtracks writes to it.
+With SQLITE_PROFILE set to 'production' each new connection switches the database to write-ahead logging so
+readers are not blocked by a writer, and waits up to SQLITE_BUSY_TIMEOUT milliseconds for a lock instead of
+failing with "database is locked".
+"""
+from django.conf import settings
+
+
+def get_pragmas(profile):
+    """
+    Return a list of (pragma, value) to run on new connections for profile.
+    """
+    if profile == 'production':
+        return [
+            ('journal_mode', 'WAL'),
+            # with WAL a commit only syncs at checkpoints, a power loss may lose the last commits but not corrupt
+            ('synchronous', 'NORMAL'),
+            ('mmap_size', settings.SQLITE_MMAP_SIZE),
+            ('cache_size', settings.SQLITE_CACHE_SIZE),
+            ('busy_timeout', settings.SQLITE_BUSY_TIMEOUT),
+        ]
+    if profile:
+        raise ValueError('Unknown SQLITE_PROFILE {}'.format(profile))
+    return []
+
+
+def apply_pragmas(cursor, pragmas):
+    for pragma, value in pragmas:
+        cursor.execute('PRAGMA {} = {}'.format(pragma, value))
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    connection_created signal receiver, connected in TracksConfig.ready().
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_pragmas(settings.SQLITE_PROFILE)
+    if pragmas:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, pragmas)
@@ -0,0 +1,70 @@
+"""
+Pre-generated hubs written to STATIC_HUBS_ROOT so they can be served by a static file server or CDN at
+STATIC_HUBS_URL, or without rendering by the hub views when STATIC_HUBS_URL is not set.
+A static hub is stored in a directory named after a hash of its sorted track ids, so the same set of tracks
+finds the same directory whatever order the ids are in.
+"""
+from django.conf import settings
+from tracks.hubfiles import HUB_FILENAME
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+def static_hub_name(encoded_key_value):
+    track_ids = sorted(set(int(track_id) for track_id in encoded_key_value.split('_')))
+    return hashlib.sha1('_'.join(str(track_id) for track_id in track_ids).encode('utf-8')).hexdigest()
+
+
+def get_static_hub_path(encoded_key_value, path=HUB_FILENAME):
+    """
+    Return the path of a file of the static copy of a hub or None when there is no such file.
+    """
+    try:
+        name = static_hub_name(encoded_key_value)
+    except ValueError:
+        return None
+    hub_dir = os.path.join(settings.STATIC_HUBS_ROOT, name)
+    file_path = os.path.normpath(os.path.join(hub_dir, path))
+    if file_path.startswith(hub_dir + os.sep) and os.path.isfile(file_path):
+        return file_path
+    return None
+
+
+def get_static_hub_url(encoded_key_value):
+    """
+    Return the url of the directory holding the static copy of a hub or None when there is no static copy or
+    STATIC_HUBS_URL is not set, in which case the hub views serve the static copy themselves.
+    """
+    if settings.STATIC_HUBS_URL and get_static_hub_path(encoded_key_value):
+        return '{}{}/'.format(settings.STATIC_HUBS_URL, static_hub_name(encoded_key_value))
+    return None
+
+
+def write_static_hub(encoded_key_value, files):
+    """
+    Write files (a dict of relative path to contents) for a hub. Files are written to a temporary directory that
+    is then renamed so a partially written hub is never served.
+    """
+    os.makedirs(settings.STATIC_HUBS_ROOT, exist_ok=True)
+    hub_dir = os.path.join(settings.STATIC_HUBS_ROOT, static_hub_name(encoded_key_value))
+    tmp_dir = tempfile.mkdtemp(dir=settings.STATIC_HUBS_ROOT, prefix='.tmp')
+    for path, contents in files.items():
+        file_path = os.path.join(tmp_dir, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as outfile:
+            outfile.write(contents)
+    os.chmod(tmp_dir, 0o755)
+    if os.path.exists(hub_dir):
+        shutil.rmtree(hub_dir)
+    os.rename(tmp_dir, hub_dir)
+    return hub_dir
+
+
+def clear_static_hubs():
+    """
+    Remove all static hubs. They refer to track ids so must be rebuilt when the tracks change.
+    """
+    if os.path.exists(settings.STATIC_HUBS_ROOT):
+        shutil.rmtree(settings.STATIC_HUBS_ROOT)
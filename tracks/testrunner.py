@@ -0,0 +1,54 @@
+"""
+Test runner giving each test run its own hub cache in a temporary directory, so running the tests on a deployed
+checkout never reads, clears or bumps the catalog version of the hub cache the site is using.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from tracks.hubcache import get_cache, hit_counter
+from tracks import selection
+import copy
+import os
+import shutil
+import tempfile
+
+TEST_HUB_CACHE_PREFIX = 'topdata-test-hubcache-'
+
+
+def make_test_caches(location):
+    caches = copy.deepcopy(settings.CACHES)
+    caches[settings.HUB_CACHE_ALIAS] = {
+        'BACKEND': 'tracks.cache_backends.LRUFileBasedCache',
+        'LOCATION': location,
+        'OPTIONS': {'MAX_ENTRIES': settings.HUB_CACHE_OPTIONS['MAX_ENTRIES']},
+    }
+    return caches
+
+
+def clear_hub_cache():
+    """
+    Empty the hub cache of the test run, raising ImproperlyConfigured instead when it is any other cache. The
+    catalog version is then read again from the test database, whose rows are rolled back after each test, so the
+    genome indexes kept per catalog version are dropped too.
+    """
+    location = settings.CACHES[settings.HUB_CACHE_ALIAS].get('LOCATION', '')
+    if not os.path.basename(location).startswith(TEST_HUB_CACHE_PREFIX):
+        raise ImproperlyConfigured('Tests must be run with tracks.testrunner.TestRunner to clear the hub cache')
+    get_cache().clear()
+    selection.genome_indexes.clear()
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.hub_cache_location = tempfile.mkdtemp(prefix=TEST_HUB_CACHE_PREFIX)
+        self.hub_cache_settings = override_settings(CACHES=make_test_caches(self.hub_cache_location))
+        self.hub_cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # counts are otherwise flushed at exit, into the real cache
+        hit_counter.flush()
+        self.hub_cache_settings.disable()
+        shutil.rmtree(self.hub_cache_location, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from tracks.admin import EstimatedCountPaginator
+from tracks.hubcache import get_catalog_version
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track, TrackHealth
+from tracks import search
+from unittest.mock import patch
+import os
+import tempfile
+
+
+@override_settings(STATIC_HUBS_ROOT=os.path.join(tempfile.gettempdir(), 'topdata-test-statichubs'))
+class TrackAdminTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        genome = Genome.objects.create(name='hg19')
+        rep_name = RepName.objects.create(name='rep1')
+        for tf_name in ['CTCF', 'ELK1']:
+            tf = TranscriptionFactor.objects.create(name=tf_name)
+            for cell_type_name in ['liver', 'lung', 'K562']:
+                cell_type, _ = CellType.objects.get_or_create(name=cell_type_name)
+                name = '{}_{}'.format(tf_name, cell_type_name)
+                Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                     big_data_url='https://example.com/{}.bw'.format(name),
+                                     file_type='bigWig', tf=tf, cell_type=cell_type, rep_name=rep_name)
+        search.rebuild_index()
+        self.changelist_url = reverse('admin:tracks_track_changelist')
+
+    def get_changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, [query['sql'] for query in context.captured_queries if 'tracks_' in query['sql']]
+
+    def test_changelist_queries_do_not_grow_with_tracks(self):
+        _, queries = self.get_changelist_queries(self.changelist_url)
+        Track.objects.create(genome_id='hg19', name='extra', short_label='extra label', long_label='extra label',
+                             big_data_url='https://other.example.com/extra.bw', file_type='bigWig',
+                             tf_id='CTCF', cell_type_id='liver', rep_name_id='rep1')
+        resp, more_queries = self.get_changelist_queries(self.changelist_url)
+        self.assertEqual(len(queries), len(more_queries))
+        self.assertContains(resp, 'extra label')
+
+    def test_changelist_search_uses_index(self):
+        resp, queries = self.get_changelist_queries(self.changelist_url + '?q=ctcf+liv')
+        self.assertEqual([track.name for track in resp.context['cl'].result_list], ['CTCF_liver'])
+        self.assertTrue(any(search.SEARCH_TABLE in sql for sql in queries))
+        self.assertFalse(any('LIKE' in sql for sql in queries))
+
+    def test_changelist_search_by_id(self):
+        track = Track.objects.get(name='ELK1_lung')
+        resp = self.client.get(self.changelist_url + '?q={}'.format(track.id))
+        self.assertEqual(list(resp.context['cl'].result_list), [track])
+
+    def test_change_form_uses_autocomplete_and_raw_id_widgets(self):
+        track = Track.objects.get(name='ELK1_lung')
+        resp = self.client.get(reverse('admin:tracks_track_change', args=[track.id]))
+        content = resp.content.decode('utf-8')
+        self.assertIn('admin-autocomplete', content)
+        self.assertIn('vForeignKeyRawIdAdminField', content)
+        self.assertNotIn('<option value="K562"', content)
+
+    def make_static_hub(self):
+        os.makedirs(settings.STATIC_HUBS_ROOT, exist_ok=True)
+        with open(os.path.join(settings.STATIC_HUBS_ROOT, 'hub.txt'), 'w') as outfile:
+            outfile.write('hub')
+
+    def test_delete_action_updates_index_and_catalog_version(self):
+        self.make_static_hub()
+        catalog_version = get_catalog_version()
+        track_ids = list(Track.objects.filter(tf_id='CTCF').values_list('id', flat=True))
+        resp = self.client.post(self.changelist_url, {'action': 'delete_selected', '_selected_action': track_ids,
+                                                      'post': 'yes'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(Track.objects.count(), 3)
+        self.assertEqual(search.search_track_ids(None, 'ctcf', 10), [])
+        self.assertNotEqual(get_catalog_version(), catalog_version)
+        # static hubs may list the deleted tracks
+        self.assertFalse(os.path.exists(settings.STATIC_HUBS_ROOT))
+
+    def test_forget_health_checks_action(self):
+        track_ids = list(Track.objects.values_list('id', flat=True))
+        for track_id in track_ids:
+            TrackHealth.objects.create(track_id=track_id, is_alive=False, checked=timezone.now())
+        resp = self.client.post(self.changelist_url, {'action': 'forget_health_checks',
+                                                      '_selected_action': track_ids[:2]})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(TrackHealth.objects.count(), len(track_ids) - 2)
+
+    def test_update_search_index_action(self):
+        Track.objects.filter(name='ELK1_K562').update(name='ELK1_renamed')
+        track_id = Track.objects.get(name='ELK1_renamed').id
+        self.client.post(self.changelist_url, {'action': 'update_search_index', '_selected_action': [track_id]})
+        self.assertEqual(search.search_track_ids(None, 'renamed', 10), [track_id])
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def setUp(self):
+        Genome.objects.create(name='hg19')
+        Genome.objects.create(name='hg38')
+
+    @patch('tracks.admin.estimate_row_count')
+    def test_count_uses_estimate_of_unfiltered_table(self, mock_estimate_row_count):
+        mock_estimate_row_count.return_value = 2000000
+        self.assertEqual(EstimatedCountPaginator(Genome.objects.order_by('name'), 100).count, 2000000)
+        self.assertEqual(EstimatedCountPaginator(Genome.objects.filter(name='hg19').order_by('name'), 100).count, 1)
+
+    @patch('tracks.admin.estimate_row_count')
+    def test_count_is_exact_for_small_or_unknown_estimates(self, mock_estimate_row_count):
+        for estimate in [None, 50]:
+            mock_estimate_row_count.return_value = estimate
+            self.assertEqual(EstimatedCountPaginator(Genome.objects.order_by('name'), 100).count, 2)
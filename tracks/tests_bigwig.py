@@ -0,0 +1,94 @@
+from django.test import SimpleTestCase
+from tracks.bigwig import parse_header, parse_total_summary, summarize_zoom_data, read_summary, Summary, \
+    BigWigError, BIGWIG_MAGIC, HEADER_FORMAT, ZOOM_HEADER_FORMAT, TOTAL_SUMMARY_FORMAT, ZOOM_RECORD_FORMAT, \
+    HEADER_SIZE, ZOOM_HEADER_SIZE
+from tracks.urlcheck import UrlChecker
+from tracks.tests_urlcheck import StandInServer
+import asyncio
+import struct
+import zlib
+
+
+def make_bigwig(total_summary=None, zoom_records=(), num_zoom_levels=None, compressed=True, byte_order='<'):
+    """
+    Build the bytes of a minimal bigWig file holding a total summary and/or a coarsest zoom level made of
+    zoom_records, each a tuple of (valid_count, min, max, sum, sum_squares). Data and index sections are left out.
+    """
+    if num_zoom_levels is None:
+        num_zoom_levels = 1 if zoom_records else 0
+    total_summary_offset = HEADER_SIZE + num_zoom_levels * ZOOM_HEADER_SIZE if total_summary else 0
+    zoom_data_offset = HEADER_SIZE + num_zoom_levels * ZOOM_HEADER_SIZE + (40 if total_summary else 0)
+    records = b''.join(struct.pack(byte_order + ZOOM_RECORD_FORMAT, 0, i * 100, (i + 1) * 100, *record)
+                       for i, record in enumerate(zoom_records))
+    if compressed:
+        # each half of the records in its own compressed block
+        half = len(zoom_records) // 2 * 32
+        records = zlib.compress(records[:half]) + zlib.compress(records[half:])
+    zoom_data = struct.pack(byte_order + 'I', len(zoom_records)) + records
+    header = struct.pack(byte_order + HEADER_FORMAT, BIGWIG_MAGIC, 4, num_zoom_levels, 0, 0, 0, 0, 0, 0,
+                         total_summary_offset, 32768 if compressed else 0, 0)
+    zoom_headers = b''
+    for level in range(num_zoom_levels):
+        # levels before the last are finer and point at no data
+        is_coarsest = level == num_zoom_levels - 1
+        zoom_headers += struct.pack(byte_order + ZOOM_HEADER_FORMAT, (level + 1) * 1000, 0,
+                                    zoom_data_offset if is_coarsest else 0,
+                                    zoom_data_offset + len(zoom_data) if is_coarsest else 0)
+    data = header + zoom_headers
+    if total_summary:
+        data += struct.pack(byte_order + TOTAL_SUMMARY_FORMAT, *total_summary)
+    if zoom_records:
+        data += zoom_data
+    return data + b'\0' * 100
+
+
+class BigWigParseTest(SimpleTestCase):
+    def test_parse_header(self):
+        for byte_order in ['<', '>']:
+            header = parse_header(make_bigwig(total_summary=(10, 0.5, 9.0, 30.0, 100.0), byte_order=byte_order))
+            self.assertEqual(header.byte_order, byte_order)
+            self.assertEqual(header.version, 4)
+            self.assertEqual(header.total_summary_offset, HEADER_SIZE)
+
+    def test_parse_header_not_bigwig(self):
+        with self.assertRaises(BigWigError):
+            parse_header(b'\0' * 64)
+        with self.assertRaises(BigWigError):
+            parse_header(b'short')
+
+    def test_parse_total_summary(self):
+        data = make_bigwig(total_summary=(10, 0.5, 9.0, 30.0, 100.0))
+        header = parse_header(data)
+        self.assertEqual(parse_total_summary(header, data[HEADER_SIZE:]), Summary(10, 0.5, 9.0, 30.0, 100.0))
+
+    def test_summarize_zoom_data(self):
+        records = [(100, 1.0, 5.0, 200.0, 500.0), (50, 0.5, 8.0, 100.0, 400.0), (0, 0.0, 0.0, 0.0, 0.0)]
+        for compressed in [True, False]:
+            data = make_bigwig(zoom_records=records, compressed=compressed)
+            header = parse_header(data)
+            zoom_data = data[HEADER_SIZE + ZOOM_HEADER_SIZE:-100]
+            self.assertEqual(summarize_zoom_data(header, zoom_data), Summary(150, 0.5, 8.0, 300.0, 900.0))
+
+
+class ReadSummaryTest(SimpleTestCase):
+    def read(self, files, path):
+        with StandInServer(files) as server:
+            return asyncio.run(read_summary(UrlChecker(retries=0), server.url(path))), server.httpd.requests
+
+    def test_read_total_summary(self):
+        summary, requests = self.read({'/a.bw': make_bigwig(total_summary=(10, 0.5, 9.0, 30.0, 100.0))}, '/a.bw')
+        self.assertEqual(summary, Summary(10, 0.5, 9.0, 30.0, 100.0))
+        self.assertEqual([request[2] for request in requests], ['bytes=0-303', 'bytes=64-103'])
+
+    def test_read_coarsest_zoom_level(self):
+        records = [(100, 1.0, 5.0, 200.0, 500.0), (50, 0.5, 8.0, 100.0, 400.0)]
+        data = make_bigwig(zoom_records=records, num_zoom_levels=12)
+        summary, requests = self.read({'/a.bw': data}, '/a.bw')
+        self.assertEqual(summary, Summary(150, 0.5, 8.0, 300.0, 900.0))
+        # 12 zoom headers do not fit in the first read
+        self.assertEqual(requests[1][2], 'bytes=0-{}'.format(HEADER_SIZE + 12 * ZOOM_HEADER_SIZE - 1))
+        self.assertEqual(len(requests), 3)
+
+    def test_read_without_summary(self):
+        with self.assertRaises(BigWigError):
+            self.read({'/a.bw': make_bigwig()}, '/a.bw')
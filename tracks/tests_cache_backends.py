@@ -0,0 +1,73 @@
+from django.test import TestCase
+from tracks.cache_backends import LRUFileBasedCache
+import os
+import shutil
+import tempfile
+import time
+
+
+class LRUFileBasedCacheTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def make_cache(self, **options):
+        options.setdefault('CULL_FREQUENCY', 4)
+        return LRUFileBasedCache(self.cache_dir, {'OPTIONS': options})
+
+    def age_entries(self, cache, keys):
+        # give entries distinct last use times, oldest first
+        now = time.time()
+        for age, key in enumerate(reversed(keys)):
+            fname = cache._key_to_file(key)
+            os.utime(fname, (now - 100 - age, now - 100 - age))
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=4)
+        keys = ['a', 'b', 'c', 'd']
+        for key in keys:
+            cache.set(key, key)
+        self.age_entries(cache, keys)
+        # reading 'a' makes 'b' the least recently used entry
+        self.assertEqual(cache.get('a'), 'a')
+        cache.set('e', 'e')
+        self.assertEqual(cache.get('b'), None)
+        for key in ['a', 'c', 'd', 'e']:
+            self.assertEqual(cache.get(key), key)
+
+    def test_evicts_to_stay_under_max_bytes(self):
+        cache = self.make_cache(MAX_ENTRIES=100, MAX_BYTES=3000)
+        keys = ['a', 'b', 'c', 'd']
+        for key in keys:
+            cache.set(key, os.urandom(900))
+        self.age_entries(cache, keys)
+        cache.set('e', os.urandom(900))
+        num_entries, num_bytes = cache.usage()
+        # eviction happens before an entry is written so only the new entry can go over the limit
+        self.assertLessEqual(num_bytes - os.path.getsize(cache._key_to_file('e')), 3000)
+        self.assertEqual(cache.get('a'), None)
+        self.assertIsNotNone(cache.get('e'))
+
+    def test_add_only_succeeds_once(self):
+        cache = self.make_cache()
+        self.assertTrue(cache.add('lock', 1, 10))
+        self.assertFalse(cache.add('lock', 1, 10))
+        cache.delete('lock')
+        self.assertTrue(cache.add('lock', 1, 10))
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(cache._key_to_file('lock'))])
+
+    def test_add_replaces_expired_entry(self):
+        cache = self.make_cache()
+        cache.set('lock', 1, -1)
+        self.assertTrue(cache.add('lock', 2, 10))
+        self.assertEqual(cache.get('lock'), 2)
+
+    def test_usage(self):
+        cache = self.make_cache()
+        self.assertEqual(cache.usage(), (0, 0))
+        cache.set('a', 'a')
+        num_entries, num_bytes = cache.usage()
+        self.assertEqual(num_entries, 1)
+        self.assertGreater(num_bytes, 0)
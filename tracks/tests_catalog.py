@@ -0,0 +1,64 @@
+from django.test import TestCase
+from tracks.catalog import build_snapshot, Catalog, CatalogError, CatalogTrack, HEADER_SIZE
+import os
+import tempfile
+
+DIMENSIONS = {
+    'genomes': ['hg19'],
+    'tfs': ['AR', 'ATF'],
+    'cell_types': ['8988T'],
+    'rep_names': ['rep1', 'rep2'],
+}
+TRACK_ROWS = [
+    (3, 'hg19', 'AR_8988T_rep1', '{tf} {cell_type} {rep_name}', '{tf} {cell_type} {rep_name}',
+     'https://example.com/bigWig/', 'AR/AR_rep1.bw', 'bigWig', 'AR', '8988T', 'rep1', 'chr1:1-100'),
+    (7, 'hg19', 'ATF_8988T_rep2', '{tf} {cell_type} {rep_name}', '{tf} {cell_type} {rep_name} α',
+     'https://example.com/bigWig/', 'ATF/ATF_rep2.bw', 'bigWig', 'ATF', '8988T', 'rep2', ''),
+]
+
+
+class CatalogTests(TestCase):
+    def test_build_and_read_snapshot(self):
+        catalog = Catalog(build_snapshot(DIMENSIONS, TRACK_ROWS))
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual(catalog.names('tfs'), ['AR', 'ATF'])
+        self.assertEqual(catalog.names('rep_names'), ['rep1', 'rep2'])
+        self.assertEqual(list(catalog), [CatalogTrack(*row) for row in TRACK_ROWS])
+
+    def test_strings_are_interned(self):
+        snapshot = build_snapshot(DIMENSIONS, TRACK_ROWS)
+        self.assertEqual(snapshot.count(b'hg19'), 1)
+        self.assertEqual(snapshot.count(b'bigWig'), 2)
+        self.assertEqual(snapshot.count(b'https://example.com/bigWig/'), 1)
+        self.assertEqual(snapshot.count(b'{tf} {cell_type} {rep_name}'), 2)
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'catalog.bin')
+            with open(filename, 'wb') as outfile:
+                outfile.write(build_snapshot(DIMENSIONS, TRACK_ROWS))
+            catalog = Catalog.from_file(filename)
+            track = catalog.track(1)
+            self.assertEqual(track.short_label, 'ATF 8988T rep2')
+            self.assertEqual(track.long_label, 'ATF 8988T rep2 α')
+            self.assertEqual(track.big_data_url, 'https://example.com/bigWig/ATF/ATF_rep2.bw')
+            catalog.close()
+
+    def test_from_truncated_file(self):
+        snapshot = build_snapshot(DIMENSIONS, TRACK_ROWS)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'catalog.bin')
+            for data in [b'', snapshot[:HEADER_SIZE - 1]]:
+                with open(filename, 'wb') as outfile:
+                    outfile.write(data)
+                with self.assertRaises(CatalogError):
+                    Catalog.from_file(filename)
+
+    def test_invalid_snapshots(self):
+        snapshot = build_snapshot(DIMENSIONS, TRACK_ROWS)
+        with self.assertRaises(CatalogError):
+            Catalog(b'not a snapshot' + snapshot)
+        with self.assertRaises(CatalogError):
+            Catalog(snapshot[:HEADER_SIZE + 10])
+        with self.assertRaises(CatalogError):
+            Catalog(snapshot[:-1])
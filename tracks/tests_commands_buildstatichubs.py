@@ -0,0 +1,81 @@
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from tracks.management.commands.buildstatichubs import read_selections_from_config, make_selections, \
+    get_selection_tracks
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks.statichubs import static_hub_name
+from unittest.mock import patch, mock_open
+from io import StringIO
+import os
+import shutil
+import tempfile
+
+SELECTIONS_YAML = """
+- tfs: [AR]
+- cell_types: [8988T, CLL]
+- tfs: [ATF]
+  cell_types: [CLL]
+"""
+
+
+class BuildStaticHubsCommandTest(TestCase):
+    def setUp(self):
+        self.static_hubs_root = tempfile.mkdtemp()
+        genome = Genome.objects.create(name='hg19')
+        rep = RepName.objects.create(name='rep1')
+        for tf_name in ['AR', 'ATF']:
+            tf = TranscriptionFactor.objects.create(name=tf_name)
+            for cell_type_name in ['8988T', 'CLL']:
+                cell_type, _ = CellType.objects.get_or_create(name=cell_type_name)
+                name = '{}{}rep1'.format(tf_name, cell_type_name)
+                Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                     big_data_url='https://github.com/Duke-GCB/topdata', file_type='bigWig',
+                                     tf=tf, cell_type=cell_type, rep_name=rep, position='chr1:100-200')
+
+    def tearDown(self):
+        shutil.rmtree(self.static_hubs_root)
+
+    def track_ids(self, **filters):
+        return [str(track_id) for track_id in Track.objects.filter(**filters).order_by('id').values_list('id', flat=True)]
+
+    def test_read_selections_from_config(self):
+        with patch("builtins.open", mock_open(read_data=SELECTIONS_YAML)):
+            selections = read_selections_from_config('/tmp/selections.yaml')
+        self.assertEqual(selections, [(['AR'], None), (None, ['8988T', 'CLL']), (['ATF'], ['CLL'])])
+
+    def test_make_selections(self):
+        self.assertEqual(make_selections(each_tf=True, each_cell_type=False), [(['AR'], None), (['ATF'], None)])
+        self.assertEqual(make_selections(each_tf=False, each_cell_type=True), [(None, ['8988T']), (None, ['CLL'])])
+
+    def test_get_selection_tracks(self):
+        self.assertEqual([track.name for track in get_selection_tracks(['AR'], None)], ['AR8988Trep1', 'ARCLLrep1'])
+        self.assertEqual([track.name for track in get_selection_tracks(['AR', 'ATF'], ['CLL'])],
+                         ['ARCLLrep1', 'ATFCLLrep1'])
+
+    def test_requires_selections(self):
+        with self.assertRaises(CommandError):
+            call_command('buildstatichubs', stdout=StringIO())
+
+    def test_build_each_tf(self):
+        with override_settings(STATIC_HUBS_ROOT=self.static_hubs_root):
+            call_command('buildstatichubs', each_tf=True, processes=2, stdout=StringIO())
+        self.assertEqual(len(os.listdir(self.static_hubs_root)), 2)
+        ar_ids = self.track_ids(tf__name='AR')
+        hub_dir = os.path.join(self.static_hubs_root, static_hub_name('_'.join(ar_ids)))
+        with open(os.path.join(hub_dir, 'hub.txt')) as infile:
+            self.assertIn('hub TOPhub_{}\n'.format('_'.join(ar_ids)), infile.read())
+        with open(os.path.join(hub_dir, 'genomes.txt')) as infile:
+            self.assertEqual(infile.read(), 'genome hg19\ntrackDb hg19/trackDb.txt\n')
+        with open(os.path.join(hub_dir, 'hg19', 'trackDb.txt')) as infile:
+            track_db = infile.read()
+        self.assertIn('track AR8988Trep1\n', track_db)
+        self.assertIn('track ARCLLrep1\n', track_db)
+        self.assertNotIn('track ATF', track_db)
+
+    def test_skips_selections_over_max_tracks(self):
+        out = StringIO()
+        with override_settings(STATIC_HUBS_ROOT=self.static_hubs_root):
+            call_command('buildstatichubs', each_tf=True, each_cell_type=True, max_tracks=1, stdout=out)
+        self.assertIn('Skipping selection', out.getvalue())
+        self.assertIn('Built 0 static hubs', out.getvalue())
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track, TrackHealth
+from tracks.tests_urlcheck import StandInServer, LAST_MODIFIED
+from io import StringIO
+import os
+import tempfile
+
+
+@override_settings(STATIC_HUBS_ROOT=os.path.join(tempfile.gettempdir(), 'topdata-test-statichubs'))
+class CheckTracksCommandTest(TestCase):
+    def test_stores_results(self):
+        genome = Genome.objects.create(name='hg19')
+        tf = TranscriptionFactor.objects.create(name='AR')
+        cell_type = CellType.objects.create(name='8988T')
+        rep = RepName.objects.create(name='rep1')
+        with StandInServer({'/AR_8988T_rep1.bw': b'bigwig'}) as server:
+            for name in ['AR_8988T_rep1', 'AR_8988T_rep2']:
+                Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                     big_data_url=server.url('/{}.bw'.format(name)), file_type='bigWig',
+                                     tf=tf, cell_type=cell_type, rep_name=rep)
+            os.makedirs(os.path.join(settings.STATIC_HUBS_ROOT, 'hub'), exist_ok=True)
+            out = StringIO()
+            call_command('checktracks', retries=0, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Checked 2 tracks, 1 dead.')
+        alive = TrackHealth.objects.get(track__name='AR_8988T_rep1')
+        self.assertEqual((alive.is_alive, alive.status, alive.size, alive.last_modified, alive.error),
+                         (True, 200, 6, LAST_MODIFIED, ''))
+        dead = TrackHealth.objects.get(track__name='AR_8988T_rep2')
+        self.assertEqual((dead.is_alive, dead.status, dead.size), (False, 404, None))
+        self.assertIsNotNone(dead.checked)
+        # static hubs may list tracks that are now dead
+        self.assertFalse(os.path.exists(settings.STATIC_HUBS_ROOT))
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from io import StringIO
+import os
+import tempfile
+
+
+class ExportTracksCommandTest(TestCase):
+    def setUp(self):
+        genome = Genome.objects.create(name='hg19')
+        rep_name = RepName.objects.create(name='rep1')
+        cell_type = CellType.objects.create(name='CLL')
+        for tf_name in ['AR', 'ATF']:
+            tf = TranscriptionFactor.objects.create(name=tf_name)
+            name = '{}_CLL_rep1'.format(tf_name)
+            Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                 big_data_url='https://example.com/{}.bw'.format(name), file_type='bigWig',
+                                 tf=tf, cell_type=cell_type, rep_name=rep_name)
+
+    def test_export_to_stdout(self):
+        out = StringIO()
+        call_command('exporttracks', '--tf', 'ATF', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('\tATF_CLL_rep1\t', lines[1])
+
+    def test_export_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'trackDb.txt')
+            call_command('exporttracks', '--format', 'trackdb', '--genome', 'hg19', '--output', filename)
+            with open(filename) as infile:
+                self.assertEqual(infile.read().count('\ntrack '), 2)
+
+    def test_trackdb_export_needs_genome(self):
+        with self.assertRaises(CommandError):
+            call_command('exporttracks', '--format', 'trackdb', stdout=StringIO())
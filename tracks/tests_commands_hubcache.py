@@ -0,0 +1,29 @@
+from django.test import TestCase
+from django.core.management import call_command
+from tracks.testrunner import clear_hub_cache
+from tracks.hubcache import get_or_render, get_catalog_version, reset_stats
+from io import StringIO
+
+
+class HubCacheCommandTest(TestCase):
+    def setUp(self):
+        clear_hub_cache()
+        reset_stats()
+
+    def test_shows_stats(self):
+        get_or_render('hub', ['1_2'], lambda: 'body')
+        get_or_render('hub', ['1_2'], lambda: 'body')
+        out = StringIO()
+        call_command('hubcache', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('hub', lines[2])
+        self.assertEqual(lines[2].split(), ['hub', '1', '1', '50.0%'])
+        self.assertEqual(lines[6].split(), ['total', '1', '1', '50.0%'])
+        self.assertTrue(lines[7].startswith('Entries: '))
+
+    def test_clear(self):
+        get_or_render('hub', ['1_2'], lambda: 'body')
+        version = get_catalog_version()
+        call_command('hubcache', clear=True, stdout=StringIO())
+        self.assertNotEqual(get_catalog_version(), version)
+        self.assertEqual(get_or_render('hub', ['1_2'], lambda: 'new body'), 'new body')
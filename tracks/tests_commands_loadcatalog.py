@@ -0,0 +1,87 @@
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks.hubcache import get_catalog_version
+from io import StringIO
+import os
+import shutil
+import tempfile
+
+
+@override_settings(STATIC_HUBS_ROOT=os.path.join(tempfile.gettempdir(), 'topdata-test-statichubs'))
+class LoadCatalogCommandTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'catalog.bin')
+        genome = Genome.objects.create(name='hg19')
+        rep = RepName.objects.create(name='rep1')
+        for tf_name in ['AR', 'ATF']:
+            tf = TranscriptionFactor.objects.create(name=tf_name)
+            for cell_type_name in ['8988T', 'CLL']:
+                cell_type, _ = CellType.objects.get_or_create(name=cell_type_name)
+                name = '{}{}rep1'.format(tf_name, cell_type_name)
+                Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                     big_data_url='https://github.com/Duke-GCB/topdata', file_type='bigWig',
+                                     tf=tf, cell_type=cell_type, rep_name=rep, position='chr1:100-200')
+        Track.objects.filter(name='AR8988Trep1').delete()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def catalog_rows(self):
+        rows = []
+        for track in Track.objects.select_related(*Track.COMPACT_RELATED_FIELDS).order_by('id'):
+            rows.append((track.id, track.genome_id, track.name, track.short_label, track.long_label,
+                         track.big_data_url, track.file_type, track.tf_id, track.cell_type_id, track.rep_name_id,
+                         track.position))
+        return rows
+
+    def test_dump_and_load(self):
+        expected_rows = self.catalog_rows()
+        call_command('dumpcatalog', self.filename, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('loadcatalog', self.filename, stdout=StringIO())
+        Track.objects.all().delete()
+        TranscriptionFactor.objects.all().delete()
+        catalog_version = get_catalog_version()
+        out = StringIO()
+        call_command('loadcatalog', self.filename, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Loaded 3 tracks.')
+        # track ids are kept so hub urls still refer to the same tracks
+        self.assertEqual(self.catalog_rows(), expected_rows)
+        self.assertEqual(sorted(TranscriptionFactor.objects.values_list('name', flat=True)), ['AR', 'ATF'])
+        self.assertNotEqual(get_catalog_version(), catalog_version)
+        new_track = Track.objects.create(genome_id='hg19', name='new', tf_id='AR', cell_type_id='CLL',
+                                         rep_name_id='rep1')
+        self.assertGreater(new_track.id, expected_rows[-1][0])
+
+    def test_load_replace(self):
+        expected_rows = self.catalog_rows()
+        call_command('dumpcatalog', self.filename, stdout=StringIO())
+        Track.objects.filter(name='ATFCLLrep1').update(url_suffix='changed.bw')
+        call_command('loadcatalog', self.filename, replace=True, stdout=StringIO())
+        self.assertEqual(self.catalog_rows(), expected_rows)
+
+    def test_failed_replace_keeps_old_tracks(self):
+        expected_rows = self.catalog_rows()
+        call_command('dumpcatalog', self.filename, stdout=StringIO())
+        catalog_version = get_catalog_version()
+        with patch('tracks.management.commands.loadcatalog.load_catalog_into_database',
+                   side_effect=ValueError('disk full')):
+            with self.assertRaises(ValueError):
+                call_command('loadcatalog', self.filename, replace=True, stdout=StringIO())
+        self.assertEqual(self.catalog_rows(), expected_rows)
+        self.assertEqual(get_catalog_version(), catalog_version)
+
+    def test_load_invalid_file(self):
+        with open(self.filename, 'wb') as outfile:
+            outfile.write(b'not a catalog')
+        with self.assertRaises(CommandError):
+            call_command('loadcatalog', self.filename, stdout=StringIO())
+
+    def test_load_empty_file(self):
+        open(self.filename, 'wb').close()
+        with self.assertRaises(CommandError):
+            call_command('loadcatalog', self.filename, stdout=StringIO())
@@ -0,0 +1,93 @@
+from django.test import TestCase, LiveServerTestCase
+from django.core.management.base import CommandError
+from tracks.management.commands.loadtest import fetch, percentile, make_hub_keys, parse_trackdb_paths, summarize, \
+    GenomeBrowserReplay, HUB_ENDPOINT, GENOMES_ENDPOINT, TRACKDB_ENDPOINT
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from http.client import IncompleteRead
+from unittest.mock import patch
+
+
+def create_tracks():
+    genome = Genome.objects.create(name='hg19')
+    tf = TranscriptionFactor.objects.create(name='AR')
+    rep = RepName.objects.create(name='rep1')
+    for cell_type_name in ['8988T', 'CLL', 'A549']:
+        cell_type = CellType.objects.create(name=cell_type_name)
+        name = 'AR{}rep1'.format(cell_type_name)
+        Track.objects.create(
+            genome=genome,
+            name=name,
+            short_label=name,
+            long_label=name,
+            big_data_url='https://github.com/Duke-GCB/topdata',
+            file_type='bigWig',
+            tf=tf,
+            cell_type=cell_type,
+            rep_name=rep,
+            position='chr1:100-200'
+        )
+
+
+class LoadTestFunctionsTest(TestCase):
+    @patch('tracks.management.commands.loadtest.urlopen')
+    def test_fetch_counts_incomplete_body_as_error(self, mock_urlopen):
+        mock_urlopen.return_value.__enter__.return_value.read.side_effect = IncompleteRead(b'par', 10)
+        body, seconds, error = fetch('http://localhost/hub.txt', timeout=1)
+        self.assertEqual(body, b'')
+        self.assertIn('IncompleteRead', error)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), None)
+
+    def test_make_hub_keys(self):
+        create_tracks()
+        track_ids = [str(track_id) for track_id in Track.objects.order_by('id').values_list('id', flat=True)]
+        hub_keys = make_hub_keys(num_hubs=3, tracks_per_hub=2, seed=1)
+        self.assertEqual(len(hub_keys), 3)
+        for hub_key in hub_keys:
+            ids = hub_key.split('_')
+            self.assertEqual(len(ids), 2)
+            self.assertTrue(set(ids).issubset(track_ids))
+        self.assertEqual(hub_keys, make_hub_keys(num_hubs=3, tracks_per_hub=2, seed=1))
+
+    def test_make_hub_keys_without_tracks(self):
+        with self.assertRaises(CommandError):
+            make_hub_keys(num_hubs=1, tracks_per_hub=2)
+
+    def test_parse_trackdb_paths(self):
+        body = b'genome hg19\ntrackDb hg19/trackDb.txt\ngenome hg38\ntrackDb hg38/trackDb.txt\n'
+        self.assertEqual(parse_trackdb_paths(body), ['hg19/trackDb.txt', 'hg38/trackDb.txt'])
+
+    def test_summarize(self):
+        results = [
+            (HUB_ENDPOINT, 0.010, None),
+            (HUB_ENDPOINT, 0.020, None),
+            (GENOMES_ENDPOINT, 0.5, 'timed out'),
+        ]
+        summary = summarize(results, elapsed=2.0)
+        self.assertEqual([row['endpoint'] for row in summary], [HUB_ENDPOINT, GENOMES_ENDPOINT, TRACKDB_ENDPOINT])
+        self.assertEqual(summary[0]['requests'], 2)
+        self.assertAlmostEqual(summary[0]['p50'], 10.0)
+        self.assertAlmostEqual(summary[0]['p99'], 20.0)
+        self.assertEqual(summary[0]['throughput'], 1.0)
+        self.assertEqual(summary[1]['errors'], 1)
+        self.assertEqual(summary[1]['p50'], None)
+        self.assertEqual(summary[2]['requests'], 0)
+
+
+class GenomeBrowserReplayTest(LiveServerTestCase):
+    def test_run(self):
+        create_tracks()
+        hub_key = '_'.join(str(track_id) for track_id in Track.objects.order_by('id').values_list('id', flat=True))
+        replay = GenomeBrowserReplay(self.live_server_url, [hub_key], repeat=3, timeout=10)
+        results, elapsed = replay.run(concurrency=2)
+        self.assertEqual(len(results), 9)
+        self.assertEqual([error for _, _, error in results], [None] * 9)
+        endpoints = [endpoint for endpoint, _, _ in results]
+        self.assertEqual(endpoints.count(TRACKDB_ENDPOINT), 3)
+        self.assertGreater(elapsed, 0)
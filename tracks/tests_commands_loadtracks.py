@@ -1,7 +1,15 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.management.base import CommandError
+from tracks.testrunner import clear_hub_cache
 from tracks.management.commands.loadtracks import Command
 from tracks.models import *
+from tracks.hubcache import get_catalog_version
+from tracks.search import search_tracks
 from unittest.mock import patch, mock_open
+from io import StringIO
+import os
+import tempfile
+import yaml
 
 EXAMPLE_TRACKS_YAML = """
 - assembly: hg19
@@ -44,11 +52,14 @@ EXAMPLE_TRACKS_YAML = """
     position: "chr1:35000-40000"
 """
 
+@override_settings(STATIC_HUBS_ROOT=os.path.join(tempfile.gettempdir(), 'topdata-test-statichubs'))
 class LoadTracksCommandTest(TestCase):
     def test_load_tracks_into_database(self):
+        clear_hub_cache()
+        catalog_version = get_catalog_version()
         cmd = Command()
         with patch("builtins.open", mock_open(read_data=EXAMPLE_TRACKS_YAML)):
-            cmd.handle(filename='/tmp/data.txt')
+            cmd.handle(filenames=['/tmp/data.txt'])
 
         genomes = Genome.objects.all()
         self.assertEqual(len(genomes), 1)
@@ -79,3 +90,113 @@ class LoadTracksCommandTest(TestCase):
             self.assertEqual(track.genome.name, 'hg19')
             self.assertEqual(track.file_type, 'bigWig')
             self.assertEqual(track.position, 'chr1:35000-40000')
+
+        # loaded tracks are searchable
+        self.assertEqual([track.name for track in search_tracks('hg19', 'ATF rep2', 10)], ['ATF_8988T_rep2'])
+
+        # cached hub files are invalidated
+        self.assertNotEqual(get_catalog_version(), catalog_version)
+
+    @patch('tracks.management.commands.loadtracks.warm_from_settings')
+    def test_load_tracks_warms_cache(self, mock_warm_from_settings):
+        mock_warm_from_settings.return_value = None
+        cmd = Command()
+        with patch("builtins.open", mock_open(read_data=EXAMPLE_TRACKS_YAML)):
+            cmd.handle(filenames=['/tmp/data.txt'])
+        mock_warm_from_settings.assert_called_with()
+
+    @patch('tracks.management.commands.loadtracks.transaction')
+    def test_load_tracks_in_batches(self, mock_transaction):
+        cmd = Command()
+        with patch("builtins.open", mock_open(read_data=EXAMPLE_TRACKS_YAML)):
+            cmd.handle(filenames=['/tmp/data.txt'], batch_size=3)
+        self.assertEqual(mock_transaction.atomic.call_count, 2)
+        self.assertEqual(Track.objects.count(), 4)
+
+    def write_config(self, directory, filename, assembly, tf_name, cell_type):
+        name = '{}_{}_rep1'.format(tf_name, cell_type)
+        config = [{'assembly': assembly, 'tracks': [{
+            'bigDataUrl': 'https://github.com/Duke-GCB/topdata/fakedata/{}.bw'.format(name), 'cell_type': cell_type,
+            'longLabel': name, 'rep_name': 'rep1', 'shortLabel': name, 'tf_name': tf_name, 'track': name,
+            'type': 'bigWig'}]}]
+        with open(os.path.join(directory, filename), 'w') as outfile:
+            yaml.safe_dump(config, outfile)
+
+    def test_load_tracks_from_many_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_config(directory, 'hg19_AR.yaml', 'hg19', 'AR', '8988T')
+            self.write_config(directory, 'hg19_ATF.yaml', 'hg19', 'ATF', '8988T')
+            self.write_config(directory, 'hg38.yml', 'hg38', 'AR', 'K562')
+            Command().handle(filenames=[os.path.join(directory, '*.yaml'), os.path.join(directory, 'hg38.yml')],
+                             workers=2)
+        tracks = Track.objects.order_by('id')
+        self.assertEqual([(track.genome_id, track.name) for track in tracks],
+                         [('hg19', 'AR_8988T_rep1'), ('hg19', 'ATF_8988T_rep1'), ('hg38', 'AR_K562_rep1')])
+        self.assertEqual(tracks[2].big_data_url, 'https://github.com/Duke-GCB/topdata/fakedata/AR_K562_rep1.bw')
+        self.assertEqual(list(CellType.objects.order_by('name').values_list('name', flat=True)), ['8988T', 'K562'])
+        self.assertEqual(list(RepName.objects.values_list('name', flat=True)), ['rep1'])
+        self.assertEqual([track.id for track in search_tracks('hg38', 'AR', 10)], [tracks[2].id])
+
+    def test_load_tracks_rejects_track_in_two_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_config(directory, 'a.yaml', 'hg19', 'AR', '8988T')
+            self.write_config(directory, 'b.yaml', 'hg19', 'AR', '8988T')
+            with self.assertRaises(CommandError):
+                Command().handle(filenames=[os.path.join(directory, '*.yaml')], workers=1)
+            with self.assertRaises(CommandError):
+                Command().handle(filenames=[os.path.join(directory, '*.txt')])
+        self.assertEqual(Track.objects.count(), 0)
+
+    def test_check_lists_errors_without_writing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_config(directory, 'a.yaml', 'hg19', 'AR', '8988T')
+            self.write_config(directory, 'b.yaml', 'hg19', 'AR', '8988T')
+            stdout = StringIO()
+            with self.assertRaisesMessage(CommandError, '1 errors in 2 tracks'):
+                Command(stdout=stdout).handle(filenames=[os.path.join(directory, '*.yaml')], check=True, workers=1)
+            self.assertEqual(stdout.getvalue(), '{}:3: track AR_8988T_rep1: hg19 already has a track with this '
+                                                'name\n'.format(os.path.join(directory, 'b.yaml')))
+            stdout = StringIO()
+            Command(stdout=stdout).handle(filenames=[os.path.join(directory, 'a.yaml')], check=True)
+            self.assertEqual(stdout.getvalue(), '1 tracks in 1 files are valid\n')
+        self.assertEqual(Genome.objects.count(), 0)
+
+    def test_load_tracks_rejects_invalid_tracks_before_writing(self):
+        invalid_yaml = EXAMPLE_TRACKS_YAML.replace('    tf_name: ATF\n', '', 1)
+        with patch("builtins.open", mock_open(read_data=invalid_yaml)):
+            with self.assertRaisesMessage(CommandError, 'track ATF_8988T_rep1 of hg19: tf_name is missing'):
+                Command().handle(filenames=['/tmp/data.txt'])
+        self.assertEqual(Genome.objects.count(), 0)
+        self.assertEqual(Track.objects.count(), 0)
+
+    def test_load_tracks_rejects_tracks_already_loaded_before_writing(self):
+        with patch("builtins.open", mock_open(read_data=EXAMPLE_TRACKS_YAML)):
+            Command().handle(filenames=['/tmp/data.txt'])
+        catalog_version = get_catalog_version()
+        more_yaml = EXAMPLE_TRACKS_YAML.replace('AR_8988T_rep1', 'AR_8988T_rep3').replace('AR_8988T_rep2',
+                                                                                          'AR_8988T_rep4')
+        with patch("builtins.open", mock_open(read_data=more_yaml)):
+            with self.assertRaisesMessage(CommandError, 'track ATF_8988T_rep1 of hg19: hg19 already has a track'):
+                Command().handle(filenames=['/tmp/data.txt'], batch_size=1)
+        self.assertEqual(Track.objects.count(), 4)
+        self.assertEqual(get_catalog_version(), catalog_version)
+
+    @patch('tracks.management.commands.loadtracks.check_track_dicts')
+    def test_failed_load_invalidates_committed_batches(self, mock_check_track_dicts):
+        with patch("builtins.open", mock_open(read_data=EXAMPLE_TRACKS_YAML)):
+            Command().handle(filenames=['/tmp/data.txt'])
+        catalog_version = get_catalog_version()
+        new_yaml = EXAMPLE_TRACKS_YAML.replace('ATF_8988T_rep1', 'ATF_8988T_rep3').replace('AR_8988T_rep1',
+                                                                                          'AR_8988T_rep3')
+        with patch("builtins.open", mock_open(read_data=new_yaml)):
+            with self.assertRaisesMessage(CommandError, 'Saved 1 of 4 tracks'):
+                Command().handle(filenames=['/tmp/data.txt'], batch_size=1)
+        self.assertEqual(Track.objects.count(), 5)
+        self.assertNotEqual(get_catalog_version(), catalog_version)
+
+    def test_insert_tracks_reads_back_ids_in_batches(self):
+        with patch('tracks.management.commands.loadtracks.IN_QUERY_BATCH_SIZE', 3):
+            with patch("builtins.open", mock_open(read_data=EXAMPLE_TRACKS_YAML)):
+                Command().handle(filenames=['/tmp/data.txt'])
+        self.assertEqual(Track.objects.count(), 4)
+        self.assertEqual([track.name for track in search_tracks('hg19', 'ATF rep2', 10)], ['ATF_8988T_rep2'])
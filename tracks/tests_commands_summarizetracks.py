@@ -0,0 +1,54 @@
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track, TrackSummary
+from tracks.tests_urlcheck import StandInServer
+from tracks.tests_bigwig import make_bigwig
+from io import StringIO
+import os
+import tempfile
+
+
+@override_settings(STATIC_HUBS_ROOT=os.path.join(tempfile.gettempdir(), 'topdata-test-statichubs'))
+class SummarizeTracksCommandTest(TestCase):
+    def setUp(self):
+        self.genome = Genome.objects.create(name='hg19')
+        self.tf = TranscriptionFactor.objects.create(name='AR')
+        self.cell_type = CellType.objects.create(name='8988T')
+        self.rep = RepName.objects.create(name='rep1')
+
+    def create_track(self, name, url):
+        return Track.objects.create(genome=self.genome, name=name, short_label=name, long_label=name,
+                                    big_data_url=url, file_type='bigWig', tf=self.tf, cell_type=self.cell_type,
+                                    rep_name=self.rep)
+
+    def test_stores_summaries(self):
+        files = {
+            '/good.bw': make_bigwig(total_summary=(200, 0.0, 0.75, 50.0, 20.0)),
+            '/bad.bw': b'not a bigwig',
+        }
+        with StandInServer(files) as server:
+            good = self.create_track('good', server.url('/good.bw'))
+            bad = self.create_track('bad', server.url('/bad.bw'))
+            missing = self.create_track('missing', server.url('/missing.bw'))
+            out = StringIO()
+            err = StringIO()
+            call_command('summarizetracks', retries=0, stdout=out, stderr=err)
+        self.assertEqual(out.getvalue().strip(), 'Summarized 1 of 3 tracks.')
+        self.assertIn('Unable to summarize {}'.format(bad.big_data_url), err.getvalue())
+        self.assertIn('Unable to summarize {}'.format(missing.big_data_url), err.getvalue())
+        summary = TrackSummary.objects.get(track=good)
+        self.assertEqual((summary.bases_covered, summary.min_value, summary.max_value, summary.mean_value),
+                         (200, 0.0, 0.75, 0.25))
+        self.assertEqual(Track.objects.get(pk=good.pk).get_view_limits(), '0:0.75')
+        self.assertEqual(Track.objects.get(pk=bad.pk).get_view_limits(), '0:100')
+
+    def test_failed_reads_keep_summaries(self):
+        files = {'/good.bw': make_bigwig(total_summary=(200, 0.0, 0.75, 50.0, 20.0))}
+        with StandInServer(files) as server:
+            good = self.create_track('good', server.url('/good.bw'))
+            unavailable = self.create_track('unavailable', server.url('/unavailable.bw'))
+            TrackSummary.objects.create(track=good, bases_covered=10, min_value=0, max_value=2, mean_value=1)
+            TrackSummary.objects.create(track=unavailable, bases_covered=10, min_value=-1, max_value=5, mean_value=1)
+            call_command('summarizetracks', retries=0, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Track.objects.get(pk=good.pk).get_view_limits(), '0:0.75')
+        self.assertEqual(Track.objects.get(pk=unavailable.pk).get_view_limits(), '-1:5')
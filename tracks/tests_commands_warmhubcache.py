@@ -0,0 +1,82 @@
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from tracks.testrunner import clear_hub_cache
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks.hubcache import is_cached, get_stats, reset_stats
+from tracks.prewarm import warm_hub
+from io import StringIO
+import os
+import shutil
+import tempfile
+import time
+
+LOG_LINE = '10.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "GET /tracks/{}/{} HTTP/1.1" 200 120 "-" "igv"\n'
+
+
+class WarmHubCacheCommandTest(TestCase):
+    def setUp(self):
+        clear_hub_cache()
+        reset_stats()
+        self.log_dir = tempfile.mkdtemp()
+        genome = Genome.objects.create(name='hg19')
+        tf = TranscriptionFactor.objects.create(name='AR')
+        cell_type = CellType.objects.create(name='8988T')
+        rep = RepName.objects.create(name='rep1')
+        self.track_ids = []
+        for name in ['AR_8988T_rep1', 'AR_8988T_rep2']:
+            track = Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                         big_data_url='https://github.com/Duke-GCB/topdata', file_type='bigWig',
+                                         tf=tf, cell_type=cell_type, rep_name=rep, position='chr1:100-200')
+            self.track_ids.append(str(track.id))
+        self.popular_key = '_'.join(self.track_ids)
+        self.rare_key = self.track_ids[0]
+        self.log_path = os.path.join(self.log_dir, 'access.log')
+        with open(self.log_path, 'w') as outfile:
+            for _ in range(3):
+                outfile.write(LOG_LINE.format(self.popular_key, 'hub.txt'))
+                outfile.write(LOG_LINE.format(self.popular_key, 'hg19/trackDb.txt'))
+            outfile.write(LOG_LINE.format(self.rare_key, 'hub.txt'))
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+    def test_warms_top_hubs(self):
+        out = StringIO()
+        call_command('warmhubcache', self.log_path, top=1, stdout=out)
+        self.assertTrue(is_cached('hub', [self.popular_key]))
+        self.assertTrue(is_cached('genomes', [self.popular_key]))
+        self.assertTrue(is_cached('trackdb', [self.popular_key, 'hg19']))
+        self.assertFalse(is_cached('hub', [self.rare_key]))
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Read 7 hub file requests.')
+        self.assertTrue(lines[1].startswith('Warmed 3 files of 1 hubs in '))
+        self.assertEqual(lines[2], 'Expected hit ratio for the logged requests: 0.0% before, 85.7% after.')
+        # warming is not counted as cache lookups
+        self.assertEqual(sum(row['hits'] + row['misses'] for row in get_stats()), 0)
+
+    def test_warmed_hub_is_served_from_cache(self):
+        call_command('warmhubcache', self.log_path, stdout=StringIO())
+        response = self.client.get('/tracks/{}/hub.txt'.format(self.popular_key))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_stats()[0]['hits'], 1)
+
+    def test_time_limit(self):
+        out = StringIO()
+        call_command('warmhubcache', self.log_path, time_limit=0, stdout=out)
+        self.assertFalse(is_cached('hub', [self.popular_key]))
+        self.assertIn('(time limit reached)', out.getvalue())
+
+    def test_warm_hub_stops_at_deadline(self):
+        self.assertEqual(warm_hub(self.popular_key, deadline=time.monotonic()), 0)
+        self.assertFalse(is_cached('hub', [self.popular_key]))
+        self.assertEqual(warm_hub(self.popular_key, deadline=time.monotonic() + 60), 3)
+
+    def test_uses_settings_logs(self):
+        with override_settings(HUB_CACHE_WARM_LOGS=[os.path.join(self.log_dir, '*.log')]):
+            call_command('warmhubcache', stdout=StringIO())
+        self.assertTrue(is_cached('hub', [self.rare_key]))
+
+    def test_no_logs(self):
+        with self.assertRaises(CommandError):
+            call_command('warmhubcache', os.path.join(self.log_dir, 'missing.log'), stdout=StringIO())
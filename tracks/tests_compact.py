@@ -0,0 +1,26 @@
+from django.test import TestCase
+from tracks.compact import split_big_data_url, make_label_format, format_label
+
+NAMES = {'tf': 'AR', 'cell_type': '8988T', 'rep_name': 'rep1'}
+
+
+class CompactTest(TestCase):
+    def test_split_big_data_url(self):
+        self.assertEqual(split_big_data_url('https://example.com/bigWig/AR/8988T_rep1.bw', NAMES.values()),
+                         ('https://example.com/bigWig/', 'AR/8988T_rep1.bw'))
+        self.assertEqual(split_big_data_url('https://example.com/bigWig/AR_8988T_rep1.bw', NAMES.values()),
+                         ('https://example.com/bigWig/', 'AR_8988T_rep1.bw'))
+        self.assertEqual(split_big_data_url('https://example.com', NAMES.values()), ('https://example.com', ''))
+        self.assertEqual(split_big_data_url('', NAMES.values()), ('', ''))
+
+    def test_make_label_format(self):
+        self.assertEqual(make_label_format('AR 8988T rep1', NAMES), '{tf} {cell_type} {rep_name}')
+        # names are only replaced as whole words
+        self.assertEqual(make_label_format('ARX 8988T_rep1', NAMES), 'ARX {cell_type}_{rep_name}')
+        self.assertEqual(make_label_format('{AR}', NAMES), '{{{tf}}}')
+        self.assertEqual(make_label_format('other', NAMES), 'other')
+
+    def test_make_label_format_round_trip(self):
+        names = {'tf': 'rep', 'cell_type': 'rep', 'rep_name': ''}
+        for label in ['rep rep', 'a {b} rep', '}{', '']:
+            self.assertEqual(format_label(make_label_format(label, names), names), label)
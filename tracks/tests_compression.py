@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.test.client import RequestFactory
+from tracks.compression import compress_body, parse_accept_encoding, choose_encoding, make_encoded_response, \
+    IDENTITY, GZIP, BROTLI, MIN_COMPRESS_BYTES, brotli
+import gzip
+import unittest
+
+TRACK_STANZA = """
+track AR8988Trep1
+bigDataUrl https://github.com/Duke-GCB/topdata
+graphTypeDefault bar
+autoScale off
+viewLimits 0:100
+visibility dense
+"""
+
+
+class CompressBodyTest(TestCase):
+    def test_small_body_is_not_compressed(self):
+        self.assertEqual(compress_body('hub TOPhub_1'), {IDENTITY: b'hub TOPhub_1'})
+
+    def test_compresses_large_body(self):
+        body = TRACK_STANZA * 20
+        self.assertGreater(len(body), MIN_COMPRESS_BYTES)
+        encoded_bodies = compress_body(body)
+        self.assertEqual(encoded_bodies[IDENTITY], body.encode('utf-8'))
+        self.assertEqual(gzip.decompress(encoded_bodies[GZIP]), body.encode('utf-8'))
+        self.assertLess(len(encoded_bodies[GZIP]), len(body) / 10)
+
+    @unittest.skipUnless(brotli, 'brotli is not installed')
+    def test_compresses_with_brotli(self):
+        body = TRACK_STANZA * 20
+        encoded_bodies = compress_body(body)
+        self.assertEqual(brotli.decompress(encoded_bodies[BROTLI]), body.encode('utf-8'))
+
+
+class ChooseEncodingTest(TestCase):
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding('gzip, deflate;q=0.5, br;q=0, *;q=bad'), {
+            'gzip': 1.0, 'deflate': 0.5, 'br': 0.0, '*': 0.0
+        })
+        self.assertEqual(parse_accept_encoding(''), {})
+
+    def test_choose_encoding(self):
+        all_encodings = [IDENTITY, GZIP, BROTLI]
+        self.assertEqual(choose_encoding('gzip, deflate, br', all_encodings), BROTLI)
+        self.assertEqual(choose_encoding('gzip, deflate, br', [IDENTITY, GZIP]), GZIP)
+        self.assertEqual(choose_encoding('gzip;q=0.5, br;q=0', all_encodings), GZIP)
+        self.assertEqual(choose_encoding('*', all_encodings), BROTLI)
+        self.assertEqual(choose_encoding('deflate', all_encodings), IDENTITY)
+        self.assertEqual(choose_encoding('', all_encodings), IDENTITY)
+        self.assertEqual(choose_encoding('gzip', [IDENTITY]), IDENTITY)
+        # quality values decide, preference only breaks ties
+        self.assertEqual(choose_encoding('gzip;q=1, br;q=0.1', all_encodings), GZIP)
+        self.assertEqual(choose_encoding('br;q=0.5, gzip;q=0.5', all_encodings), BROTLI)
+        self.assertEqual(choose_encoding('identity;q=1, gzip;q=0.5', all_encodings), IDENTITY)
+        self.assertEqual(choose_encoding('gzip;q=0.5, *;q=0.8', all_encodings), BROTLI)
+
+
+class MakeEncodedResponseTest(TestCase):
+    def test_gzip_response(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = make_encoded_response(request, {IDENTITY: b'data', GZIP: b'gzipped'}, content_type='text/plain')
+        self.assertEqual(response.content, b'gzipped')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+    def test_identity_response(self):
+        request = RequestFactory().get('/')
+        response = make_encoded_response(request, {IDENTITY: b'data'}, content_type='text/plain')
+        self.assertEqual(response.content, b'data')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
@@ -0,0 +1,90 @@
+from django.test import SimpleTestCase
+from tracks.configcheck import check_configs, check_track, split_config, format_error, ConfigError
+import os
+import tempfile
+
+TRACK_YAML = """  - bigDataUrl: {url}
+    cell_type: 8988T
+    longLabel: {name}
+    rep_name: rep1
+    shortLabel: {name}
+    tf_name: AR
+    track: {name}
+    type: bigWig
+"""
+
+
+def make_tracks_yaml(assembly, names, url='https://example.com/{}.bw'):
+    return '- assembly: {}\n  tracks:\n'.format(assembly) + ''.join(
+        TRACK_YAML.format(url=url.format(name), name=name) for name in names)
+
+
+class ConfigCheckTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_config(self, filename, text):
+        path = os.path.join(self.directory.name, filename)
+        with open(path, 'w') as outfile:
+            outfile.write(text)
+        return path
+
+    def test_check_track(self):
+        track_dict = {'track': 'a', 'type': 'bigWig', 'shortLabel': 'a', 'longLabel': 'a', 'tf_name': 'AR',
+                      'cell_type': '', 'rep_name': 'rep1', 'bigDataUrl': 'htp://example.com/a.bw', 'position': []}
+        self.assertEqual(check_track(track_dict), [
+            ('cell_type', 'cell_type is missing'),
+            ('position', 'position must be text'),
+            ('bigDataUrl', 'bigDataUrl htp://example.com/a.bw is not an http, https or ftp url'),
+        ])
+        track_dict.update(cell_type='CLL', bigDataUrl='ftp://example.com/a.bw', position='x' * 256)
+        self.assertEqual(check_track(track_dict), [('position', 'position is longer than 255 characters')])
+
+    def test_split_config_chunks_are_valid_files(self):
+        path = self.write_config('tracks.yaml', make_tracks_yaml('hg19', ['a', 'b', 'c']) +
+                                 make_tracks_yaml('hg38', ['a']))
+        chunks = list(split_config(path, chunk_lines=8))
+        self.assertEqual([(chunk.header_line, chunk.header_size, chunk.body_line) for chunk in chunks],
+                         [(1, 2, 3), (1, 2, 11), (1, 2, 19), (27, 2, 29)])
+        self.assertEqual(chunks[1].text, make_tracks_yaml('hg19', ['b']))
+        self.assertEqual(check_configs([path], chunk_lines=8), ([], 4))
+
+    def test_errors_have_line_numbers(self):
+        text = make_tracks_yaml('hg19', ['a', 'b', 'c', 'a']).replace('    tf_name: AR\n', '', 1).replace(
+            'https://example.com/b.bw', 'example.com/b.bw')
+        text += '- tracks:\n' + TRACK_YAML.format(url='https://example.com/d.bw', name='d')
+        path = self.write_config('tracks.yaml', text)
+        expected = [
+            ConfigError(path, 3, 'track a: tf_name is missing'),
+            ConfigError(path, 10, 'track b: bigDataUrl example.com/b.bw is not an http, https or ftp url'),
+            ConfigError(path, 26, 'track a: hg19 already has a track with this name'),
+            ConfigError(path, 34, 'Genome is missing assembly'),
+        ]
+        for chunk_lines in [1, 1000]:
+            for workers in [1, 2]:
+                self.assertEqual(check_configs([path], workers, chunk_lines), (expected, 5))
+        self.assertEqual(format_error(expected[0]), '{}:3: track a: tf_name is missing'.format(path))
+
+    def test_duplicates_across_files(self):
+        first_path = self.write_config('a.yaml', make_tracks_yaml('hg19', ['a', 'b']))
+        second_path = self.write_config('b.yaml', make_tracks_yaml('hg38', ['a']) + make_tracks_yaml('hg19', ['b']))
+        self.assertEqual(check_configs([first_path, second_path]), (
+            [ConfigError(second_path, 13, 'track b: hg19 already has a track with this name')], 4))
+
+    def test_invalid_yaml(self):
+        path = self.write_config('tracks.yaml', make_tracks_yaml('hg19', ['a', 'b']).replace(
+            '    rep_name: rep1\n', '  rep_name: rep1\n', 1))
+        errors, _ = check_configs([path])
+        # the parser finds the problem on the line after the badly indented one
+        self.assertEqual([(error.line, error.message[:12]) for error in errors], [(7, 'Invalid YAML')])
+
+    def test_genome_with_assembly_after_tracks_is_not_cut(self):
+        text = '-   tracks:\n' + TRACK_YAML.format(url='https://example.com/a.bw', name='a').replace(
+            '  - ', '    - ').replace('\n    ', '\n      ') * 2 + '    assembly: hg19\n'
+        path = self.write_config('tracks.yaml', text)
+        self.assertEqual(len(list(split_config(path, chunk_lines=1))), 1)
+        self.assertEqual(check_configs([path], chunk_lines=1), (
+            [ConfigError(path, 10, 'track a: hg19 already has a track with this name')], 2))
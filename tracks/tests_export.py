@@ -0,0 +1,73 @@
+from django.test import TestCase
+from django.urls import reverse
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track, TrackSummary
+from tracks import export
+from unittest.mock import patch
+import json
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        rep_name = RepName.objects.create(name='rep1')
+        for genome_name in ['hg19', 'hg38']:
+            genome = Genome.objects.create(name=genome_name)
+            for tf_name in ['AR', 'ATF']:
+                tf, _ = TranscriptionFactor.objects.get_or_create(name=tf_name)
+                for cell_type_name in ['8988T', 'CLL']:
+                    cell_type, _ = CellType.objects.get_or_create(name=cell_type_name)
+                    name = '{}_{}_rep1'.format(tf_name, cell_type_name)
+                    Track.objects.create(genome=genome, name=name, short_label=name,
+                                         long_label='{} {}\tlong'.format(tf_name, cell_type_name),
+                                         big_data_url='https://example.com/{}/{}.bw'.format(genome_name, name),
+                                         file_type='bigWig', tf=tf, cell_type=cell_type, rep_name=rep_name,
+                                         position='chr1:100-200')
+
+    def export_text(self, *args):
+        return ''.join(export.export_tracks(*args))
+
+    def test_export_tsv(self):
+        lines = self.export_text(export.TSV, 'hg38', ['ATF'], ['CLL']).splitlines()
+        track = Track.objects.get(genome_id='hg38', name='ATF_CLL_rep1')
+        self.assertEqual(lines, [
+            'id\tgenome\tname\ttf\tcell_type\trep_name\tfile_type\tbig_data_url\tshort_label\tlong_label\tposition',
+            '{}\thg38\tATF_CLL_rep1\tATF\tCLL\trep1\tbigWig\thttps://example.com/hg38/ATF_CLL_rep1.bw\t'
+            'ATF_CLL_rep1\tATF CLL long\tchr1:100-200'.format(track.id),
+        ])
+
+    def test_export_ndjson(self):
+        rows = [json.loads(line) for line in self.export_text(export.NDJSON, None, ['AR']).splitlines()]
+        self.assertEqual([(row['genome'], row['name']) for row in rows], [
+            ('hg19', 'AR_8988T_rep1'), ('hg19', 'AR_CLL_rep1'), ('hg38', 'AR_8988T_rep1'), ('hg38', 'AR_CLL_rep1')])
+        self.assertEqual(rows[0]['long_label'], 'AR 8988T\tlong')
+
+    def test_export_trackdb(self):
+        track = Track.objects.get(genome_id='hg19', name='AR_CLL_rep1')
+        TrackSummary.objects.create(track=track, bases_covered=10, min_value=0, max_value=0.5, mean_value=0.1)
+        text = self.export_text(export.TRACKDB, 'hg19')
+        self.assertEqual(text.count('\ntrack '), 4)
+        self.assertIn('track AR_CLL_rep1\nbigDataUrl https://example.com/hg19/AR_CLL_rep1.bw\n', text)
+        self.assertIn('viewLimits 0:0.5\n', text)
+
+    def test_export_errors(self):
+        with self.assertRaises(export.ExportError):
+            export.export_tracks('xml')
+        with self.assertRaises(export.ExportError):
+            export.export_tracks(export.TRACKDB)
+
+    @patch('tracks.export.EXPORT_CHUNK_SIZE', 3)
+    def test_export_in_chunks(self):
+        chunks = list(export.export_tracks(export.NDJSON))
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [3, 3, 2])
+
+    def test_export_view(self):
+        resp = self.client.get(reverse('tracks-export') + '?format=ndjson&genome=hg19&celltype=CLL')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(resp['Content-Disposition'], 'attachment; filename="tracks_hg19.ndjson"')
+        rows = [json.loads(line) for line in b''.join(resp.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['AR_CLL_rep1', 'ATF_CLL_rep1'])
+
+    def test_export_view_bad_request(self):
+        resp = self.client.get(reverse('tracks-export') + '?format=trackdb')
+        self.assertEqual(resp.status_code, 400)
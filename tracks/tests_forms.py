@@ -1,6 +1,7 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-from tracks.forms import BootstrapErrorList, TranscriptionFactorForm, FormFields, CellTypeForm, \
+from tracks.testrunner import clear_hub_cache
+from tracks.forms import BootstrapErrorList, GenomeForm, TranscriptionFactorForm, FormFields, CellTypeForm, \
     TracksMultipleChoiceField, TracksForm
 from tracks.models import TranscriptionFactor, CellType, Genome, RepName, Track
 from unittest.mock import patch, Mock
@@ -8,6 +9,8 @@ from unittest.mock import patch, Mock
 
 class TestCaseWithTrackData(TestCase):
     def setUp(self):
+        # forget the selection indexes of other tests
+        clear_hub_cache()
         genome = Genome.objects.create(name='hg19')
         tf1 = TranscriptionFactor.objects.create(name='AR')
         tf2 = TranscriptionFactor.objects.create(name='ATF')
@@ -31,6 +34,16 @@ class TestCaseWithTrackData(TestCase):
                         rep_name=rep,
                         position='chr1:100-200'
                     )
+        # tfs and cell types of other genomes are not offered
+        Track.objects.create(
+            genome=Genome.objects.create(name='mm10'),
+            name='Foxa1Liverrep1',
+            big_data_url='https://github.com/Duke-GCB/topdata',
+            file_type='bigWig',
+            tf=TranscriptionFactor.objects.create(name='Foxa1'),
+            cell_type=CellType.objects.create(name='Liver'),
+            rep_name=rep1,
+        )
 
 
 class BootstrapErrorListTest(TestCase):
@@ -41,21 +54,37 @@ class BootstrapErrorListTest(TestCase):
         self.assertEqual(error_list.as_ul(), expected)
 
 
-class TranscriptionFactorFormTest(TestCase):
-    def setUp(self):
-        TranscriptionFactor.objects.create(name='AR')
-        TranscriptionFactor.objects.create(name='ATF')
+class GenomeFormTest(TestCaseWithTrackData):
+    def test_initial_empty(self):
+        form = GenomeForm()
+        self.assertEqual(form.is_valid(), False)
+        paragraph_html = form.as_p()
+        self.assertIn('<option value="hg19">hg19</option>', paragraph_html)
+        self.assertIn('<option value="mm10">mm10</option>', paragraph_html)
 
+    def test_data_invalid(self):
+        form = GenomeForm(data={FormFields.GENOME: 'hg38'})
+        self.assertEqual(form.is_valid(), False)
+
+    def test_next_step_url(self):
+        form = GenomeForm(data={FormFields.GENOME: 'mm10'})
+        form.is_valid()
+        self.assertEqual(form.next_step_url(), '/tracks/select-factors/?genome=mm10')
+
+
+class TranscriptionFactorFormTest(TestCaseWithTrackData):
     def test_initial_empty(self):
-        form = TranscriptionFactorForm()
+        form = TranscriptionFactorForm(initial={FormFields.GENOME: 'hg19'})
         self.assertEqual(form.is_valid(), False)
         self.assertEqual(form.errors, {})
         paragraph_html = form.as_p()
         self.assertIn('<option value="AR">AR</option>', paragraph_html)
         self.assertIn('<option value="ATF">ATF</option>', paragraph_html)
+        self.assertNotIn('Foxa1', paragraph_html)
+        self.assertIn('<input type="hidden" name="genome" value="hg19"', paragraph_html)
 
     def test_data_empty(self):
-        form = TranscriptionFactorForm(data={FormFields.TF_NAME: []})
+        form = TranscriptionFactorForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: []})
         self.assertEqual(form.is_valid(), False)
         self.assertEqual(form.errors, {FormFields.TF_NAME: ['This field is required.']})
         paragraph_html = form.as_p()
@@ -63,22 +92,28 @@ class TranscriptionFactorFormTest(TestCase):
         self.assertIn('<option value="ATF">ATF</option>', paragraph_html)
 
     def test_data_valid(self):
-        form = TranscriptionFactorForm(data={FormFields.TF_NAME: ['AR']})
+        form = TranscriptionFactorForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR']})
         self.assertEqual(form.is_valid(), True)
         self.assertEqual(form.errors, {})
         paragraph_html = form.as_p()
         self.assertIn('<option value="AR" selected>AR</option>', paragraph_html)
         self.assertIn('<option value="ATF">ATF</option>', paragraph_html)
 
+    def test_tf_of_other_genome_invalid(self):
+        form = TranscriptionFactorForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['Foxa1']})
+        self.assertEqual(form.is_valid(), False)
+        form = TranscriptionFactorForm(data={FormFields.GENOME: 'mm10', FormFields.TF_NAME: ['Foxa1']})
+        self.assertEqual(form.is_valid(), True)
+
     def test_next_step_url(self):
-        form = TranscriptionFactorForm(data={FormFields.TF_NAME: ['AR', 'ATF']})
+        form = TranscriptionFactorForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR', 'ATF']})
         form.is_valid()
-        self.assertEqual(form.next_step_url(), '/tracks/select-cell-type/?tf=AR&tf=ATF')
+        self.assertEqual(form.next_step_url(), '/tracks/select-cell-type/?genome=hg19&tf=AR&tf=ATF')
 
 
 class CellTypeFormTest(TestCaseWithTrackData):
     def test_initial_empty(self):
-        form = CellTypeForm(initial={FormFields.TF_NAME: ['AR']})
+        form = CellTypeForm(initial={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR']})
         self.assertEqual(form.is_valid(), False)
         self.assertEqual(form.errors, {})
         paragraph_html = form.as_p()
@@ -88,7 +123,7 @@ class CellTypeFormTest(TestCaseWithTrackData):
         self.assertIn('<input type="hidden" name="tf" value="AR"', paragraph_html)
 
     def test_data_empty(self):
-        form = CellTypeForm(data={FormFields.TF_NAME: ['AR'], FormFields.CELL_TYPE: []})
+        form = CellTypeForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR'], FormFields.CELL_TYPE: []})
         self.assertEqual(form.is_valid(), False)
         self.assertEqual(form.errors, {FormFields.CELL_TYPE: ['This field is required.']})
         paragraph_html = form.as_p()
@@ -98,7 +133,7 @@ class CellTypeFormTest(TestCaseWithTrackData):
         self.assertIn('<input type="hidden" name="tf" value="AR"', paragraph_html)
 
     def test_data_valid(self):
-        form = CellTypeForm(data={FormFields.TF_NAME: ['AR'], FormFields.CELL_TYPE: ['CLL']})
+        form = CellTypeForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR'], FormFields.CELL_TYPE: ['CLL']})
         self.assertEqual(form.is_valid(), True)
         self.assertEqual(form.errors, {})
         paragraph_html = form.as_p()
@@ -110,21 +145,38 @@ class CellTypeFormTest(TestCaseWithTrackData):
     @patch('tracks.forms.settings')
     def test_too_many_tracks(self, mock_settings):
         mock_settings.TRACK_SELECTION_LIMIT = 3
-        form = CellTypeForm(data={FormFields.TF_NAME: ['AR', 'ATF'], FormFields.CELL_TYPE: ['8988T', 'CLL']})
+        form = CellTypeForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR', 'ATF'],
+                                  FormFields.CELL_TYPE: ['8988T', 'CLL']})
         self.assertEqual(form.is_valid(), False)
         self.assertEqual(form.errors, {
             '__all__': ['Too many cell types selected. Your selection resulted in 4 tracks. Max allowed is 3.']
         })
 
         mock_settings.TRACK_SELECTION_LIMIT = 100
-        form = CellTypeForm(data={FormFields.TF_NAME: ['AR', 'ATF'], FormFields.CELL_TYPE: ['8988T', 'CLL']})
+        form = CellTypeForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR', 'ATF'],
+                                  FormFields.CELL_TYPE: ['8988T', 'CLL']})
         self.assertEqual(form.is_valid(), True)
         self.assertEqual(form.errors, {})
 
+        # TOPDATA_TRACK_SELECTION_LIMIT gives a string
+        mock_settings.TRACK_SELECTION_LIMIT = '3'
+        form = CellTypeForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR', 'ATF'],
+                                  FormFields.CELL_TYPE: ['8988T', 'CLL']})
+        self.assertEqual(form.is_valid(), False)
+
     def test_next_step_url(self):
-        form = CellTypeForm(data={FormFields.TF_NAME: ['AR', 'ATF'], FormFields.CELL_TYPE: ['8988T', 'CLL']})
+        form = CellTypeForm(data={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR', 'ATF'],
+                                  FormFields.CELL_TYPE: ['8988T', 'CLL']})
         form.is_valid()
-        self.assertEqual(form.next_step_url(), '/tracks/select-tracks/?tf=AR&tf=ATF&celltype=8988T&celltype=CLL')
+        self.assertEqual(form.next_step_url(),
+                         '/tracks/select-tracks/?genome=hg19&tf=AR&tf=ATF&celltype=8988T&celltype=CLL')
+
+    def test_cell_types_of_selected_tfs(self):
+        paragraph_html = CellTypeForm(initial={FormFields.GENOME: 'mm10', FormFields.TF_NAME: ['Foxa1']}).as_p()
+        self.assertIn('<option value="Liver">Liver</option>', paragraph_html)
+        self.assertNotIn('CLL', paragraph_html)
+        paragraph_html = CellTypeForm(initial={FormFields.GENOME: 'hg19', FormFields.TF_NAME: ['AR']}).as_p()
+        self.assertNotIn('Liver', paragraph_html)
 
 
 class TracksMultipleChoiceFieldTest(TestCaseWithTrackData):
@@ -145,24 +197,50 @@ class TracksFormTest(TestCaseWithTrackData):
         self.assertEqual(form.errors, {})
 
     def test_data_empty(self):
-        form = TracksForm(data={'track_str': []})
+        form = TracksForm(data={'genome': 'hg19', 'track_str': []})
         self.assertEqual(form.is_valid(), False)
         self.assertEqual(form.errors, {'track_str': ['This field is required.']})
 
     def test_data_invalid(self):
-        form = TracksForm(data={'track_str': ['X,Y']})
+        form = TracksForm(data={'genome': 'hg19', 'track_str': ['X,Y']})
         self.assertEqual(form.is_valid(), False)
         self.assertEqual(form.errors, {'track_str': ['Select a valid choice. X,Y is not one of the available choices.']})
 
     def test_data_valid(self):
-        form = TracksForm(data={'track_str': ['AR,8988T']})
+        form = TracksForm(data={'genome': 'hg19', 'track_str': ['AR,8988T']})
         self.assertEqual(form.is_valid(), True)
         self.assertEqual(form.errors, {})
 
+    def test_pair_without_tracks_in_genome(self):
+        form = TracksForm(data={'genome': 'mm10', 'track_str': ['AR,8988T']})
+        self.assertEqual(form.is_valid(), False)
+        self.assertEqual(form.errors, {'__all__': ['There are no AR 8988T tracks for mm10.']})
+
     def test_next_step_url(self):
         mock_request = Mock()
         mock_request.build_absolute_uri = lambda x: x
-        form = TracksForm(data={'track_str': ['AR,8988T', 'AR,CLL', 'ATF,CLL']})
+        form = TracksForm(data={'genome': 'hg19', 'track_str': ['AR,8988T', 'AR,CLL', 'ATF,CLL']})
         form.is_valid()
         url = form.next_step_url(mock_request)
-        self.assertEqual(url, 'https://genome.ucsc.edu/cgi-bin/hgTracks?org=human&db=hg19&hubUrl=/tracks/1_2_4/hub.txt&position=chr1:100-200')
+        self.assertEqual(url, 'https://genome.ucsc.edu/cgi-bin/hgTracks?db=hg19&hubUrl=/tracks/1_2_4/hub.txt&position=chr1:100-200')
+
+    def test_selection(self):
+        mock_request = Mock()
+        mock_request.build_absolute_uri = lambda x: x
+        form = TracksForm(data={'genome': 'hg19', 'selection': 'tf:A* celltype:CLL'})
+        self.assertEqual(form.is_valid(), True)
+        self.assertEqual(form.tf_cell_type_pairs, [('AR', 'CLL'), ('ATF', 'CLL')])
+        url = form.next_step_url(mock_request)
+        self.assertEqual(url, 'https://genome.ucsc.edu/cgi-bin/hgTracks?db=hg19&hubUrl=/tracks/2_4/hub.txt&position=chr1:100-200')
+
+    def test_selection_errors(self):
+        form = TracksForm(data={'genome': 'hg19', 'selection': 'tf:Foxa1'})
+        self.assertEqual(form.is_valid(), False)
+        self.assertEqual(form.errors, {'selection': ['Foxa1 matches no transcription factors']})
+
+    @patch('tracks.forms.settings')
+    def test_selection_too_many_tracks(self, mock_settings):
+        mock_settings.TRACK_SELECTION_LIMIT = '3'
+        form = TracksForm(data={'genome': 'hg19', 'selection': 'tf:*'})
+        self.assertEqual(form.is_valid(), False)
+        self.assertEqual(form.errors, {'__all__': ['Your selection resulted in 4 tracks. Max allowed is 3.']})
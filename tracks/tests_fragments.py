@@ -0,0 +1,25 @@
+from django.test import TestCase
+from django.http import QueryDict
+from tracks.testrunner import clear_hub_cache
+from tracks.fragments import normalize_params, get_fragment
+from tracks.hubcache import bump_catalog_version
+
+
+class FragmentsTests(TestCase):
+    def setUp(self):
+        clear_hub_cache()
+
+    def test_normalize_params(self):
+        params = normalize_params(QueryDict('tf=B&celltype=X&tf=A&tf=B&other=1'), ['tf', 'celltype'])
+        self.assertEqual(params.urlencode(), 'tf=A&tf=B&celltype=X')
+
+    def test_get_fragment(self):
+        self.assertEqual(get_fragment(['navbar'], lambda: '<nav>1</nav>'), '<nav>1</nav>')
+        self.assertEqual(get_fragment(['navbar'], lambda: '<nav>2</nav>'), '<nav>1</nav>')
+        self.assertEqual(get_fragment(['steps'], lambda: '<ol></ol>'), '<ol></ol>')
+        self.assertTrue(hasattr(get_fragment(['navbar'], lambda: ''), '__html__'))
+
+    def test_get_fragment_new_catalog_version(self):
+        get_fragment(['navbar'], lambda: '<nav>1</nav>')
+        bump_catalog_version()
+        self.assertEqual(get_fragment(['navbar'], lambda: '<nav>2</nav>'), '<nav>2</nav>')
@@ -0,0 +1,166 @@
+from django.test import TestCase, override_settings
+from tracks.testrunner import clear_hub_cache
+from tracks.models import Track
+from tracks.routers import ReplicaRouter, replica_reads
+from tracks.hubcache import SingleFlight, get_cache, make_key, get_or_render, bump_catalog_version, get_stats, \
+    reset_stats, get_catalog_version, read_catalog_version, is_cached, LOCK_SUFFIX
+from unittest.mock import Mock, patch
+import threading
+import time
+
+
+class SingleFlightTest(TestCase):
+    def test_concurrent_calls_share_one_result(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_render():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'body'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight.do('key1', slow_render)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(single_flight.do('key1', slow_render)))
+                     for _ in range(4)]
+        for follower in followers:
+            follower.start()
+        # give the followers time to block on the in flight call
+        time.sleep(0.2)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['body'] * 5)
+        self.assertEqual(single_flight.calls, {})
+
+    def test_error_is_shared_and_cleared(self):
+        single_flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            single_flight.do('key1', Mock(side_effect=ValueError('bad')))
+        self.assertEqual(single_flight.do('key1', lambda: 'good'), 'good')
+
+
+class GetOrRenderTest(TestCase):
+    def setUp(self):
+        clear_hub_cache()
+
+    def test_make_key(self):
+        key = make_key('trackdb', '1_2', 'hg19')
+        self.assertTrue(key.startswith('tracks:trackdb:'))
+        self.assertNotEqual(key, make_key('trackdb', '1_2', 'hg38'))
+        self.assertLess(len(make_key('hub', '_'.join(str(i) for i in range(10000)))), 250)
+
+    def test_make_key_changes_with_catalog_version(self):
+        key = make_key('hub', '1_2')
+        self.assertEqual(key, make_key('hub', '1_2'))
+        bump_catalog_version()
+        self.assertNotEqual(key, make_key('hub', '1_2'))
+
+    def test_renders_once_then_uses_cache(self):
+        render_func = Mock(return_value='body')
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'body')
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'body')
+        render_func.assert_called_once_with()
+        self.assertEqual(get_cache().get(make_key('hub', '1_2') + LOCK_SUFFIX), None)
+
+    def test_renders_from_replica(self):
+        router = ReplicaRouter()
+        read_databases = []
+
+        def render_func():
+            read_databases.append(router.db_for_read(Track))
+            return 'body'
+
+        # the test database has no replica, it is read for the catalog version as well
+        with patch('tracks.hubcache.read_catalog_version', side_effect=get_catalog_version):
+            with replica_reads():
+                self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'body')
+        self.assertEqual(read_databases, ['replica'])
+        self.assertTrue(is_cached('hub', ['1_2']))
+
+    @patch('tracks.hubcache.read_catalog_version', return_value='replica version')
+    def test_render_of_lagging_replica_is_not_cached(self, mock_read_catalog_version):
+        render_func = Mock(return_value='old body')
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'old body')
+        self.assertFalse(is_cached('hub', ['1_2']))
+        mock_read_catalog_version.return_value = get_catalog_version()
+        render_func.return_value = 'body'
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'body')
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'body')
+        self.assertEqual(render_func.call_count, 2)
+
+    def test_catalog_version_is_stored_in_database(self):
+        bump_catalog_version()
+        version = get_catalog_version()
+        self.assertEqual(read_catalog_version(), version)
+        # a version lost from the cache is read back from the database
+        clear_hub_cache()
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_bump_catalog_version_invalidates(self):
+        render_func = Mock(side_effect=['old body', 'new body'])
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'old body')
+        bump_catalog_version()
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'new body')
+
+    def test_waits_for_lock_holder(self):
+        # another worker holds the lock and stores the body while we wait
+        key = make_key('hub', '1_2')
+        get_cache().add(key + LOCK_SUFFIX, 1, 10)
+        threading.Timer(0.1, lambda: get_cache().set(key, 'other worker body')).start()
+        render_func = Mock(return_value='body')
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'other worker body')
+        render_func.assert_not_called()
+
+    def test_keeps_lock_taken_after_own_lock_expired(self):
+        lock_key = make_key('hub', '1_2') + LOCK_SUFFIX
+
+        def slow_render():
+            # the lock of this render timed out and another worker took it
+            get_cache().set(lock_key, 'other worker', 10)
+            return 'body'
+
+        self.assertEqual(get_or_render('hub', ['1_2'], slow_render), 'body')
+        self.assertEqual(get_cache().get(lock_key), 'other worker')
+
+    @override_settings(HUB_CACHE_LOCK_TIMEOUT=10)
+    def test_renders_when_lock_holder_does_not_store_body(self):
+        key = make_key('hub', '1_2')
+        get_cache().add(key + LOCK_SUFFIX, 1, 10)
+        threading.Timer(0.1, lambda: get_cache().delete(key + LOCK_SUFFIX)).start()
+        start = time.monotonic()
+        self.assertEqual(get_or_render('hub', ['1_2'], Mock(return_value='body')), 'body')
+        self.assertLess(time.monotonic() - start, 5)
+
+    @override_settings(HUB_CACHE_LOCK_TIMEOUT=0.2)
+    def test_renders_when_lock_holder_never_finishes(self):
+        get_cache().add(make_key('hub', '1_2') + LOCK_SUFFIX, 1, 10)
+        render_func = Mock(return_value='body')
+        self.assertEqual(get_or_render('hub', ['1_2'], render_func), 'body')
+        render_func.assert_called_once_with()
+
+
+class StatsTest(TestCase):
+    def setUp(self):
+        clear_hub_cache()
+        reset_stats()
+
+    @override_settings(HUB_CACHE_STATS_FLUSH_EVERY=2)
+    def test_get_stats(self):
+        get_or_render('trackdb', ['1_2', 'hg19'], lambda: 'body')
+        get_or_render('trackdb', ['1_2', 'hg19'], lambda: 'body')
+        get_or_render('trackdb', ['1_2', 'hg19'], lambda: 'body')
+        get_or_render('hub', ['1_2'], lambda: 'body')
+        stats = {row['kind']: row for row in get_stats()}
+        self.assertEqual(stats['trackdb'], {'kind': 'trackdb', 'hits': 2, 'misses': 1, 'hit_ratio': 2 / 3})
+        self.assertEqual(stats['hub'], {'kind': 'hub', 'hits': 0, 'misses': 1, 'hit_ratio': 0.0})
+        self.assertEqual(stats['genomes'], {'kind': 'genomes', 'hits': 0, 'misses': 0, 'hit_ratio': None})
+        reset_stats()
+        stats = {row['kind']: row for row in get_stats()}
+        self.assertEqual(stats['trackdb']['hits'], 0)
@@ -0,0 +1,79 @@
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks.hubedit import HubEditError, edit_hub, make_hub_edit
+
+
+class HubEditTest(TestCase):
+    def setUp(self):
+        rep_name = RepName.objects.create(name='rep1')
+        self.track_ids = {}
+        for genome_name in ['hg19', 'hg38']:
+            genome = Genome.objects.create(name=genome_name)
+            for tf_name in ['AR', 'ATF', 'CTCF']:
+                tf, _ = TranscriptionFactor.objects.get_or_create(name=tf_name)
+                for cell_type_name in ['8988T', 'CLL', 'K562']:
+                    cell_type, _ = CellType.objects.get_or_create(name=cell_type_name)
+                    name = '{}_{}'.format(tf_name, cell_type_name)
+                    track = Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                                 big_data_url='https://example.com/{}.bw'.format(name),
+                                                 file_type='bigWig', tf=tf, cell_type=cell_type, rep_name=rep_name)
+                    self.track_ids[(genome_name, name)] = track.id
+        self.hub_names = ['AR_8988T', 'AR_CLL', 'ATF_8988T', 'ATF_CLL']
+        self.hub_id = self.make_hub_id(self.hub_names)
+
+    def make_hub_id(self, names, genome_name='hg38'):
+        return '_'.join(str(self.track_ids[(genome_name, name)]) for name in names)
+
+    def edit(self, params, hub_id=None, genome_name=None):
+        return edit_hub(hub_id or self.hub_id, make_hub_edit(QueryDict(params)), genome_name)
+
+    def assert_hub(self, edited, names):
+        self.assertEqual(edited, ('hg38', [self.track_ids[('hg38', name)] for name in names]))
+
+    def test_add_tf_with_hub_cell_types(self):
+        self.assert_hub(self.edit('add_tf=CTCF'), self.hub_names + ['CTCF_8988T', 'CTCF_CLL'])
+
+    def test_add_cell_type_with_hub_tfs(self):
+        self.assert_hub(self.edit('add_celltype=K562'), self.hub_names + ['AR_K562', 'ATF_K562'])
+
+    def test_remove_tf_and_cell_type(self):
+        self.assert_hub(self.edit('remove_tf=AR'), ['ATF_8988T', 'ATF_CLL'])
+        self.assert_hub(self.edit('remove_celltype=CLL&add_tf=CTCF'), ['AR_8988T', 'ATF_8988T', 'CTCF_8988T'])
+
+    def test_add_and_remove_tracks(self):
+        params = 'add_track={}&remove_track={}&add_track={}'.format(
+            self.track_ids[('hg38', 'CTCF_K562')], self.track_ids[('hg38', 'AR_CLL')],
+            self.track_ids[('hg38', 'AR_8988T')])
+        self.assert_hub(self.edit(params), ['AR_8988T', 'ATF_8988T', 'ATF_CLL', 'CTCF_K562'])
+
+    def test_queries_do_not_grow_with_hub(self):
+        with self.assertNumQueries(4):
+            self.edit('remove_tf=ATF&add_celltype=K562')
+        # removing tracks by id only looks up the genome
+        with self.assertNumQueries(1):
+            self.edit('remove_track={}'.format(self.track_ids[('hg38', 'AR_CLL')]), genome_name='hg38')
+
+    def test_removals_only_read_hub_and_added_tracks(self):
+        with self.assertNumQueries(2) as context:
+            self.edit('remove_tf=AR')
+        self.assertIn('"tracks_track"."id" IN', context.captured_queries[-1]['sql'])
+        self.assert_hub(self.edit('add_celltype=K562&remove_tf=AR'), ['ATF_8988T', 'ATF_CLL', 'ATF_K562'])
+
+    def test_genome_must_be_hub_genome(self):
+        self.assert_hub(self.edit('remove_tf=AR', genome_name='hg38'), ['ATF_8988T', 'ATF_CLL'])
+        with self.assertRaises(HubEditError):
+            self.edit('add_tf=CTCF', genome_name='hg19')
+
+    def test_edit_errors(self):
+        with self.assertRaises(HubEditError):
+            self.edit('add_track={}'.format(self.track_ids[('hg19', 'CTCF_K562')]))
+        with self.assertRaises(HubEditError):
+            self.edit('remove_tf=AR&remove_tf=ATF')
+        with self.assertRaises(HubEditError):
+            self.edit('add_track=x')
+        with self.assertRaises(HubEditError):
+            self.edit('', hub_id='999999')
+        with override_settings(TRACK_SELECTION_LIMIT='5'):
+            with self.assertRaises(HubEditError):
+                self.edit('add_tf=CTCF')
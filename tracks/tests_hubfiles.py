@@ -0,0 +1,34 @@
+from django.core import checks
+from django.test import TestCase, override_settings
+from unittest.mock import Mock
+from tracks.hubfiles import make_tags, group_tracks, check_trackdb_group_by
+
+
+class HubFilesTest(TestCase):
+    def test_make_tags(self):
+        self.assertEqual(make_tags(['CLL', 'A-B', 'A_B', 'A B', 'CLL']),
+                         {'A B': 'A_B', 'A-B': 'A_B_2', 'A_B': 'A_B_3', 'CLL': 'CLL'})
+        # a suffixed tag never takes the tag of another value
+        self.assertEqual(make_tags(['A-B', 'A_B', 'A_B_2']), {'A-B': 'A_B', 'A_B': 'A_B_2', 'A_B_2': 'A_B_2_2'})
+
+    def test_group_tracks_with_colliding_names(self):
+        tracks = []
+        for tf_id, cell_type_id in [('A-B', 'liver'), ('A_B', 'liver'), ('A_B', 'lung+'), ('A_B', 'lung-')]:
+            tracks.append(Mock(tf_id=tf_id, cell_type_id=cell_type_id, rep_name_id='rep1', file_type='bigWig',
+                               name='{}{}'.format(tf_id, cell_type_id)))
+        groups = group_tracks(tracks, 'tf')
+        self.assertEqual([group['name'] for group in groups], ['composite_tf_A_B', 'composite_tf_A_B_2'])
+        self.assertEqual(groups[1]['subgroups'][0]['tags'], [('liver', 'liver'), ('lung_', 'lung_'),
+                                                             ('lung__2', 'lung__2')])
+        self.assertEqual([item['subgroups'] for item in groups[1]['tracks']],
+                         ['cellType=liver rep=rep1', 'cellType=lung_ rep=rep1', 'cellType=lung__2 rep=rep1'])
+
+    def test_check_trackdb_group_by(self):
+        for group_by in ['', None, 'tf', 'cell_type']:
+            with override_settings(HUB_TRACKDB_GROUP_BY=group_by):
+                self.assertEqual(check_trackdb_group_by(None), [])
+        with override_settings(HUB_TRACKDB_GROUP_BY='tfs'):
+            errors = check_trackdb_group_by(None)
+            self.assertEqual([error.id for error in errors], ['tracks.E001'])
+            # registered so manage.py check and runserver report it
+            self.assertEqual(checks.run_checks(), errors)
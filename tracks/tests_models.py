@@ -1,4 +1,5 @@
 from django.test import TestCase
+from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
 from tracks.models import *
 
@@ -83,3 +84,83 @@ class TracksTests(TestCase):
             cell_type=self.celltype1,
             rep_name=self.rep1,
         )
+
+    def test_get_view_limits(self):
+        track = Track.objects.create(
+            genome=self.genome1,
+            name='myname',
+            short_label='myname',
+            long_label='myname',
+            big_data_url='https://github.com/Duke-GCB/topdata',
+            file_type='bigWig',
+            tf=self.tf1,
+            cell_type=self.celltype1,
+            rep_name=self.rep1,
+        )
+        self.assertEqual(track.get_view_limits(), '0:100')
+        TrackSummary.objects.create(track=track, bases_covered=10, min_value=-2.5, max_value=12, mean_value=1)
+        self.assertEqual(Track.objects.get(pk=track.pk).get_view_limits(), '-2.5:12')
+        TrackSummary.objects.filter(track=track).update(min_value=0, max_value=0)
+        self.assertEqual(Track.objects.get(pk=track.pk).get_view_limits(), '0:1')
+
+    def test_compact_urls_and_labels(self):
+        for tf in [self.tf1, self.tf2]:
+            for rep in [self.rep1, self.rep2]:
+                label = '{} {} {}'.format(tf.name, self.celltype1.name, rep.name)
+                Track.objects.create(
+                    genome=self.genome1,
+                    name=label.replace(' ', ''),
+                    short_label=label,
+                    long_label=label + ' (ChIP-seq)',
+                    big_data_url='https://example.com/bigWig/{}/{}.bw'.format(tf.name, rep.name),
+                    file_type='bigWig',
+                    tf=tf,
+                    cell_type=self.celltype1,
+                    rep_name=rep,
+                )
+        self.assertEqual(UrlPrefix.objects.count(), 1)
+        self.assertEqual(sorted(LabelFormat.objects.values_list('template', flat=True)),
+                         ['{tf} {cell_type} {rep_name}', '{tf} {cell_type} {rep_name} (ChIP-seq)'])
+        track = Track.objects.select_related(*Track.COMPACT_RELATED_FIELDS).get(name='tf2celltype1rep1')
+        self.assertEqual(track.url_prefix.prefix, 'https://example.com/bigWig/')
+        self.assertEqual(track.big_data_url, 'https://example.com/bigWig/tf2/rep1.bw')
+        self.assertEqual(track.short_label, 'tf2 celltype1 rep1')
+        self.assertEqual(track.long_label, 'tf2 celltype1 rep1 (ChIP-seq)')
+        track.big_data_url = 'https://example.org/other.bw'
+        track.save()
+        self.assertEqual(Track.objects.get(pk=track.pk).big_data_url, 'https://example.org/other.bw')
+        self.assertEqual(Track.objects.annotate(url=big_data_url_expression()).get(pk=track.pk).url,
+                         'https://example.org/other.bw')
+
+    def make_track(self):
+        return Track.objects.create(genome=self.genome1, name='tf1celltype1rep1', short_label='tf1 celltype1 rep1',
+                                    long_label='tf1 celltype1 rep1 (ChIP-seq)',
+                                    big_data_url='https://example.com/bigWig/tf1/rep1.bw', file_type='bigWig',
+                                    tf=self.tf1, cell_type=self.celltype1, rep_name=self.rep1, position='chr1:1-100')
+
+    def test_clean_validates_big_data_url(self):
+        track = self.make_track()
+        track.full_clean()
+        track = Track.objects.get(pk=track.pk)
+        track.full_clean()
+        track.big_data_url = 'not a url'
+        with self.assertRaises(ValidationError) as raised:
+            track.full_clean()
+        self.assertEqual(list(raised.exception.message_dict.keys()), ['big_data_url'])
+
+    def test_changing_tf_keeps_labels(self):
+        track = Track.objects.get(pk=self.make_track().pk)
+        track.tf = self.tf2
+        track.save()
+        track = Track.objects.get(pk=track.pk)
+        self.assertEqual(track.tf_id, 'tf2')
+        self.assertEqual(track.short_label, 'tf1 celltype1 rep1')
+        self.assertEqual(track.long_label, 'tf1 celltype1 rep1 (ChIP-seq)')
+        # a label assigned with the change is used as given
+        track.cell_type = self.celltype2
+        track.short_label = 'tf2 celltype2 rep1'
+        track.save()
+        track = Track.objects.get(pk=track.pk)
+        self.assertEqual(track.short_label, 'tf2 celltype2 rep1')
+        self.assertEqual(track.short_label_format.template, '{tf} {cell_type} {rep_name}')
+        self.assertEqual(track.long_label, 'tf1 celltype1 rep1 (ChIP-seq)')
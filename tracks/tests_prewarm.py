@@ -0,0 +1,55 @@
+from django.test import TestCase
+from tracks.prewarm import parse_hub_file_request, read_hub_file_requests, rank_hubs, HubFileRequest
+from collections import Counter
+import gzip
+import os
+import shutil
+import tempfile
+import time
+
+GUNICORN_LINE = '10.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "GET /tracks/1_2/hub.txt HTTP/1.1" 200 120 "-" "igv"'
+RUNSERVER_LINE = '[19/Oct/2026 10:00:00] "GET /tracks/1_2/hg19/trackDb.txt HTTP/1.1" 200 512'
+
+
+class PrewarmTests(TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+    def test_parse_hub_file_request(self):
+        self.assertEqual(parse_hub_file_request(GUNICORN_LINE), HubFileRequest('hub', ('1_2',)))
+        self.assertEqual(parse_hub_file_request(RUNSERVER_LINE), HubFileRequest('trackdb', ('1_2', 'hg19')))
+        self.assertEqual(parse_hub_file_request('"HEAD /tracks/3/genomes.txt?x=1 HTTP/1.0" 200'),
+                         HubFileRequest('genomes', ('3',)))
+
+    def test_parse_hub_file_request_ignores_other_lines(self):
+        self.assertIsNone(parse_hub_file_request('"GET /tracks/about/ HTTP/1.1" 200 100'))
+        self.assertIsNone(parse_hub_file_request('"POST /tracks/1_2/hub.txt HTTP/1.1" 405 0'))
+        self.assertIsNone(parse_hub_file_request('"GET /tracks/abc/hub.txt HTTP/1.1" 500 0'))
+        self.assertIsNone(parse_hub_file_request('Booting worker with pid: 12'))
+
+    def test_read_hub_file_requests(self):
+        with open(os.path.join(self.log_dir, 'access.log'), 'w') as outfile:
+            outfile.write('\n'.join([GUNICORN_LINE, GUNICORN_LINE, 'junk']) + '\n')
+        with gzip.open(os.path.join(self.log_dir, 'access.log.1.gz'), 'wt') as outfile:
+            outfile.write(RUNSERVER_LINE + '\n')
+        paths = [os.path.join(self.log_dir, 'access.log'), os.path.join(self.log_dir, 'access.log.1.gz')]
+        requests, timed_out = read_hub_file_requests(paths)
+        self.assertEqual(requests, Counter({
+            HubFileRequest('hub', ('1_2',)): 2,
+            HubFileRequest('trackdb', ('1_2', 'hg19')): 1,
+        }))
+        self.assertFalse(timed_out)
+        # reading stops at the deadline
+        self.assertEqual(read_hub_file_requests(paths, deadline=time.monotonic()), (Counter(), True))
+
+    def test_rank_hubs(self):
+        requests = Counter({
+            HubFileRequest('hub', ('1',)): 3,
+            HubFileRequest('hub', ('2',)): 2,
+            HubFileRequest('trackdb', ('2', 'hg19')): 2,
+            HubFileRequest('hub', ('3',)): 1,
+        })
+        self.assertEqual(rank_hubs(requests, 2), ['2', '1'])
@@ -0,0 +1,101 @@
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from tracks.forms import TranscriptionFactorForm, CellTypeForm, TracksForm
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks.views import render_genomes, render_track_db, render_tracks_table
+from tracks.hubedit import edit_hub, make_hub_edit
+import re
+
+TABLE = 'tracks_track'
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (TABLE )?"?{}\b'.format(TABLE)),
+    'postgresql': re.compile(r'\bSeq Scan on "?{}\b'.format(TABLE)),
+}
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        else:
+            cursor.execute('EXPLAIN ' + sql)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+class QueryPlanTest(TestCase):
+    """
+    Checks that the hot Track queries use indexes instead of a full scan of the track table so their latency does
+    not grow with the catalog. The SQL of each query is captured by running the code that issues it.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        for genome_name in ['hg19', 'hg38']:
+            genome = Genome.objects.create(name=genome_name)
+            for tf_index in range(5):
+                tf, _ = TranscriptionFactor.objects.get_or_create(name='TF{}'.format(tf_index))
+                for cell_type_index in range(5):
+                    cell_type, _ = CellType.objects.get_or_create(name='CT{}'.format(cell_type_index))
+                    for rep in ['rep1', 'rep2']:
+                        rep_name, _ = RepName.objects.get_or_create(name=rep)
+                        name = '{}_{}_{}'.format(tf.name, cell_type.name, rep)
+                        Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                             big_data_url='https://example.com/{}.bw'.format(name),
+                                             file_type='bigWig', tf=tf, cell_type=cell_type, rep_name=rep_name)
+
+    def setUp(self):
+        if connection.vendor not in FULL_SCAN_PATTERNS:
+            self.skipTest('No query plan checks for {}'.format(connection.vendor))
+        if connection.vendor == 'postgresql':
+            # the tables are small enough that postgres would otherwise prefer sequential scans
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def capture_track_plans(self, func):
+        with CaptureQueriesContext(connection) as context:
+            func()
+        plans = [explain(query['sql']) for query in context.captured_queries if TABLE in query['sql']]
+        self.assertTrue(plans)
+        return plans
+
+    def assert_no_full_scan(self, plans):
+        for plan in plans:
+            self.assertIsNone(FULL_SCAN_PATTERNS[connection.vendor].search(plan), plan)
+
+    def test_select_by_tf_and_cell_type(self):
+        pairs = [['TF1', 'CT2'], ['TF3', 'CT4']]
+        plans = self.capture_track_plans(lambda: (TracksForm.get_position_from_first_track('hg38', pairs),
+                                                  TracksForm.get_track_ids('hg38', pairs)))
+        self.assert_no_full_scan(plans)
+        for plan in plans:
+            self.assertIn('track_genome_tf_cell_type_idx', plan)
+
+    def test_genome_choices(self):
+        data = QueryDict('genome=hg38&tf=TF1&tf=TF2&celltype=CT0&celltype=CT3')
+        plans = self.capture_track_plans(lambda: (
+            self.assertTrue(TranscriptionFactorForm(data).is_valid()),
+            self.assertTrue(CellTypeForm(data).is_valid()),
+            render_tracks_table({'genome': 'hg38', 'tfs': TranscriptionFactor.objects.filter(pk__in=['TF1', 'TF2']),
+                                 'celltypes': CellType.objects.filter(pk__in=['CT0', 'CT3'])}),
+            self.assertTrue(TracksForm(QueryDict('genome=hg38&track_str=TF1,CT0&track_str=TF2,CT3')).is_valid()),
+        ))
+        self.assert_no_full_scan(plans)
+        for plan in plans:
+            self.assertIn('track_genome_tf_cell_type_idx', plan)
+
+    def test_hub_files(self):
+        track_ids = Track.objects.filter(genome_id='hg38', tf_id='TF2').values_list('id', flat=True)
+        encoded_key_value = '_'.join(str(track_id) for track_id in track_ids)
+        plans = self.capture_track_plans(lambda: (render_genomes(encoded_key_value),
+                                                  render_track_db(encoded_key_value, 'hg38')))
+        self.assert_no_full_scan(plans)
+
+    def test_edit_hub(self):
+        track_ids = Track.objects.filter(genome_id='hg38', tf_id='TF2', cell_type_id__in=['CT0', 'CT1']).values_list(
+            'id', flat=True)
+        encoded_key_value = '_'.join(str(track_id) for track_id in track_ids)
+        params = QueryDict('add_tf=TF3&add_celltype=CT4&remove_tf=TF1&remove_celltype=CT0&add_track={}'.format(
+            track_ids[0]))
+        plans = self.capture_track_plans(lambda: edit_hub(encoded_key_value, make_hub_edit(params)))
+        self.assert_no_full_scan(plans)
@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from tracks.models import Track
+from tracks.routers import ReplicaRouter, ReplicaStickinessMiddleware, replica_reads, stream_with_replica_reads
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica', REPLICA_STICKY_COOKIE='topdata_primary',
+                   REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_primary_outside_requests(self):
+        self.assertIsNone(self.router.db_for_read(Track))
+
+    def test_replica_reads(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Track), 'replica')
+            self.assertIsNone(self.router.db_for_read(User))
+            self.assertEqual(self.router.db_for_write(Track), 'default')
+            # reads after a write see it
+            self.assertIsNone(self.router.db_for_read(Track))
+        self.assertIsNone(self.router.db_for_read(Track))
+
+    def make_middleware(self, write=False):
+        self.read_databases = []
+
+        def view(request):
+            self.read_databases.append(self.router.db_for_read(Track))
+            if write:
+                self.router.db_for_write(Track)
+            return HttpResponse('ok')
+        return ReplicaStickinessMiddleware(view)
+
+    def test_middleware_safe_requests_use_replica(self):
+        response = self.make_middleware()(RequestFactory().get('/tracks/'))
+        self.assertEqual(self.read_databases, ['replica'])
+        self.assertNotIn('topdata_primary', response.cookies)
+        self.assertIsNone(self.router.db_for_read(Track))
+
+    def test_middleware_admin_uses_primary(self):
+        self.make_middleware()(RequestFactory().get('/admin/tracks/track/'))
+        self.assertEqual(self.read_databases, [None])
+
+    def test_middleware_post_uses_primary(self):
+        self.make_middleware()(RequestFactory().post('/tracks/'))
+        self.assertEqual(self.read_databases, [None])
+
+    def test_middleware_sticks_to_primary_after_write(self):
+        response = self.make_middleware(write=True)(RequestFactory().post('/tracks/'))
+        cookie = response.cookies['topdata_primary']
+        self.assertEqual(cookie['max-age'], 10)
+        request = RequestFactory().get('/tracks/')
+        request.COOKIES['topdata_primary'] = cookie.value
+        self.make_middleware()(request)
+        self.assertEqual(self.read_databases, [None])
+
+    def test_streaming_response_reads_from_replica(self):
+        def read_database():
+            yield self.router.db_for_read(Track)
+
+        def view(request):
+            return StreamingHttpResponse(stream_with_replica_reads(read_database()))
+
+        response = ReplicaStickinessMiddleware(view)(RequestFactory().get('/tracks/export/'))
+        self.assertIsNone(self.router.db_for_read(Track))
+        self.assertEqual(b''.join(response.streaming_content), b'replica')
+        self.assertIsNone(self.router.db_for_read(Track))
@@ -0,0 +1,76 @@
+from unittest.mock import Mock
+from django.test import TestCase
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks import search
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        rep_name = RepName.objects.create(name='rep1')
+        self.track_ids = {}
+        for genome_name in ['hg19', 'hg38']:
+            genome, _ = Genome.objects.get_or_create(name=genome_name)
+            for tf_name, cell_type_name in [('CTCF', 'liver'), ('CTCF', 'lung'), ('ELK1', 'liver')]:
+                tf, _ = TranscriptionFactor.objects.get_or_create(name=tf_name)
+                cell_type, _ = CellType.objects.get_or_create(name=cell_type_name)
+                name = '{}_{}'.format(tf_name, cell_type_name)
+                track = Track.objects.create(genome=genome, name=name, short_label=name,
+                                             long_label='{} in {} cells'.format(tf_name, cell_type_name),
+                                             big_data_url='https://example.com/{}.bw'.format(name),
+                                             file_type='bigWig', tf=tf, cell_type=cell_type, rep_name=rep_name)
+                self.track_ids[(genome_name, name)] = track.id
+        search.index_tracks(self.track_ids.values())
+
+    def search_names(self, genome_name, query):
+        return sorted(track.name for track in search.search_tracks(genome_name, query, 10))
+
+    def test_get_words(self):
+        self.assertEqual(search.get_words('CTCF, Liver_rep1 "x"'), ['ctcf', 'liver', 'rep1', 'x'])
+
+    def test_other_databases_search_without_index(self):
+        self.assertIs(search.get_backend(Mock(vendor='mysql')), search.IcontainsSearchBackend)
+        backend = search.IcontainsSearchBackend
+        backend.create_index(None)
+        backend.insert_rows(None, [])
+        track_ids = backend.search(None, 'hg19', ['ctcf', 'cells'], 10)
+        self.assertEqual(track_ids, [self.track_ids[('hg19', 'CTCF_liver')], self.track_ids[('hg19', 'CTCF_lung')]])
+        self.assertEqual(len(backend.search(None, None, ['liver'], 10)), 4)
+        self.assertEqual(len(backend.search(None, None, ['liver'], 3)), 3)
+
+    def test_search_matches_all_words(self):
+        self.assertEqual(self.search_names('hg19', 'ctcf'), ['CTCF_liver', 'CTCF_lung'])
+        self.assertEqual(self.search_names('hg19', 'CTCF liver'), ['CTCF_liver'])
+        self.assertEqual(self.search_names('hg19', 'CTCF kidney'), [])
+
+    def test_search_matches_word_prefixes(self):
+        self.assertEqual(self.search_names('hg19', 'liv'), ['CTCF_liver', 'ELK1_liver'])
+        self.assertEqual(self.search_names('hg19', 'EL l'), ['ELK1_liver'])
+
+    def test_search_matches_labels(self):
+        self.assertEqual(self.search_names('hg19', 'cells'), ['CTCF_liver', 'CTCF_lung', 'ELK1_liver'])
+
+    def test_search_is_limited_to_genome(self):
+        tracks = search.search_tracks('hg38', 'ELK1', 10)
+        self.assertEqual([track.id for track in tracks], [self.track_ids[('hg38', 'ELK1_liver')]])
+
+    def test_search_without_words(self):
+        self.assertEqual(search.search_tracks('hg19', ' "*" ', 10), [])
+
+    def test_search_limit(self):
+        self.assertEqual(len(search.search_tracks('hg19', 'cells', 2)), 2)
+
+    def test_search_skips_deleted_tracks(self):
+        Track.objects.filter(name='CTCF_lung').delete()
+        self.assertEqual(self.search_names('hg19', 'ctcf'), ['CTCF_liver'])
+
+    def test_index_tracks_updates_rows(self):
+        Track.objects.filter(pk=self.track_ids[('hg19', 'ELK1_liver')]).update(name='ELK1_renamed')
+        search.index_tracks([self.track_ids[('hg19', 'ELK1_liver')]])
+        self.assertEqual(self.search_names('hg19', 'renamed'), ['ELK1_renamed'])
+        self.assertEqual(self.search_names('hg19', 'ELK1'), ['ELK1_renamed'])
+
+    def test_clear_and_rebuild_index(self):
+        search.clear_index()
+        self.assertEqual(self.search_names('hg19', 'ctcf'), [])
+        search.rebuild_index()
+        self.assertEqual(self.search_names('hg19', 'ctcf'), ['CTCF_liver', 'CTCF_lung'])
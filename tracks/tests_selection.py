@@ -0,0 +1,69 @@
+from django.test import TestCase
+from tracks.testrunner import clear_hub_cache
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+from tracks.hubcache import bump_catalog_version, get_catalog_version
+from tracks.selection import SelectionError, NameIndex, parse_selection, expand_selection, get_genome_index
+
+
+class NameIndexTest(TestCase):
+    def test_match(self):
+        name_index = NameIndex(['ELK1', 'ELK4', 'CTCF', 'E2F1', 'AR'])
+        self.assertEqual(name_index.match('ELK*'), ['ELK1', 'ELK4'])
+        self.assertEqual(name_index.match('E*1'), ['E2F1', 'ELK1'])
+        self.assertEqual(name_index.match('*F*'), ['CTCF', 'E2F1'])
+        self.assertEqual(name_index.match('CTCF'), ['CTCF'])
+        self.assertEqual(name_index.match('CTC'), [])
+
+
+class SelectionTest(TestCase):
+    def setUp(self):
+        clear_hub_cache()
+        genome = Genome.objects.create(name='hg38')
+        rep_name = RepName.objects.create(name='rep1')
+        for tf_name in ['CTCF', 'ELK1', 'ELK4']:
+            tf = TranscriptionFactor.objects.create(name=tf_name)
+            for cell_type_name in ['Adult_CD4_Th0', 'Adult_CD4_Th17', 'K562']:
+                cell_type, _ = CellType.objects.get_or_create(name=cell_type_name)
+                if (tf_name, cell_type_name) == ('ELK4', 'K562'):
+                    continue
+                for rep in range(2):
+                    name = '{}_{}_{}'.format(tf_name, cell_type_name, rep)
+                    Track.objects.create(genome=genome, name=name, short_label=name, long_label=name,
+                                         big_data_url='https://example.com/{}.bw'.format(name), file_type='bigWig',
+                                         tf=tf, cell_type=cell_type, rep_name=rep_name)
+
+    def test_parse_selection(self):
+        self.assertEqual(parse_selection('tf:CTCF,ELK* celltype:-K562; celltype:K562'), [
+            {'tf': ['CTCF', 'ELK*'], 'celltype': ['-K562']},
+            {'tf': [], 'celltype': ['K562']},
+        ])
+        for expression in ['', ' ; ', 'CTCF', 'tf:', 'gene:CTCF']:
+            with self.assertRaises(SelectionError):
+                parse_selection(expression)
+
+    def test_expand_selection(self):
+        self.assertEqual(expand_selection('hg38', 'tf:ELK* celltype:Adult_CD4_*,-Adult_CD4_Th17'), [
+            ('ELK1', 'Adult_CD4_Th0'), ('ELK4', 'Adult_CD4_Th0'),
+        ])
+        # pairs without tracks are left out and pairs selected twice are kept once in order of the terms
+        self.assertEqual(expand_selection('hg38', 'celltype:K562; tf:CTCF celltype:K562,Adult_CD4_Th0'), [
+            ('CTCF', 'K562'), ('ELK1', 'K562'), ('CTCF', 'Adult_CD4_Th0'),
+        ])
+
+    def test_expand_selection_errors(self):
+        with self.assertRaisesMessage(SelectionError, 'FOXA* matches no transcription factors'):
+            expand_selection('hg38', 'tf:FOXA*')
+        with self.assertRaisesMessage(SelectionError, 'The selection has no tracks in hg38'):
+            expand_selection('hg38', 'tf:ELK4 celltype:K562')
+
+    def test_genome_index_counts_and_caching(self):
+        get_catalog_version()
+        # the catalog version of the database and the track counts
+        with self.assertNumQueries(2):
+            genome_index = get_genome_index('hg38')
+        self.assertEqual(genome_index.count_tracks([('CTCF', 'K562'), ('ELK4', 'K562')]), 2)
+        with self.assertNumQueries(0):
+            expand_selection('hg38', 'tf:CTCF')
+        bump_catalog_version()
+        with self.assertNumQueries(2):
+            self.assertIsNot(get_genome_index('hg38'), genome_index)
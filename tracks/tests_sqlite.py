@@ -0,0 +1,41 @@
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+from tracks.sqlite import get_pragmas, apply_pragmas
+import os
+import sqlite3
+import tempfile
+
+
+@override_settings(SQLITE_MMAP_SIZE=1024 * 1024, SQLITE_CACHE_SIZE=-2048, SQLITE_BUSY_TIMEOUT=1500)
+class SQLiteProfileTest(TestCase):
+    def test_get_pragmas(self):
+        self.assertEqual(get_pragmas(''), [])
+        self.assertIn(('journal_mode', 'WAL'), get_pragmas('production'))
+        with self.assertRaises(ValueError):
+            get_pragmas('fast')
+
+    def test_apply_pragmas(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = sqlite3.connect(os.path.join(tmpdir, 'db.sqlite3'))
+            cursor = db.cursor()
+            apply_pragmas(cursor, get_pragmas('production'))
+            values = {}
+            for pragma in ['journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout']:
+                values[pragma] = cursor.execute('PRAGMA {}'.format(pragma)).fetchone()[0]
+            db.close()
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1, 'mmap_size': 1024 * 1024,
+                                  'cache_size': -2048, 'busy_timeout': 1500})
+
+    @override_settings(SQLITE_PROFILE='production')
+    def test_new_connections_are_configured(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            settings_dict = dict(connection.settings_dict, NAME=os.path.join(tmpdir, 'db.sqlite3'))
+            new_connection = DatabaseWrapper(settings_dict, alias='profile-test')
+            # connection_created is sent when connecting
+            with new_connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 1500)
+            new_connection.close()
@@ -0,0 +1,53 @@
+from django.test import TestCase, override_settings
+from tracks.statichubs import static_hub_name, get_static_hub_url, get_static_hub_path, write_static_hub, clear_static_hubs
+import os
+import shutil
+import tempfile
+
+
+class StaticHubsTest(TestCase):
+    def setUp(self):
+        self.static_hubs_root = os.path.join(tempfile.mkdtemp(), 'statichubs')
+        self.override = override_settings(STATIC_HUBS_ROOT=self.static_hubs_root, STATIC_HUBS_URL='/statichubs/')
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(os.path.dirname(self.static_hubs_root))
+
+    def test_static_hub_name_ignores_order(self):
+        self.assertEqual(static_hub_name('1_2_10'), static_hub_name('10_1_2'))
+        self.assertEqual(static_hub_name('1_2_10'), static_hub_name('1_2_2_10'))
+        self.assertNotEqual(static_hub_name('1_2'), static_hub_name('1_3'))
+
+    def test_write_and_find_static_hub(self):
+        self.assertEqual(get_static_hub_url('1_2'), None)
+        hub_dir = write_static_hub('1_2', {'hub.txt': 'hub', 'genomes.txt': 'genomes', 'hg19/trackDb.txt': 'db'})
+        self.assertEqual(sorted(os.listdir(self.static_hubs_root)), [static_hub_name('1_2')])
+        with open(os.path.join(hub_dir, 'hg19', 'trackDb.txt')) as infile:
+            self.assertEqual(infile.read(), 'db')
+        self.assertEqual(get_static_hub_url('2_1'), '/statichubs/{}/'.format(static_hub_name('1_2')))
+        self.assertEqual(get_static_hub_url('1_3'), None)
+        self.assertEqual(get_static_hub_url('bad'), None)
+
+    def test_rewrite_static_hub(self):
+        write_static_hub('1_2', {'hub.txt': 'old'})
+        hub_dir = write_static_hub('1_2', {'hub.txt': 'new'})
+        with open(os.path.join(hub_dir, 'hub.txt')) as infile:
+            self.assertEqual(infile.read(), 'new')
+        self.assertEqual(len(os.listdir(self.static_hubs_root)), 1)
+
+    def test_clear_static_hubs(self):
+        write_static_hub('1_2', {'hub.txt': 'hub'})
+        clear_static_hubs()
+        self.assertEqual(get_static_hub_url('1_2'), None)
+        clear_static_hubs()
+
+    def test_static_hub_url_needs_setting(self):
+        write_static_hub('1_2', {'hub.txt': 'hub', 'hg19/trackDb.txt': 'db'})
+        with override_settings(STATIC_HUBS_URL=''):
+            self.assertEqual(get_static_hub_url('1_2'), None)
+        hub_dir = os.path.join(self.static_hubs_root, static_hub_name('1_2'))
+        self.assertEqual(get_static_hub_path('1_2', 'hg19/trackDb.txt'), os.path.join(hub_dir, 'hg19', 'trackDb.txt'))
+        self.assertEqual(get_static_hub_path('1_2', 'genomes.txt'), None)
+        self.assertEqual(get_static_hub_path('1_2', '../../hub.txt'), None)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from tracks.testrunner import TEST_HUB_CACHE_PREFIX, clear_hub_cache
+import copy
+import os
+
+
+class TestRunnerTest(SimpleTestCase):
+    def test_hub_cache_is_temporary(self):
+        location = settings.CACHES[settings.HUB_CACHE_ALIAS]['LOCATION']
+        self.assertTrue(os.path.basename(location).startswith(TEST_HUB_CACHE_PREFIX))
+        self.assertNotEqual(os.path.dirname(location), settings.BASE_DIR)
+
+    def test_clear_hub_cache_refuses_other_caches(self):
+        caches = copy.deepcopy(settings.CACHES)
+        caches[settings.HUB_CACHE_ALIAS]['LOCATION'] = os.path.join(settings.BASE_DIR, 'hubcache')
+        with override_settings(CACHES=caches):
+            with self.assertRaises(ImproperlyConfigured):
+                clear_hub_cache()
@@ -0,0 +1,179 @@
+from django.test import SimpleTestCase
+from tracks.urlcheck import UrlChecker, UrlCheckError, UrlResponse, check_urls, is_alive
+from unittest.mock import patch
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import asyncio
+import threading
+
+LAST_MODIFIED = 'Wed, 11 Mar 2020 19:42:00 GMT'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves the files in server.files supporting HEAD and single Range requests.
+    Paths in server.head_not_allowed reject HEAD, paths in server.failures fail with 503 that many times first and
+    paths in server.chunked are sent with Transfer-Encoding: chunked.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def respond(self, send_body):
+        server = self.server
+        server.requests.append((self.command, self.path, self.headers.get('Range')))
+        if self.path == '/redirect.bw':
+            self.send_response(302)
+            self.send_header('Location', '/ok.bw')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if server.failures.get(self.path):
+            server.failures[self.path] -= 1
+            self.send_error(503)
+            return
+        if not send_body and self.path in server.head_not_allowed:
+            self.send_error(405)
+            return
+        data = server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        status = 200
+        range_header = self.headers.get('Range')
+        headers = {'Last-Modified': LAST_MODIFIED}
+        if range_header and send_body:
+            start, end = [int(value) for value in range_header.split('=')[1].split('-')]
+            headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, len(data))
+            data = data[start:end + 1]
+            status = 206
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if self.path in server.chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            if send_body:
+                for start in range(0, len(data), 3):
+                    chunk = data[start:start + 3]
+                    self.wfile.write('{:x};ext=1\r\n'.format(len(chunk)).encode('ascii') + chunk + b'\r\n')
+                self.wfile.write(b'0\r\n\r\n')
+            return
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+
+class StandInServer(object):
+    """
+    Local HTTP server standing in for the host of bigDataUrl files.
+    """
+    def __init__(self, files):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.httpd.files = files
+        self.httpd.requests = []
+        self.httpd.failures = {}
+        self.httpd.head_not_allowed = set()
+        self.httpd.chunked = set()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    def url(self, path):
+        return 'http://127.0.0.1:{}{}'.format(self.httpd.server_address[1], path)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@patch('tracks.urlcheck.RETRY_DELAY_SECONDS', 0.01)
+class UrlCheckerTest(SimpleTestCase):
+    def setUp(self):
+        self.server = StandInServer({'/ok.bw': b'0123456789', '/nohead.bw': b'01234'}).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_check_urls(self):
+        self.server.httpd.head_not_allowed.add('/nohead.bw')
+        urls = [self.server.url(path) for path in ['/ok.bw', '/missing.bw', '/nohead.bw', '/redirect.bw']]
+        ok, missing, nohead, redirect = check_urls(urls, retries=0)
+        self.assertEqual((ok.url, ok.status, ok.size, ok.last_modified, ok.error), (urls[0], 200, 10, LAST_MODIFIED, ''))
+        self.assertGreater(ok.latency, 0)
+        self.assertTrue(is_alive(ok))
+        self.assertEqual((missing.status, missing.size), (404, None))
+        self.assertFalse(is_alive(missing))
+        # HEAD is rejected so a one byte range is requested instead
+        self.assertEqual((nohead.status, nohead.size), (206, 5))
+        self.assertTrue(is_alive(nohead))
+        self.assertEqual((redirect.url, redirect.status, redirect.size), (urls[3], 200, 10))
+
+    def test_connection_error(self):
+        self.server.__exit__()
+        result, = check_urls([self.server.url('/ok.bw')], retries=1)
+        self.assertEqual(result.status, None)
+        self.assertNotEqual(result.error, '')
+        self.assertFalse(is_alive(result))
+        self.server = StandInServer({}).__enter__()
+
+    def test_retries_temporary_failures(self):
+        self.server.httpd.failures['/ok.bw'] = 2
+        result, = check_urls([self.server.url('/ok.bw')], retries=2)
+        self.assertEqual(result.status, 200)
+        self.server.httpd.failures['/ok.bw'] = 2
+        result, = check_urls([self.server.url('/ok.bw')], retries=1)
+        self.assertEqual(result.status, 503)
+
+    def test_concurrency_limits(self):
+        active_hosts = []
+        max_active = []
+        max_active_per_host = []
+
+        async def fake_request(method, url, *args):
+            host = urlsplit(url).netloc
+            active_hosts.append(host)
+            max_active.append(len(active_hosts))
+            max_active_per_host.append(active_hosts.count(host))
+            await asyncio.sleep(0.01)
+            active_hosts.remove(host)
+            return UrlResponse(url, 200, {}, b'')
+
+        checker = UrlChecker(concurrency=3, per_host=2)
+        urls = ['http://host{}/{}.bw'.format(i % 2, i) for i in range(12)]
+        with patch('tracks.urlcheck.http_request', fake_request):
+            results = asyncio.run(checker.check_all(urls))
+        self.assertEqual([result.status for result in results], [200] * 12)
+        self.assertEqual(max(max_active), 3)
+        self.assertEqual(max(max_active_per_host), 2)
+
+    def test_fetch_range(self):
+        async def run():
+            checker = UrlChecker()
+            return await checker.fetch_range(self.server.url('/ok.bw'), 2, 5)
+        self.assertEqual(asyncio.run(run()), b'2345')
+        self.assertEqual(self.server.httpd.requests[-1], ('GET', '/ok.bw', 'bytes=2-5'))
+
+    def test_fetch_range_of_chunked_response(self):
+        self.server.httpd.chunked.add('/ok.bw')
+        async def run():
+            checker = UrlChecker()
+            return [await checker.fetch_range(self.server.url('/ok.bw'), 2, 7),
+                    await checker.fetch_range(self.server.url('/nohead.bw'), 0, 4)]
+        self.assertEqual(asyncio.run(run()), [b'234567', b'01234'])
+
+    def test_fetch_range_failure(self):
+        async def run():
+            return await UrlChecker(retries=0).fetch_range(self.server.url('/missing.bw'), 0, 5)
+        with self.assertRaises(UrlCheckError):
+            asyncio.run(run())
@@ -1,9 +1,18 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from tracks.testrunner import clear_hub_cache
 from tracks.views import Navigation, Steps
-from tracks.forms import TranscriptionFactorForm, CellTypeForm, FormFields
+from tracks.forms import GenomeForm, TranscriptionFactorForm, CellTypeForm, FormFields
 from unittest.mock import patch
-from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track
+import gzip
+import re
+import shutil
+import tempfile
+from tracks.models import Genome, TranscriptionFactor, CellType, RepName, Track, TrackHealth, TrackSummary
+from django.utils import timezone
+from tracks.hubcache import bump_catalog_version
+from tracks.statichubs import write_static_hub, static_hub_name
+from tracks import search
 
 STATUS_OK = 200
 STATUS_FOUND = 302
@@ -13,14 +22,16 @@ class NavigationTests(TestCase):
     def test_make_items_tracks(self):
         items = Navigation.make_items(Navigation.TRACKS_PAGE)
         self.assertEqual(items, [
-            {'label': 'Tracks', 'url_name': 'tracks-select_factors', 'is_active': True},
+            {'label': 'Tracks', 'url_name': 'tracks-select_genome', 'is_active': True},
+            {'label': 'Search', 'url_name': 'tracks-search', 'is_active': False},
             {'label': 'About', 'url_name': 'tracks-about', 'is_active': False}
         ])
 
     def test_make_items_about(self):
         items = Navigation.make_items(Navigation.ABOUT_PAGE)
         self.assertEqual(items, [
-            {'label': 'Tracks', 'url_name': 'tracks-select_factors', 'is_active': False},
+            {'label': 'Tracks', 'url_name': 'tracks-select_genome', 'is_active': False},
+            {'label': 'Search', 'url_name': 'tracks-search', 'is_active': False},
             {'label': 'About', 'url_name': 'tracks-about', 'is_active': True}
         ])
 
@@ -32,22 +43,31 @@ class NavigationTests(TestCase):
             'count': 1,
             'nav_title': 'Top Data',
             'nav_items': [
-                {'label': 'Tracks', 'url_name': 'tracks-select_factors', 'is_active': True},
+                {'label': 'Tracks', 'url_name': 'tracks-select_genome', 'is_active': True},
+                {'label': 'Search', 'url_name': 'tracks-search', 'is_active': False},
                 {'label': 'About', 'url_name': 'tracks-about', 'is_active': False}
             ], 'nav_download_all_url': 'someurl'
         })
 
 
 class StepsTests(TestCase):
+    def test_make_items_genome(self):
+        items = Steps.make_items(Steps.GENOME)
+        self.assertEqual(items, [
+            {'label': Steps.GENOME, 'is_active': True}
+        ])
+
     def test_make_items_tfs(self):
         items = Steps.make_items(Steps.TRANSCRIPTION_FACTORS)
         self.assertEqual(items, [
+            {'label': Steps.GENOME, 'is_active': False},
             {'label': Steps.TRANSCRIPTION_FACTORS, 'is_active': True}
         ])
 
     def test_make_items_cell_type(self):
         items = Steps.make_items(Steps.CELL_TYPES)
         self.assertEqual(items, [
+            {'label': Steps.GENOME, 'is_active': False},
             {'label': Steps.TRANSCRIPTION_FACTORS, 'is_active': False},
             {'label': Steps.CELL_TYPES, 'is_active': True}
         ])
@@ -55,6 +75,7 @@ class StepsTests(TestCase):
     def test_make_items_tracks(self):
         items = Steps.make_items(Steps.TRACKS)
         self.assertEqual(items, [
+            {'label': Steps.GENOME, 'is_active': False},
             {'label': Steps.TRANSCRIPTION_FACTORS, 'is_active': False},
             {'label': Steps.CELL_TYPES, 'is_active': False},
             {'label': Steps.TRACKS, 'is_active': True}
@@ -64,6 +85,7 @@ class StepsTests(TestCase):
 class ViewsTests(TestCase):
     def setUp(self):
         self.client = Client()
+        clear_hub_cache()
         self.genome = Genome.objects.create(name='hg19')
         self.tf1 = TranscriptionFactor.objects.create(name='AR')
         self.tf2 = TranscriptionFactor.objects.create(name='ATF')
@@ -88,10 +110,10 @@ class ViewsTests(TestCase):
                         position='chr1:100-200'
                     )
 
-    def test_tracks_index_redirects_to_select_factors(self):
+    def test_tracks_index_redirects_to_select_genome(self):
         resp = self.client.get(reverse('tracks-index'))
         self.assertEqual(resp.status_code, STATUS_FOUND)
-        self.assertEqual(resp.url, '/tracks/select-factors/')
+        self.assertEqual(resp.url, '/tracks/select-genome/')
 
     def test_tracks_about(self):
         resp = self.client.get(reverse('tracks-about'))
@@ -100,10 +122,28 @@ class ViewsTests(TestCase):
     def _check_nav_context(self, resp):
         self.assertEqual(resp.context['nav_title'], Navigation.TITLE)
         nav_items_urls = [nav_item['url_name'] for nav_item in resp.context['nav_items']]
-        self.assertEqual(nav_items_urls, ['tracks-select_factors', 'tracks-about'])
+        self.assertEqual(nav_items_urls, ['tracks-select_genome', 'tracks-search', 'tracks-about'])
 
-    def test_select_factors_get(self):
+    def test_select_genome_get(self):
+        resp = self.client.get(reverse('tracks-select_genome'))
+        self.assertEqual(resp.status_code, STATUS_OK)
+        self._check_nav_context(resp)
+        self.assertEqual(resp.context['step_items'], Steps.make_items(Steps.GENOME))
+        self.assertIsInstance(resp.context['form'], GenomeForm)
+        self.assertIn('<option value="hg19">hg19</option>', resp.content.decode('utf-8'))
+
+    def test_select_genome_post_with_data(self):
+        resp = self.client.post(reverse('tracks-select_genome'), data={FormFields.GENOME: 'hg19'})
+        self.assertEqual(resp.status_code, STATUS_FOUND)
+        self.assertEqual(resp.url, reverse('tracks-select_factors') + '?genome=hg19')
+
+    def test_select_factors_get_without_genome(self):
         resp = self.client.get(reverse('tracks-select_factors'))
+        self.assertEqual(resp.status_code, STATUS_FOUND)
+        self.assertEqual(resp.url, reverse('tracks-select_genome'))
+
+    def test_select_factors_get(self):
+        resp = self.client.get(reverse('tracks-select_factors') + '?genome=hg19')
         self.assertEqual(resp.status_code, STATUS_OK)
         self._check_nav_context(resp)
         self.assertEqual(resp.context['step_items'], Steps.make_items(Steps.TRANSCRIPTION_FACTORS))
@@ -111,7 +151,7 @@ class ViewsTests(TestCase):
         self.assertEqual(resp.context['form'].errors, {})
 
     def test_select_factors_post_without_data(self):
-        resp = self.client.post(reverse('tracks-select_factors'))
+        resp = self.client.post(reverse('tracks-select_factors'), data={FormFields.GENOME: 'hg19'})
         self.assertEqual(resp.status_code, STATUS_OK)
         self._check_nav_context(resp)
         self.assertEqual(resp.context['step_items'], Steps.make_items(Steps.TRANSCRIPTION_FACTORS))
@@ -119,20 +159,23 @@ class ViewsTests(TestCase):
         self.assertEqual(resp.context['form'].errors, {FormFields.TF_NAME: ['This field is required.']})
 
     def test_select_factors_post_with_data(self):
-        resp = self.client.post(reverse('tracks-select_factors'), data={FormFields.TF_NAME: ["AR","ATF"]})
+        resp = self.client.post(reverse('tracks-select_factors'), data={
+            FormFields.GENOME: 'hg19',
+            FormFields.TF_NAME: ["AR","ATF"],
+        })
         # when user posts with good data direct them to select cell type
         self.assertEqual(resp.status_code, STATUS_FOUND)
-        self.assertEqual(resp.url, reverse('tracks-select_cell_type') + '?tf=AR&tf=ATF')
+        self.assertEqual(resp.url, reverse('tracks-select_cell_type') + '?genome=hg19&tf=AR&tf=ATF')
 
     def test_select_cell_type_get_without_data(self):
-        resp = self.client.get(reverse('tracks-select_cell_type'))
+        resp = self.client.get(reverse('tracks-select_cell_type') + '?genome=hg19')
         # if users directly navigate to select cell type without selecting transcription factors
         # go back to select_factors
         self.assertEqual(resp.status_code, STATUS_FOUND)
-        self.assertEqual(resp.url, reverse('tracks-select_factors'))
+        self.assertEqual(resp.url, reverse('tracks-select_factors') + '?genome=hg19')
 
     def test_select_cell_type_get_with_data(self):
-        resp = self.client.get(reverse('tracks-select_cell_type') + '?tf=AR&tf=ATF')
+        resp = self.client.get(reverse('tracks-select_cell_type') + '?genome=hg19&tf=AR&tf=ATF')
         self.assertEqual(resp.status_code, STATUS_OK)
         self._check_nav_context(resp)
         self.assertEqual(resp.context['step_items'], Steps.make_items(Steps.CELL_TYPES))
@@ -143,7 +186,7 @@ class ViewsTests(TestCase):
         self.assertEqual(tf_names, ['AR', 'ATF'])
 
     def test_select_cell_type_post_without_data(self):
-        resp = self.client.post(reverse('tracks-select_cell_type'))
+        resp = self.client.post(reverse('tracks-select_cell_type'), data={FormFields.GENOME: 'hg19'})
         self.assertEqual(resp.status_code, STATUS_OK)
         self._check_nav_context(resp)
         self.assertEqual(resp.context['step_items'], Steps.make_items(Steps.CELL_TYPES))
@@ -153,22 +196,25 @@ class ViewsTests(TestCase):
 
     def test_select_cell_type_post_with_data(self):
         resp = self.client.post(reverse('tracks-select_cell_type'), data={
+            FormFields.GENOME: 'hg19',
             FormFields.TF_NAME: ["AR", "ATF"],
             FormFields.CELL_TYPE: ["8988T", "CLL"],
         })
         # when user posts with good data direct them to select tracks
         self.assertEqual(resp.status_code, STATUS_FOUND)
-        self.assertEqual(resp.url, reverse('tracks-select_tracks') + '?tf=AR&tf=ATF&celltype=8988T&celltype=CLL')
+        self.assertEqual(resp.url, reverse('tracks-select_tracks') +
+                         '?genome=hg19&tf=AR&tf=ATF&celltype=8988T&celltype=CLL')
 
     def test_select_tracks_get_without_data(self):
-        resp = self.client.get(reverse('tracks-select_tracks'))
+        resp = self.client.get(reverse('tracks-select_tracks') + '?genome=hg19')
         # if users directly navigate to select tracks type without selecting transcription factors and cell types
         # go back to select_factors
         self.assertEqual(resp.status_code, STATUS_FOUND)
-        self.assertEqual(resp.url, reverse('tracks-select_factors'))
+        self.assertEqual(resp.url, reverse('tracks-select_factors') + '?genome=hg19')
 
     def test_select_tracks_get_with_data(self):
-        resp = self.client.get(reverse('tracks-select_tracks') + '?tf=AR&tf=ATF&celltype=8988T&celltype=CLL')
+        resp = self.client.get(reverse('tracks-select_tracks') +
+                               '?genome=hg19&tf=AR&tf=ATF&celltype=8988T&celltype=CLL')
         self.assertEqual(resp.status_code, STATUS_OK)
         self._check_nav_context(resp)
         self.assertEqual(resp.context['step_items'], Steps.make_items(Steps.TRACKS))
@@ -177,13 +223,78 @@ class ViewsTests(TestCase):
         celltype_names = [celltype.name for celltype in resp.context['celltypes']]
         self.assertEqual(celltype_names, ['8988T','CLL'])
 
+    def test_select_tracks_only_offers_pairs_with_tracks_in_genome(self):
+        Track.objects.filter(tf=self.tf2, cell_type_id='CLL').update(genome=Genome.objects.create(name='mm10'))
+        resp = self.client.get(reverse('tracks-select_tracks') +
+                               '?genome=hg19&tf=AR&tf=ATF&celltype=8988T&celltype=CLL')
+        content = resp.content.decode('utf-8')
+        self.assertEqual(content.count('type="checkbox" name="track_str"'), 3)
+        self.assertNotIn('value="ATF,CLL"', content)
+        self.assertIn('<input type="hidden" name="genome" value="hg19">', content)
+
     def test_select_tracks_post_with_data(self):
-        resp = self.client.post(reverse('tracks-select_tracks'), data={'track_str': ['AR,8988T', 'AR,CLL']})
+        resp = self.client.post(reverse('tracks-select_tracks'), data={'genome': 'hg19', 'track_str': ['AR,8988T', 'AR,CLL']})
         self.assertEqual(resp.status_code, STATUS_FOUND)
-        expected_url = 'https://genome.ucsc.edu/cgi-bin/hgTracks?org=human&db=hg19&' \
+        expected_url = 'https://genome.ucsc.edu/cgi-bin/hgTracks?db=hg19&' \
                        'hubUrl=http://testserver/tracks/1_2/hub.txt&position=chr1:100-200'
         self.assertEqual(resp.url, expected_url)
 
+    def test_select_tracks_post_with_selection(self):
+        url = reverse('tracks-select_tracks') + '?genome=hg19&tf=AR&tf=ATF&celltype=8988T&celltype=CLL'
+        resp = self.client.post(url, data={'genome': 'hg19', 'selection': 'tf:ATF'})
+        self.assertEqual(resp.status_code, STATUS_FOUND)
+        self.assertIn('hubUrl=http://testserver/tracks/3_4/hub.txt', resp.url)
+        # an invalid selection shows its error on the same page
+        resp = self.client.post(url, data={'genome': 'hg19', 'selection': 'tf:CTCF'})
+        self.assertEqual(resp.status_code, STATUS_OK)
+        self.assertIn('CTCF matches no transcription factors', resp.content.decode('utf-8'))
+        self.assertIn('action="{}"'.format(url.replace('&', '&amp;')), resp.content.decode('utf-8'))
+
+    def test_select_tracks_post_shows_track_errors(self):
+        url = reverse('tracks-select_tracks') + '?genome=hg19&tf=AR&tf=ATF&celltype=8988T&celltype=CLL'
+        for engine in ['django', 'jinja2']:
+            with override_settings(WIZARD_TEMPLATE_ENGINE=engine):
+                resp = self.client.post(url, data={'genome': 'hg19'})
+                self.assertEqual(resp.status_code, STATUS_OK)
+                self.assertIn('This field is required.', resp.content.decode('utf-8'))
+                resp = self.client.post(url, data={'genome': 'hg19', 'track_str': ['AR8988T']})
+                self.assertIn('Invalid track value AR8988T', resp.content.decode('utf-8'))
+
+    def test_search_get_without_query(self):
+        resp = self.client.get(reverse('tracks-search'))
+        self.assertEqual(resp.status_code, STATUS_OK)
+        self._check_nav_context(resp)
+        self.assertNotIn('searched', resp.context)
+
+    def test_search_links_to_hub(self):
+        search.rebuild_index()
+        resp = self.client.get(reverse('tracks-search') + '?genome=hg19&q=AR+CL')
+        self.assertEqual(resp.status_code, STATUS_OK)
+        self.assertEqual([track.name for track in resp.context['tracks']], ['ARCLLrep1'])
+        track_id = resp.context['tracks'][0].id
+        self.assertEqual(resp.context['genome_browser_url'],
+                         'https://genome.ucsc.edu/cgi-bin/hgTracks?db=hg19&'
+                         'hubUrl=http://testserver/tracks/{}/hub.txt&position=chr1:100-200'.format(track_id))
+
+    @override_settings(TRACK_SELECTION_LIMIT='3')
+    def test_search_with_too_many_tracks(self):
+        search.rebuild_index()
+        resp = self.client.get(reverse('tracks-search') + '?genome=hg19&q=rep1')
+        self.assertEqual(len(resp.context['tracks']), 3)
+        self.assertTrue(resp.context['too_many_tracks'])
+        self.assertNotIn('genome_browser_url', resp.context)
+
+    def test_edit_hub_redirects_to_edited_hub(self):
+        resp = self.client.get(reverse('tracks-edit_hub', kwargs={'encoded_key_value': '1_2'}) +
+                               '?remove_celltype=CLL&add_tf=ATF')
+        self.assertEqual(resp.status_code, STATUS_FOUND)
+        self.assertEqual(resp.url, 'https://genome.ucsc.edu/cgi-bin/hgTracks?db=hg19&'
+                                   'hubUrl=http://testserver/tracks/1_3/hub.txt')
+        resp = self.client.get(reverse('tracks-edit_hub', kwargs={'encoded_key_value': '1_2'}) + '?remove_track=1')
+        self.assertEqual(resp.status_code, STATUS_FOUND)
+        resp = self.client.get(reverse('tracks-edit_hub', kwargs={'encoded_key_value': '1_2'}) + '?remove_tf=AR')
+        self.assertEqual(resp.status_code, 400)
+
     def test_tracks_detail(self):
         resp = self.client.get(reverse('tracks-detail', kwargs={'encoded_key_value': '1_2'}))
         self.assertEqual(resp.status_code, STATUS_OK)
@@ -237,3 +348,178 @@ viewLimits 0:100
 visibility dense
 
 """)
+
+    @override_settings(HUB_TRACKDB_GROUP_BY='tf', HUB_TRACKDB_GROUP_MIN_TRACKS=3)
+    def test_tracks_trackdb_grouped_by_tf(self):
+        resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2_3', 'genome': 'hg19'}))
+        self.assertEqual(resp.status_code, STATUS_OK)
+        self.assertEqual(resp.content.decode('utf-8'), """
+track composite_tf_AR
+compositeTrack on
+shortLabel AR
+longLabel AR (2 tracks)
+subGroup1 cellType Cell_Type 8988T=8988T CLL=CLL
+subGroup2 rep Replicate rep1=rep1
+dimensions dimX=cellType dimY=rep
+sortOrder cellType=+ rep=+
+type bigWig
+graphTypeDefault bar
+autoScale off
+maxHeightPixels 100:32:8
+visibility dense
+
+    track AR8988Trep1
+    parent composite_tf_AR on
+    subGroups cellType=8988T rep=rep1
+    bigDataUrl https://github.com/Duke-GCB/topdata
+    shortLabel AR8988Trep1
+    longLabel AR8988Trep1
+    type bigWig
+    viewLimits 0:100
+
+    track ARCLLrep1
+    parent composite_tf_AR off
+    subGroups cellType=CLL rep=rep1
+    bigDataUrl https://github.com/Duke-GCB/topdata
+    shortLabel ARCLLrep1
+    longLabel ARCLLrep1
+    type bigWig
+    viewLimits 0:100
+
+
+track composite_tf_ATF
+compositeTrack on
+shortLabel ATF
+longLabel ATF (1 tracks)
+subGroup1 cellType Cell_Type 8988T=8988T
+subGroup2 rep Replicate rep1=rep1
+dimensions dimX=cellType dimY=rep
+sortOrder cellType=+ rep=+
+type bigWig
+graphTypeDefault bar
+autoScale off
+maxHeightPixels 100:32:8
+visibility dense
+
+    track ATF8988Trep1
+    parent composite_tf_ATF on
+    subGroups cellType=8988T rep=rep1
+    bigDataUrl https://github.com/Duke-GCB/topdata
+    shortLabel ATF8988Trep1
+    longLabel ATF8988Trep1
+    type bigWig
+    viewLimits 0:100
+
+""")
+
+    def test_tracks_trackdb_grouped_only_with_many_tracks(self):
+        with override_settings(HUB_TRACKDB_GROUP_BY='cell_type', HUB_TRACKDB_GROUP_MIN_TRACKS=3):
+            resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2', 'genome': 'hg19'}))
+            self.assertNotIn('compositeTrack', resp.content.decode('utf-8'))
+            resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2_3',
+                                                                     'genome': 'hg19'}))
+            self.assertEqual(resp.content.decode('utf-8').count('compositeTrack on'), 2)
+
+    def test_tracks_trackdb_gzip(self):
+        resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2', 'genome': 'hg19'}),
+                               HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(resp.status_code, STATUS_OK)
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        plain_resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2', 'genome': 'hg19'}))
+        self.assertEqual(gzip.decompress(resp.content), plain_resp.content)
+
+    def test_hub_files_redirect_to_static_hub(self):
+        static_hubs_root = tempfile.mkdtemp()
+        with override_settings(STATIC_HUBS_ROOT=static_hubs_root, STATIC_HUBS_URL='https://cdn.example.com/hubs/'):
+            write_static_hub('1_2', {'hub.txt': 'hub'})
+            static_url = 'https://cdn.example.com/hubs/{}/'.format(static_hub_name('1_2'))
+            resp = self.client.get(reverse('tracks-hub', kwargs={'encoded_key_value': '2_1'}))
+            self.assertEqual(resp.status_code, STATUS_FOUND)
+            self.assertEqual(resp.url, static_url + 'hub.txt')
+            resp = self.client.get(reverse('tracks-genomes', kwargs={'encoded_key_value': '1_2'}))
+            self.assertEqual(resp.url, static_url + 'genomes.txt')
+            resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2', 'genome': 'hg19'}))
+            self.assertEqual(resp.url, static_url + 'hg19/trackDb.txt')
+            resp = self.client.post(reverse('tracks-select_tracks'), data={'genome': 'hg19', 'track_str': ['AR,8988T', 'AR,CLL']})
+            self.assertEqual(resp.url, 'https://genome.ucsc.edu/cgi-bin/hgTracks?db=hg19&'
+                                       'hubUrl={}hub.txt&position=chr1:100-200'.format(static_url))
+        shutil.rmtree(static_hubs_root)
+
+    def test_hub_files_served_from_static_hub_without_url(self):
+        static_hubs_root = tempfile.mkdtemp()
+        with override_settings(STATIC_HUBS_ROOT=static_hubs_root, STATIC_HUBS_URL=''):
+            write_static_hub('1_2', {'hub.txt': 'static hub', 'hg19/trackDb.txt': 'static trackdb'})
+            resp = self.client.get(reverse('tracks-hub', kwargs={'encoded_key_value': '2_1'}))
+            self.assertEqual(resp.status_code, STATUS_OK)
+            self.assertEqual(b''.join(resp.streaming_content), b'static hub')
+            resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2', 'genome': 'hg19'}))
+            self.assertEqual(b''.join(resp.streaming_content), b'static trackdb')
+            # files missing from the static copy are rendered
+            resp = self.client.get(reverse('tracks-genomes', kwargs={'encoded_key_value': '1_2'}))
+            self.assertIn(b'genome hg19', resp.content)
+            resp = self.client.post(reverse('tracks-select_tracks'), data={'genome': 'hg19', 'track_str': ['AR,8988T', 'AR,CLL']})
+            self.assertIn('hubUrl=http://testserver/tracks/1_2/hub.txt', resp.url)
+        shutil.rmtree(static_hubs_root)
+
+    def test_tracks_trackdb_excludes_dead_tracks(self):
+        TrackHealth.objects.create(track=Track.objects.get(name='AR8988Trep1'), is_alive=False, status=404,
+                                   checked=timezone.now())
+        url = reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2', 'genome': 'hg19'})
+        self.assertIn('track AR8988Trep1\n', self.client.get(url).content.decode('utf-8'))
+        clear_hub_cache()
+        with override_settings(HUB_EXCLUDE_DEAD_TRACKS=True):
+            content = self.client.get(url).content.decode('utf-8')
+        self.assertNotIn('track AR8988Trep1\n', content)
+        self.assertIn('track ARCLLrep1\n', content)
+
+    def test_tracks_trackdb_view_limits_from_summary(self):
+        TrackSummary.objects.create(track=Track.objects.get(name='ARCLLrep1'), bases_covered=10, min_value=0,
+                                    max_value=0.5, mean_value=0.1)
+        resp = self.client.get(reverse('tracks-trackdb', kwargs={'encoded_key_value': '1_2', 'genome': 'hg19'}))
+        content = resp.content.decode('utf-8')
+        self.assertIn('track AR8988Trep1\n', content)
+        self.assertEqual(content.count('viewLimits 0:100\n'), 1)
+        self.assertEqual(content.count('viewLimits 0:0.5\n'), 1)
+
+    def test_wizard_pages_match_between_template_engines(self):
+        urls = [
+            reverse('tracks-about'),
+            reverse('tracks-select_genome'),
+            reverse('tracks-select_factors') + '?genome=hg19',
+            reverse('tracks-select_cell_type') + '?genome=hg19&tf=AR&tf=ATF',
+            reverse('tracks-search') + '?genome=hg19&q=AR',
+            reverse('tracks-select_tracks') + '?genome=hg19&tf=AR&tf=ATF&celltype=8988T&celltype=CLL',
+        ]
+        for url in urls:
+            pages = []
+            for engine in ['django', 'jinja2']:
+                with override_settings(WIZARD_TEMPLATE_ENGINE=engine):
+                    resp = self.client.get(url)
+                self.assertEqual(resp.status_code, STATUS_OK)
+                content = re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '', resp.content.decode('utf-8'))
+                pages.append(re.sub(r'\s+', ' ', content).replace('> <', '><').strip())
+            self.assertEqual(pages[0], pages[1])
+        self.assertEqual(pages[1].count('type="checkbox" name="track_str"'), 4)
+        self.assertIn('name="csrfmiddlewaretoken"', resp.content.decode('utf-8'))
+
+    def test_select_tracks_fragments_cached_for_normalized_params(self):
+        resp = self.client.get(reverse('tracks-select_tracks') +
+                               '?genome=hg19&tf=ATF&tf=AR&celltype=CLL&tf=AR&celltype=8988T')
+        self.assertEqual(resp.status_code, STATUS_OK)
+        with self.assertNumQueries(0):
+            cached_resp = self.client.get(reverse('tracks-select_tracks') +
+                                          '?tf=AR&tf=ATF&celltype=8988T&celltype=CLL&genome=hg19')
+        self.assertEqual(cached_resp.status_code, STATUS_OK)
+        content = cached_resp.content.decode('utf-8')
+        self.assertEqual(content.count('type="checkbox" name="track_str"'), 4)
+        self.assertIn('name="csrfmiddlewaretoken"', content)
+        self.assertIn('class="navbar-brand"', content)
+
+    def test_select_cell_type_form_cached_per_catalog_version(self):
+        url = reverse('tracks-select_cell_type') + '?genome=hg19&tf=AR'
+        self.assertNotIn('NewCellType', self.client.get(url).content.decode('utf-8'))
+        Track.objects.create(genome=self.genome, name='ARNewCellTyperep1', tf=self.tf1,
+                             cell_type=CellType.objects.create(name='NewCellType'), rep_name_id='rep1')
+        self.assertNotIn('NewCellType', self.client.get(url).content.decode('utf-8'))
+        bump_catalog_version()
+        self.assertIn('NewCellType', self.client.get(url).content.decode('utf-8'))
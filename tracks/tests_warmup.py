@@ -0,0 +1,43 @@
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from tracks.warmup import warm_up, WARM_UP_STEPS, compile_page_templates, warm_hub_cache
+from tracks import hubfiles
+
+
+class WarmUpTests(TestCase):
+    def test_warm_up(self):
+        with self.assertLogs('tracks.warmup', level='INFO'):
+            timings = warm_up()
+        self.assertEqual([name for name, _ in timings], [name for name, _ in WARM_UP_STEPS])
+        for _, seconds in timings:
+            self.assertGreaterEqual(seconds, 0)
+
+    def test_failing_step_does_not_stop_warm_up(self):
+        calls = []
+
+        def fail():
+            raise ValueError('database unavailable')
+
+        with self.assertLogs('tracks.warmup', level='ERROR'):
+            timings = warm_up([('fail', fail), ('next', lambda: calls.append('next'))])
+        self.assertEqual([name for name, _ in timings], ['fail', 'next'])
+        self.assertEqual(calls, ['next'])
+
+    def test_compile_templates(self):
+        self.assertEqual(compile_page_templates(), 12)
+        with override_settings(WIZARD_TEMPLATE_ENGINE='jinja2'):
+            self.assertEqual(compile_page_templates(), 10)
+        self.assertEqual(hubfiles.compile_templates(), 4)
+        self.assertIs(hubfiles.get_template('hub.txt.j2'), hubfiles.get_template('hub.txt.j2'))
+
+    def test_workers_do_not_warm_hub_cache(self):
+        self.assertNotIn(warm_hub_cache, [func for _, func in WARM_UP_STEPS])
+
+    @override_settings(HUB_CACHE_WARM_LOGS=[])
+    def test_warm_hub_cache_without_logs(self):
+        self.assertIsNone(warm_hub_cache())
+
+    @patch('tracks.prewarm.warm_from_settings', side_effect=OSError('log unreadable'))
+    def test_failing_warm_hub_cache_is_logged(self, mock_warm_from_settings):
+        with self.assertLogs('tracks.warmup', level='ERROR'):
+            self.assertIsNone(warm_hub_cache())
@@ -0,0 +1,201 @@
+"""
+Checks large numbers of urls concurrently with asyncio.
+Requests are made over plain asyncio streams, one connection per request, with a limit on the total number of
+requests in flight and on the number of connections to each host.
+"""
+from collections import namedtuple
+from urllib.parse import urlsplit, urljoin
+import asyncio
+import ssl
+import time
+
+USER_AGENT = 'topdata-urlcheck'
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = [301, 302, 303, 307, 308]
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+HEAD_NOT_ALLOWED_STATUSES = [405, 501]
+RETRY_DELAY_SECONDS = 0.5
+
+UrlResponse = namedtuple('UrlResponse', ['url', 'status', 'headers', 'body'])
+UrlCheckResult = namedtuple('UrlCheckResult', ['url', 'status', 'size', 'last_modified', 'latency', 'error'])
+
+
+class UrlCheckError(Exception):
+    pass
+
+
+def is_alive(result):
+    return not result.error and result.status is not None and 200 <= result.status < 400
+
+
+async def read_head(reader):
+    status_line = await reader.readline()
+    parts = status_line.decode('latin-1').split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+        raise UrlCheckError('Invalid response {!r}'.format(status_line[:100]))
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return int(parts[1]), headers
+
+
+async def read_chunked_body(reader, max_bytes):
+    """
+    Read up to max_bytes of a body sent with Transfer-Encoding: chunked.
+    """
+    body = b''
+    while len(body) < max_bytes:
+        size_line = await reader.readline()
+        # chunk extensions after ; are ignored
+        size_text = size_line.split(b';', 1)[0].strip()
+        try:
+            size = int(size_text, 16)
+        except ValueError:
+            raise UrlCheckError('Invalid chunk size {!r}'.format(size_line[:100]))
+        if size == 0:
+            break
+        chunk = await reader.readexactly(size)
+        await reader.readexactly(2)
+        body += chunk
+    return body[:max_bytes]
+
+
+async def read_body(reader, headers, max_bytes):
+    """
+    Read up to max_bytes of the body, servers that ignore a Range header may start sending a whole file.
+    """
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        return await read_chunked_body(reader, max_bytes)
+    if 'content-length' in headers:
+        return await reader.readexactly(min(int(headers['content-length']), max_bytes))
+    # requests are sent with Connection: close so the body ends when the connection does
+    body = b''
+    while len(body) < max_bytes:
+        data = await reader.read(max_bytes - len(body))
+        if not data:
+            break
+        body += data
+    return body
+
+
+async def http_request(method, url, headers=None, timeout=30, max_body_bytes=0):
+    """
+    Make an HTTP request following redirects and return a UrlResponse with up to max_body_bytes of the body.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise UrlCheckError('Unsupported url {}'.format(url))
+        is_https = parts.scheme == 'https'
+        port = parts.port or (443 if is_https else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        request_lines = [
+            '{} {} HTTP/1.1'.format(method, path),
+            'Host: {}'.format(parts.netloc),
+            'User-Agent: {}'.format(USER_AGENT),
+            'Connection: close',
+        ]
+        for name, value in (headers or {}).items():
+            request_lines.append('{}: {}'.format(name, value))
+        ssl_context = ssl.create_default_context() if is_https else None
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, port, ssl=ssl_context),
+                                                timeout)
+        try:
+            writer.write(('\r\n'.join(request_lines) + '\r\n\r\n').encode('latin-1'))
+            status, response_headers = await asyncio.wait_for(read_head(reader), timeout)
+            if status in REDIRECT_STATUSES and 'location' in response_headers:
+                url = urljoin(url, response_headers['location'])
+                continue
+            body = b''
+            if method != 'HEAD' and max_body_bytes:
+                body = await asyncio.wait_for(read_body(reader, response_headers, max_body_bytes), timeout)
+            return UrlResponse(url, status, response_headers, body)
+        finally:
+            writer.close()
+    raise UrlCheckError('Too many redirects')
+
+
+def parse_size(response):
+    content_range = response.headers.get('content-range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        if total.isdigit():
+            return int(total)
+    if response.status == 200 and response.headers.get('content-length', '').isdigit():
+        return int(response.headers['content-length'])
+    return None
+
+
+class UrlChecker(object):
+    def __init__(self, concurrency=50, per_host=6, retries=2, timeout=30):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.timeout = timeout
+        self.semaphore = None
+        self.host_semaphores = {}
+
+    def host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self.host_semaphores[host]
+
+    async def fetch(self, method, url, headers=None, max_body_bytes=0):
+        """
+        Make a request within the concurrency limits, retrying connection errors and temporary failures.
+        """
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        for attempt in range(self.retries + 1):
+            is_last_attempt = attempt == self.retries
+            try:
+                async with self.semaphore, self.host_semaphore(url):
+                    response = await http_request(method, url, headers, self.timeout, max_body_bytes)
+                if response.status not in RETRY_STATUSES or is_last_attempt:
+                    return response
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, UrlCheckError):
+                if is_last_attempt:
+                    raise
+            await asyncio.sleep(RETRY_DELAY_SECONDS * 2 ** attempt)
+
+    async def fetch_range(self, url, start, end):
+        """
+        Return bytes start to end (inclusive) of the file at url.
+        """
+        response = await self.fetch('GET', url, {'Range': 'bytes={}-{}'.format(start, end)},
+                                    max_body_bytes=end + 1)
+        if response.status == 206:
+            return response.body
+        if response.status == 200:
+            # server ignored the range and sent the whole file
+            return response.body[start:end + 1]
+        raise UrlCheckError('Range request failed with status {}'.format(response.status))
+
+    async def check(self, url):
+        start = time.perf_counter()
+        try:
+            response = await self.fetch('HEAD', url)
+            if response.status in HEAD_NOT_ALLOWED_STATUSES:
+                response = await self.fetch('GET', url, {'Range': 'bytes=0-0'})
+            return UrlCheckResult(url, response.status, parse_size(response),
+                                  response.headers.get('last-modified', ''), time.perf_counter() - start, '')
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, UrlCheckError) as err:
+            error = str(err) or err.__class__.__name__
+            return UrlCheckResult(url, None, None, '', time.perf_counter() - start, error)
+
+    async def check_all(self, urls):
+        return await asyncio.gather(*[self.check(url) for url in urls])
+
+
+def check_urls(urls, **kwargs):
+    """
+    Check urls returning a UrlCheckResult for each. kwargs are passed to UrlChecker.
+    """
+    return asyncio.run(UrlChecker(**kwargs).check_all(urls))
@@ -1,21 +1,25 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse, FileResponse
 from django.template import loader
 from django.conf import settings
 from django.utils.html import quote
-from jinja2 import Template
 from django.shortcuts import reverse, redirect, render
-from tracks.models import Track, TranscriptionFactor, CellType, Genome
-from tracks.forms import TranscriptionFactorForm, CellTypeForm, TracksForm, FormFields
-import os
+from tracks.models import Track, TranscriptionFactor, CellType, Genome, get_available_pairs
+from tracks.forms import GenomeForm, TranscriptionFactorForm, CellTypeForm, TracksForm, SearchForm, FormFields, \
+    make_genome_browser_url
+from tracks import hubcache, hubfiles, search, export, hubedit
+from tracks.statichubs import get_static_hub_url, get_static_hub_path
+from tracks.compression import compress_body, make_encoded_response
+from tracks.fragments import get_fragment, normalize_params
+from tracks.routers import stream_with_replica_reads
 
 
 TEMPLATE_CONFIG = 'templates.yaml'
-JINJA_TEMPLATE_DIR = 'jinja2'
 
 
 class Navigation(object):
     TITLE = "Top Data"
     TRACKS_PAGE = 'Tracks'
+    SEARCH_PAGE = 'Search'
     ABOUT_PAGE = 'About'
 
     @staticmethod
@@ -23,9 +27,14 @@ class Navigation(object):
         return [
             {
                 'label': Navigation.TRACKS_PAGE,
-                'url_name': 'tracks-select_factors',
+                'url_name': 'tracks-select_genome',
                 'is_active': active_page == Navigation.TRACKS_PAGE,
             },
+            {
+                'label': Navigation.SEARCH_PAGE,
+                'url_name': 'tracks-search',
+                'is_active': active_page == Navigation.SEARCH_PAGE,
+            },
             {
                 'label': Navigation.ABOUT_PAGE,
                 'url_name': 'tracks-about',
@@ -45,6 +54,7 @@ class Navigation(object):
 
 
 class Steps(object):
+    GENOME = 'Genome'
     TRANSCRIPTION_FACTORS = 'Transcription Factors'
     CELL_TYPES = 'Cell Type'
     TRACKS = 'Tracks'
@@ -52,7 +62,7 @@ class Steps(object):
     @staticmethod
     def make_items(active_step_name):
         items = []
-        for step_name in [Steps.TRANSCRIPTION_FACTORS, Steps.CELL_TYPES, Steps.TRACKS]:
+        for step_name in [Steps.GENOME, Steps.TRANSCRIPTION_FACTORS, Steps.CELL_TYPES, Steps.TRACKS]:
             items.append({
                 "label": step_name,
                 "is_active": active_step_name == step_name,
@@ -62,12 +72,61 @@ class Steps(object):
         return items
 
 
+def get_wizard_template(template_name):
+    return loader.get_template(template_name, using=settings.WIZARD_TEMPLATE_ENGINE)
+
+
+def render_fragment(template_name, context):
+    return get_wizard_template(template_name).render(context)
+
+
+def make_page_context(active_page, active_step_name=None, base_context={}):
+    """
+    Build the context of a wizard page including the cached navbar and steps fragments.
+    """
+    context = Navigation.make_template_context(active_page, base_context)
+    context['navbar'] = get_fragment(['navbar', active_page, str(settings.ALL_DATA_URL)],
+                                     lambda: render_fragment('tracks/navbar.html', context))
+    if active_step_name:
+        context['step_items'] = Steps.make_items(active_step_name)
+        context['steps'] = get_fragment(['steps', active_step_name],
+                                        lambda: render_fragment('tracks/steps_progress.html', context))
+    return context
+
+
 def index(request):
-    return redirect('tracks-select_factors')
+    return redirect('tracks-select_genome')
 
 def about(request):
-    template = loader.get_template('tracks/about.html')
-    context = Navigation.make_template_context(Navigation.ABOUT_PAGE)
+    template = get_wizard_template('tracks/about.html')
+    context = make_page_context(Navigation.ABOUT_PAGE)
+    return HttpResponse(template.render(context, request))
+
+
+def redirect_to_step(view_name, params):
+    """
+    Redirect to an earlier wizard step keeping the choices made before it.
+    """
+    url = reverse(view_name)
+    if params:
+        url += '?' + params.urlencode()
+    return redirect(url)
+
+
+def select_genome(request):
+    if request.method == 'POST':
+        form = GenomeForm(request.POST)
+        if form.is_valid():
+            return redirect(form.next_step_url())
+        form_html = form.as_p()
+    else:
+        form = GenomeForm()
+        form_html = get_fragment(['select_genome_form'], form.as_p)
+    template = get_wizard_template('tracks/select_genome.html')
+    context = make_page_context(Navigation.TRACKS_PAGE, Steps.GENOME, {
+        'form': form,
+        'form_html': form_html,
+    })
     return HttpResponse(template.render(context, request))
 
 
@@ -76,12 +135,17 @@ def select_factors(request):
         form = TranscriptionFactorForm(request.POST)
         if form.is_valid():
             return redirect(form.next_step_url())
+        form_html = form.as_p()
     else:
-        form = TranscriptionFactorForm()
-    template = loader.get_template('tracks/select_factors.html')
-    context = Navigation.make_template_context(Navigation.TRACKS_PAGE, {
-        'step_items': Steps.make_items(Steps.TRANSCRIPTION_FACTORS),
+        if not request.GET.get(FormFields.GENOME):
+            return redirect('tracks-select_genome')
+        params = normalize_params(request.GET, [FormFields.GENOME])
+        form = TranscriptionFactorForm(initial={FormFields.GENOME: params[FormFields.GENOME]})
+        form_html = get_fragment(['select_factors_form', params.urlencode()], form.as_p)
+    template = get_wizard_template('tracks/select_factors.html')
+    context = make_page_context(Navigation.TRACKS_PAGE, Steps.TRANSCRIPTION_FACTORS, {
         'form': form,
+        'form_html': form_html,
     })
     return HttpResponse(template.render(context, request))
 
@@ -91,16 +155,21 @@ def select_cell_type(request):
         form = CellTypeForm(request.POST)
         if form.is_valid():
             return redirect(form.next_step_url())
+        form_html = form.as_p()
     else:
+        if not request.GET.get(FormFields.GENOME):
+            return redirect('tracks-select_genome')
         if not request.GET.getlist(FormFields.TF_NAME):
-            return redirect('tracks-select_factors')
-        form = CellTypeForm(request.GET)
+            return redirect_to_step('tracks-select_factors', normalize_params(request.GET, [FormFields.GENOME]))
+        params = normalize_params(request.GET, [FormFields.GENOME, FormFields.TF_NAME])
+        form = CellTypeForm(params)
         # clear cell type error so user isn't warned before they have a chance to enter data
         del form.errors[FormFields.CELL_TYPE]
-    template = loader.get_template('tracks/select_cell_type.html')
-    context = Navigation.make_template_context(Navigation.TRACKS_PAGE, {
-        'step_items': Steps.make_items(Steps.CELL_TYPES),
-        'form': form
+        form_html = get_fragment(['select_cell_type_form', params.urlencode()], form.as_p)
+    template = get_wizard_template('tracks/select_cell_type.html')
+    context = make_page_context(Navigation.TRACKS_PAGE, Steps.CELL_TYPES, {
+        'form': form,
+        'form_html': form_html,
     })
     return HttpResponse(template.render(context, request))
 
@@ -110,36 +179,123 @@ def select_tracks(request):
         form = TracksForm(request.POST)
         if form.is_valid():
             return redirect(form.next_step_url(request))
-    tfs_names = request.GET.getlist(FormFields.TF_NAME)
-    celltypes_names = request.GET.getlist(FormFields.CELL_TYPE)
+    else:
+        form = TracksForm()
+    genome_name = request.GET.get(FormFields.GENOME)
+    if not genome_name:
+        return redirect('tracks-select_genome')
+    params = normalize_params(request.GET, [FormFields.GENOME, FormFields.TF_NAME, FormFields.CELL_TYPE])
+    tfs_names = params.getlist(FormFields.TF_NAME)
+    celltypes_names = params.getlist(FormFields.CELL_TYPE)
     if not tfs_names or not celltypes_names:
-        return redirect('tracks-select_factors')
-    context = Navigation.make_template_context(Navigation.TRACKS_PAGE, {
-        'step_items': Steps.make_items(Steps.TRACKS),
+        return redirect_to_step('tracks-select_factors', normalize_params(request.GET, [FormFields.GENOME]))
+    table_context = {
+        'genome': genome_name,
         'tfs': TranscriptionFactor.objects.filter(pk__in=tfs_names),
         'celltypes': CellType.objects.filter(pk__in=celltypes_names),
-    })
-    return render(request, 'tracks/select_tracks.html', context)
-
-
-def get_track_ids(tf_cell_type_pairs):
-    track_ids = []
-    for tf, cell_type in tf_cell_type_pairs:
-        for track in Track.objects.filter(tf__name=tf, cell_type__name=cell_type):
-            track_ids.append(str(track.id))
-    return track_ids
-
-
-def get_position_from_first_track(tf_cell_type_pairs):
-    first_tf, first_cell_type = tf_cell_type_pairs[0]
-    track = Track.objects.filter(tf__name=first_tf, cell_type__name=first_cell_type)[0]
-    return track.position
+    }
+    context = make_page_context(Navigation.TRACKS_PAGE, Steps.TRACKS, table_context)
+    context['tracks_table'] = get_fragment(['select_tracks_table', params.urlencode()],
+                                           lambda: render_tracks_table(table_context))
+    # posted back to the same url so an invalid selection shows its errors on this page
+    context['form'] = form
+    context['form_action'] = request.get_full_path()
+    return render(request, 'tracks/select_tracks.html', context, using=settings.WIZARD_TEMPLATE_ENGINE)
+
+
+def render_tracks_table(table_context):
+    """
+    Render the table of tf and cell type checkboxes, leaving out checkboxes for pairs without tracks in the genome.
+    """
+    tfs = list(table_context['tfs'])
+    celltypes = list(table_context['celltypes'])
+    available_pairs = get_available_pairs(table_context['genome'], [tf.name for tf in tfs],
+                                          [celltype.name for celltype in celltypes])
+    rows = []
+    for tf in tfs:
+        rows.append({
+            'tf': tf,
+            'track_strs': ['{},{}'.format(tf.name, celltype.name) if (tf.name, celltype.name) in available_pairs
+                           else '' for celltype in celltypes],
+        })
+    return render_fragment('tracks/tracks_table.html', dict(table_context, celltypes=celltypes, rows=rows))
 
 
 def get_tracks(encoded_key_value):
     return Track.objects.filter(pk__in=encoded_key_value.split("_"))
 
 
+def search_tracks(request):
+    """
+    Find tracks of a genome by words in their names, labels, transcription factors and cell types, linking to
+    a hub of the tracks found.
+    """
+    context = {}
+    if request.GET.get(FormFields.QUERY):
+        form = SearchForm(request.GET)
+        if form.is_valid():
+            genome_name = form.cleaned_data[FormFields.GENOME].name
+            limit = int(settings.TRACK_SELECTION_LIMIT)
+            # one more than allowed in a hub to know when there are too many
+            tracks = search.search_tracks(genome_name, form.cleaned_data[FormFields.QUERY], limit + 1)
+            context['searched'] = True
+            context['tracks'] = tracks[:limit]
+            context['too_many_tracks'] = len(tracks) > limit
+            context['track_selection_limit'] = limit
+            if tracks and len(tracks) <= limit:
+                context['genome_browser_url'] = make_genome_browser_url(
+                    request, genome_name, [track.id for track in tracks], tracks[0].position)
+    else:
+        form = SearchForm()
+    context = make_page_context(Navigation.SEARCH_PAGE, base_context=dict(context, form=form))
+    return render(request, 'tracks/search.html', context, using=settings.WIZARD_TEMPLATE_ENGINE)
+
+
+def export_tracks(request):
+    """
+    Stream the tracks of the catalog in the format parameter (tsv, ndjson or trackdb), optionally limited to a
+    genome, transcription factors and cell types.
+    """
+    export_format = request.GET.get('format', export.TSV)
+    genome_name = request.GET.get(FormFields.GENOME)
+    try:
+        chunks = export.export_tracks(export_format, genome_name, request.GET.getlist(FormFields.TF_NAME),
+                                      request.GET.getlist(FormFields.CELL_TYPE))
+    except export.ExportError as e:
+        return HttpResponseBadRequest(str(e), content_type='text/plain')
+    # the tracks are read while the response is sent
+    response = StreamingHttpResponse(stream_with_replica_reads(chunks),
+                                     content_type=export.CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        export.make_filename(export_format, genome_name))
+    return response
+
+
+def edit_hub(request, encoded_key_value):
+    """
+    Open the Genome Browser with the hub encoded_key_value after adding or removing the transcription factors,
+    cell types or tracks in the query params (see tracks.hubedit). The browser keeps its position unless a
+    position param is given.
+    """
+    try:
+        genome_name, track_ids = hubedit.edit_hub(encoded_key_value, hubedit.make_hub_edit(request.GET),
+                                                  request.GET.get(FormFields.GENOME))
+    except hubedit.HubEditError as e:
+        return HttpResponseBadRequest(str(e), content_type='text/plain')
+    return redirect(make_genome_browser_url(request, genome_name, track_ids, request.GET.get('position')))
+
+
+def get_hub_tracks(encoded_key_value):
+    """
+    Tracks to include in the files of a hub, leaving out tracks whose files could not be downloaded when
+    HUB_EXCLUDE_DEAD_TRACKS is set.
+    """
+    tracks = get_tracks(encoded_key_value)
+    if settings.HUB_EXCLUDE_DEAD_TRACKS:
+        tracks = tracks.exclude(health__is_alive=False)
+    return tracks
+
+
 def decode_track_keys(encoded_track_strs):
     track_strs = encoded_track_strs.split("__")
     return [track_str.split("_") for track_str in track_strs]
@@ -156,33 +312,62 @@ def detail(request, encoded_key_value):
     return HttpResponse(template.render(context, request))
 
 
-def get_template(template_filename):
-    template_path = os.path.join(JINJA_TEMPLATE_DIR, template_filename)
-    with open(template_path) as infile:
-        return Template(infile.read())
+def render_genomes(encoded_key_value):
+    genomes = set()
+    for track in get_hub_tracks(encoded_key_value).select_related('genome'):
+        genomes.add(track.genome)
+    return hubfiles.render_genomes(genomes)
+
+
+def render_track_db(encoded_key_value, genome):
+    tracks = get_hub_tracks(encoded_key_value).filter(genome_id=genome).select_related(
+        'summary', *Track.COMPACT_RELATED_FIELDS)
+    return hubfiles.render_track_db(tracks)
+
+
+def get_hub_bodies(encoded_key_value, record_stats=True):
+    return hubcache.get_or_render('hub', [encoded_key_value],
+                                  lambda: compress_body(hubfiles.render_hub(encoded_key_value)), record_stats)
+
+
+def get_genomes_bodies(encoded_key_value, record_stats=True):
+    return hubcache.get_or_render('genomes', [encoded_key_value],
+                                  lambda: compress_body(render_genomes(encoded_key_value)), record_stats)
+
+
+def get_track_db_bodies(encoded_key_value, genome, record_stats=True):
+    return hubcache.get_or_render('trackdb', [encoded_key_value, genome],
+                                  lambda: compress_body(render_track_db(encoded_key_value, genome)), record_stats)
+
+
+def get_static_hub_response(encoded_key_value, path):
+    """
+    Return a redirect to the static copy of a hub file, or the file itself when STATIC_HUBS_URL is not set, or None
+    when the hub has no static copy.
+    """
+    static_hub_url = get_static_hub_url(encoded_key_value)
+    if static_hub_url:
+        return redirect(static_hub_url + path)
+    file_path = get_static_hub_path(encoded_key_value, path)
+    if file_path:
+        return FileResponse(open(file_path, 'rb'), content_type='text/plain')
+    return None
 
 
 def hub(request, encoded_key_value):
-    template = get_template('hub.txt.j2')
-    context = {
-        'hub_id': encoded_key_value
-    }
-    return HttpResponse(template.render(context), content_type='text/plain')
+    static_response = get_static_hub_response(encoded_key_value, hubfiles.HUB_FILENAME)
+    if static_response:
+        return static_response
+    return make_encoded_response(request, get_hub_bodies(encoded_key_value), content_type='text/plain')
 
 def genomes(request, encoded_key_value):
-    genomes = set()
-    for track in get_tracks(encoded_key_value):
-        genomes.add(track.genome)
-    template = get_template('genomes.txt.j2')
-    context = {
-        'genomes': genomes,
-    }
-    return HttpResponse(template.render(context), content_type='text/plain')
+    static_response = get_static_hub_response(encoded_key_value, hubfiles.GENOMES_FILENAME)
+    if static_response:
+        return static_response
+    return make_encoded_response(request, get_genomes_bodies(encoded_key_value), content_type='text/plain')
 
 def track_db(request, encoded_key_value, genome):
-    tracks = get_tracks(encoded_key_value).filter(genome__name=genome)
-    template = get_template('trackDb.txt.j2')
-    context = {
-        'tracks': tracks
-    }
-    return HttpResponse(template.render(context), content_type='text/plain')
+    static_response = get_static_hub_response(encoded_key_value, hubfiles.trackdb_path(genome))
+    if static_response:
+        return static_response
+    return make_encoded_response(request, get_track_db_bodies(encoded_key_value, genome), content_type='text/plain')
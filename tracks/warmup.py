@@ -0,0 +1,118 @@
+"""
+Work done when a worker boots so the first user requests it serves are not slowed by imports, opening the
+database connection or compiling templates. Called from the post_worker_init hook in gunicorn.conf.py.
+The hub cache is shared by the workers so it is warmed once, by the gunicorn master in its when_ready hook.
+"""
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest
+from django.template import loader
+from django.urls import reverse
+import importlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# tracks modules are imported within the steps so their import time is counted by the step that needs them
+
+PAGE_TEMPLATE_DIRS = {
+    'django': os.path.join(os.path.dirname(__file__), 'templates'),
+    'jinja2': os.path.join(os.path.dirname(__file__), 'jinja2'),
+}
+
+
+def import_views():
+    views = importlib.import_module('tracks.views')
+    # builds the url resolver's lookup tables
+    reverse('tracks-index')
+    return views
+
+
+def open_database_connection():
+    # includes the read replica when one is configured
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def compile_page_templates():
+    """
+    Load each page template of the tracks app for the WIZARD_TEMPLATE_ENGINE. Loaded templates are kept by the
+    cached template loader Django uses when DEBUG is off or by the Jinja2 environment.
+    """
+    engine = settings.WIZARD_TEMPLATE_ENGINE
+    template_dir = PAGE_TEMPLATE_DIRS[engine]
+    template_names = []
+    for dirpath, _, filenames in os.walk(template_dir):
+        for filename in filenames:
+            template_names.append(os.path.relpath(os.path.join(dirpath, filename), template_dir))
+    for template_name in template_names:
+        loader.get_template(template_name, using=engine)
+    return len(template_names)
+
+
+def compile_jinja_templates():
+    from tracks import hubfiles
+    return hubfiles.compile_templates()
+
+
+def prime_catalog():
+    from tracks import hubcache
+    hubcache.get_catalog_version()
+
+
+def render_first_page():
+    """
+    Render the first wizard step which also loads the form widget templates and the static files manifest.
+    """
+    from tracks import views
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse('tracks-select_genome')
+    views.select_genome(request)
+
+
+WARM_UP_STEPS = [
+    ('import views', import_views),
+    ('database connection', open_database_connection),
+    ('page templates', compile_page_templates),
+    ('jinja templates', compile_jinja_templates),
+    ('catalog', prime_catalog),
+    ('first page', render_first_page),
+]
+
+
+def warm_up(steps=WARM_UP_STEPS):
+    """
+    Run each warm-up step returning a list of (step name, seconds). A failing step is logged and skipped so a
+    worker still starts when for example the database is briefly unavailable.
+    """
+    timings = []
+    for name, func in steps:
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+        timings.append((name, time.perf_counter() - start))
+    logger.info("Worker %s warmed up in %.3fs: %s", os.getpid(), sum(seconds for _, seconds in timings),
+                ', '.join('{} {:.3f}s'.format(name, seconds) for name, seconds in timings))
+    return timings
+
+
+def warm_hub_cache():
+    """
+    Warm the hub cache from HUB_CACHE_WARM_LOGS in the gunicorn master before workers are started, so the time it
+    takes never counts against a worker's timeout. Returns the WarmReport or None when no logs are configured.
+    """
+    from tracks import prewarm
+    try:
+        report = prewarm.warm_from_settings()
+    except Exception:
+        logger.exception("Warming the hub cache failed")
+        return None
+    if report:
+        logger.info("Warmed %d files of %d hubs in %.3fs%s", report.num_files, report.num_hubs, report.elapsed,
+                    ' (time limit reached)' if report.timed_out else '')
+    return report